@@ -1,5 +1,20 @@
+import time
+
+# Début de cette exécution, relevé avant tout autre import : au premier démarrage du processus, le chargement
+# de pandas, pyarrow... par les modules importés ci-dessous compte dans le temps de premier affichage
+RUN_STARTED = time.perf_counter()
+
 import streamlit as st
-from sections import contrat_kelaa, autre_contrat, postes
+from components import alerts, memory, profiling
+from components.registry import unavailable_datasets
+from core.startup import import_section
+
+# Module de chaque section, importé seulement quand elle est choisie (ses graphiques : à sa page de statistiques)
+AGENCY_SECTIONS = {
+    "Agence_El Kelaa Des Sraghna": "sections.contrat_kelaa",
+    "Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT": "sections.autre_contrat",
+}
+POSTES_SECTION = "sections.postes"
 
 # Configuration initiale
 st.set_page_config(
@@ -31,6 +46,9 @@ if "agency_data" not in st.session_state:
 if "postes_data" not in st.session_state:
     st.session_state.postes_data = None
 
+# Mesures de performance de cette exécution (si activées dans la barre latérale)
+profiling.begin_run(RUN_STARTED)
+
 # =============================================
 # BARRE LATERALE - NAVIGATION
 # =============================================
@@ -49,24 +67,27 @@ with st.sidebar:
         st.subheader("Sélection d'agence")
         agency = st.selectbox(
             "Choisir une agence :",
-            ["Agence_El Kelaa Des Sraghna", "Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT"]
+            list(AGENCY_SECTIONS)
         )
 
 # =============================================
 # CONTENU PRINCIPAL
 # =============================================
-if section == "📄 Contrats Électricité":
-    if agency == "Agence_El Kelaa Des Sraghna":
-        contrat_kelaa.show()
-    else:
-        autre_contrat.show()
-elif section == "🏗 Postes Électriques":
-    postes.show()
+with unavailable_datasets():
+    if section == "📄 Contrats Électricité":
+        import_section(AGENCY_SECTIONS[agency]).show()
+    elif section == "🏗 Postes Électriques":
+        import_section(POSTES_SECTION).show()
 
 # =============================================
 # PIED DE PAGE (SIDEBAR)
 # =============================================
 with st.sidebar:
+    # Après le contenu : tient compte d'un fichier chargé pendant cette exécution
+    with unavailable_datasets():
+        alerts.alert_summary()
+    memory.memory_panel()
+
     st.markdown("---")
     st.subheader("📞 Contact")
     
@@ -92,3 +113,6 @@ with st.sidebar:
         **🕒 Horaires**  
         Lun-Ven: 8h30-17h30
     """)
+
+    st.markdown("---")
+    profiling.performance_panel()
@@ -0,0 +1,54 @@
+"""Compare deux exécutions du banc d'essai et signale les régressions.
+
+    python -m benchmarks.compare reference.json resultats.json --threshold 1.2
+
+Code de sortie 1 si au moins une étape est plus lente que `threshold` fois la référence.
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+# En dessous de cette durée, les écarts relèvent du bruit de mesure
+MIN_SECONDS = 0.005
+
+
+def load(path):
+    report = json.loads(Path(path).read_text(encoding="utf-8"))
+    return report["meta"], {(r["jeu"], r["taille"], r["etape"]): r for r in report["resultats"]}
+
+
+def compare(reference, candidate, threshold):
+    # (clé, durée de référence, durée candidate, rapport, régression) pour les étapes présentes dans les deux
+    rows = []
+    for key in sorted(reference.keys() & candidate.keys(), key=lambda k: (k[1], k[0], k[2])):
+        before, after = reference[key]["secondes"], candidate[key]["secondes"]
+        ratio = after / before if before else float("inf")
+        regression = ratio > threshold and after >= MIN_SECONDS
+        rows.append((key, before, after, ratio, regression))
+    return rows
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Comparaison de deux résultats du banc d'essai")
+    parser.add_argument("reference", type=Path)
+    parser.add_argument("candidate", type=Path)
+    parser.add_argument("--threshold", type=float, default=1.2, help="rapport de durée au-delà duquel on signale")
+    args = parser.parse_args(argv)
+
+    reference_meta, reference = load(args.reference)
+    candidate_meta, candidate = load(args.candidate)
+    print(f"Référence : {reference_meta.get('commit')} ({reference_meta.get('date')})")
+    print(f"Candidat  : {candidate_meta.get('commit')} ({candidate_meta.get('date')})")
+
+    rows = compare(reference, candidate, args.threshold)
+    for (dataset, size, stage), before, after, ratio, regression in rows:
+        flag = "  ⚠ régression" if regression else ""
+        print(f"{dataset:>7} {size:>9} {stage:<40} {before:9.4f} s → {after:9.4f} s  ×{ratio:5.2f}{flag}")
+    regressions = sum(row[-1] for row in rows)
+    print(f"{len(rows)} étapes comparées, {regressions} régression(s)")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
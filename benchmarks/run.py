@@ -0,0 +1,360 @@
+"""Banc d'essai des chemins critiques sur des jeux synthétiques, sans interface Streamlit.
+
+    python -m benchmarks.run --sizes 10000 100000 --output resultats.json
+    python -m benchmarks.compare reference.json resultats.json
+
+Chaque étape (démarrage, chargement, indexation, filtres, statistiques, export) est chronométrée `--repeat` fois ;
+les résultats sont écrits en JSON pour comparer deux exécutions (sur la sortie standard sans `--output`, la
+progression allant sur la sortie d'erreur).
+"""
+import argparse
+import datetime
+import inspect
+import io
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.synthetic import DATASETS, SIZES
+from core.cube import CapacityCube
+from core.dataset import Dataset
+from core.disk_cache import DatasetCache
+from core.export import EXPORT_FORMATS, export_file, export_filename
+from core.filters import FilterCache, evaluate
+from core.indexes import MODE_CONTAINS, MODE_PREFIX
+from core.ingest import read_upload
+from core.query import IDENTIFIER, PATTERN, Condition, duckdb_enabled
+from sections import autre_contrat, contrat_kelaa, postes
+
+try:
+    import resource
+except ImportError:  # Windows : pas de mesure du pic mémoire
+    resource = None
+
+# Scénario dont le résultat sert aux mesures d'export
+EXPORT_SCENARIO = {"kelaa": "categorie_etat", "autre": "categorie_etat", "postes": "type_commune"}
+
+# Au-delà, l'écriture du classeur source et l'export Excel prendraient plusieurs minutes par étape
+EXCEL_MAX_ROWS = 100_000
+
+
+class BenchmarkUpload(io.BytesIO):
+    """Équivalent minimal d'un fichier uploadé Streamlit (`name` et `getvalue()`)."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+
+def _unwrapped(function):
+    # Fonction d'origine sous `st.cache_data` et l'instrumentation : chaque répétition refait réellement le calcul
+    return inspect.unwrap(function)
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Octets sous macOS, kilo-octets sous Linux
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+class Recorder:
+    def __init__(self, repeat):
+        self.repeat = repeat
+        self.results = []
+
+    def time(self, dataset, size, stage, function, rows_in, repeat=None):
+        """Chronomètre `function` et enregistre la meilleure durée ; renvoie le résultat du dernier appel."""
+        durations = []
+        for _ in range(repeat or self.repeat):
+            start = time.perf_counter()
+            result = function()
+            durations.append(time.perf_counter() - start)
+        self.record(dataset, size, stage, durations, rows_in, _row_count(result))
+        return result
+
+    def record(self, dataset, size, stage, durations, rows_in=0, rows_out=None):
+        self.results.append({
+            "jeu": dataset,
+            "taille": size,
+            "etape": stage,
+            "lignes_entree": int(rows_in),
+            "lignes_sortie": rows_out,
+            "secondes": round(min(durations), 6),
+            "mediane": round(statistics.median(durations), 6),
+            "repetitions": len(durations),
+            "rss_max_mo": peak_rss_mb(),
+        })
+        print(f"{dataset:>7} {size:>9} {stage:<40} {min(durations):9.4f} s", file=sys.stderr, flush=True)
+
+
+def _row_count(result):
+    if isinstance(result, tuple):
+        result = result[0]
+    if isinstance(result, (pd.DataFrame, pd.Series, np.ndarray, list)) or hasattr(result, "__len__"):
+        try:
+            return len(result)
+        except TypeError:
+            return None
+    return None
+
+
+def bench_load(recorder, name, size, frame, workdir, excel_max_rows):
+    parquet = io.BytesIO()
+    frame.to_parquet(parquet, index=False)
+    data = parquet.getvalue()
+
+    def cold():
+        # Cache disque vide : lecture et normalisation complètes
+        cache = DatasetCache(tempfile.mkdtemp(dir=workdir), max_bytes=1 << 40)
+        return read_upload(BenchmarkUpload(data, f"{name}.parquet"), cache=cache)
+
+    loaded = recorder.time(name, size, "chargement_parquet", cold, len(frame))
+    cache = DatasetCache(tempfile.mkdtemp(dir=workdir), max_bytes=1 << 40)
+    read_upload(BenchmarkUpload(data, f"{name}.parquet"), cache=cache)
+    recorder.time(name, size, "chargement_parquet_cache", lambda: read_upload(
+        BenchmarkUpload(data, f"{name}.parquet"), cache=cache), len(frame))
+
+    if len(frame) <= excel_max_rows:
+        workbook = io.BytesIO()
+        frame.to_excel(workbook, index=False)
+        recorder.time(name, size, "chargement_excel", lambda: read_upload(
+            BenchmarkUpload(workbook.getvalue(), f"{name}.xlsx"),
+            cache=DatasetCache(tempfile.mkdtemp(dir=workdir), max_bytes=1 << 40)), len(frame), repeat=1)
+    return loaded
+
+
+def build_contract_dataset(section, frame, fingerprint):
+    dataset = Dataset(frame, fingerprint)
+    dataset.build_identifier_indexes(section.IDENTIFIER_COLUMNS)
+    dataset.build_text_indexes(section.TEXT_COLUMNS)
+    dataset.cube(section.CUBE_COLUMNS, section.CUBE_DATE_COLUMN)
+    section.query_engine(dataset)
+    return dataset
+
+
+def kelaa_scenarios(frame):
+    # Scénarios de recherche -> arguments de `contrat_kelaa.filter_data` (après le jeu et l'empreinte)
+    contrat = str(frame["N° de contrat"].iloc[len(frame) // 2])
+    return {
+        "aucun_filtre": ("", "", "", "", "", "", "Tous", "Tous", MODE_CONTAINS, False),
+        "nom": ("benali", "", "", "", "", "", "Tous", "Tous", MODE_CONTAINS, False),
+        "contrat_prefixe": ("", contrat[:4], "", "", "", "", "Tous", "Tous", MODE_PREFIX, False),
+        "contrat_sous_chaine": ("", contrat[2:6], "", "", "", "", "Tous", "Tous", MODE_CONTAINS, False),
+        "categorie_etat": ("", "", "", "", "", "", "BT Domestique", "Résilié", MODE_CONTAINS, False),
+        "nom_commune_approx": ("benaly mohamed", "", "", "", "", "sidi", "Tous", "Tous", MODE_CONTAINS, True),
+    }
+
+
+def autre_scenarios(frame):
+    contrat = str(frame["Numéro contrat"].iloc[len(frame) // 2])
+    base = {"search_code_agence": "", "search_nom_agence": "", "search_num_tournee": "", "search_num_contrat": "",
+            "search_nom_client": "", "search_prenom_client": "", "search_nom_commune": ""}
+    return {
+        "aucun_filtre": (base, "Tous", "Tous", MODE_CONTAINS, False),
+        "nom_agence": ({**base, "search_nom_agence": "BE-AS SIDI RAHAL"}, "Tous", "Tous", MODE_CONTAINS, False),
+        "contrat_prefixe": ({**base, "search_num_contrat": contrat[:4]}, "Tous", "Tous", MODE_PREFIX, False),
+        "client_commune": ({**base, "search_nom_client": "amrani", "search_nom_commune": "tamel"}, "Tous", "Tous",
+                           MODE_CONTAINS, False),
+        "categorie_etat": (base, "BT Domestique", "Résilié", MODE_CONTAINS, False),
+    }
+
+
+def postes_scenarios():
+    empty = {column: "" for column in postes.FILTER_COLUMNS}
+    return {
+        "aucun_filtre": empty,
+        "depart": {**empty, "NOMDEPART": "DEPART 1"},
+        "type_commune": {**empty, "TYPEPOSTE": "h6", "NOM COMMUNE": "sidi"},
+        "matricule": {**empty, "MATRICULE": "P00012"},
+    }
+
+
+# Frappe lettre par lettre d'une valeur du jeu : (type de condition, colonne) par jeu
+TYPING = {
+    "kelaa": (IDENTIFIER, "N° de contrat"),
+    "autre": (IDENTIFIER, "Numéro contrat"),
+    "postes": (PATTERN, "ADRESCIVIQ"),
+}
+
+
+def typing_conditions(name, frame):
+    kind, column = TYPING[name]
+    text = str(frame[column].iloc[len(frame) // 2])
+    return [[Condition(kind, column, text[:length])] for length in range(1, len(text) + 1)]
+
+
+def bench_typing(recorder, name, size, dataset, identifier_columns):
+    # Même suite de recherches évaluée à chaque fois sur tout le jeu, puis via le cache de raffinement
+    keystrokes = typing_conditions(name, dataset.frame)
+    recorder.time(name, size, "frappe:sans_raffinement",
+                  lambda: [evaluate(dataset, conditions, identifier_columns) for conditions in keystrokes],
+                  len(dataset))
+
+    def refine():
+        cache = FilterCache()
+        return [cache.select(dataset, conditions, identifier_columns) for conditions in keystrokes]
+    recorder.time(name, size, "frappe:raffinement", refine, len(dataset))
+
+
+def bench_contracts(recorder, name, size, frame, section, scenarios, stats):
+    dataset = recorder.time(name, size, "indexation", lambda: build_contract_dataset(section, frame, name),
+                            len(frame), repeat=1)
+    filter_data = _unwrapped(section.filter_data)
+    positions = None
+    for scenario, args in scenarios.items():
+        result = recorder.time(name, size, f"filtre:{scenario}",
+                               lambda: filter_data(dataset, dataset.fingerprint, *args), len(frame))
+        if scenario == EXPORT_SCENARIO[name]:
+            positions = result
+        if duckdb_enabled() and not args[-1]:
+            recorder.time(name, size, f"filtre_sql:{scenario}",
+                          lambda: section.select_rows(dataset, *args).positions(), len(frame))
+    bench_typing(recorder, name, size, dataset, section.IDENTIFIER_COLUMNS)
+    recorder.time(name, size, "statistiques", lambda: stats(dataset), len(frame))
+    return dataset, positions
+
+
+def kelaa_statistics(dataset):
+    # Agrégats affichés par `contrat_kelaa.show_stats`
+    cube = dataset.cube(contrat_kelaa.CUBE_COLUMNS, contrat_kelaa.CUBE_DATE_COLUMN)
+    return [cube.counts("Catégorie"), cube.counts("État"), cube.counts("Année", sort_by_count=False),
+            cube.crosstab("Commune", "Catégorie"), cube.crosstab("Année", "État")]
+
+
+def autre_statistics(dataset):
+    # Agrégats affichés par `autre_contrat.show_stats`, toutes régions puis une région
+    cube = dataset.cube(autre_contrat.CUBE_COLUMNS, autre_contrat.CUBE_DATE_COLUMN)
+    tables = []
+    for region in ["Toutes", "BE-AS SIDI RAHAL"]:
+        sub = cube.slice(Région=region)
+        tables += [sub.counts("Région"), sub.counts("Commune"), sub.counts("Catégorie"),
+                   sub.crosstab("Catégorie", "État"), sub.crosstab("Mois", "Commune")]
+    return tables
+
+
+def postes_statistics(frame):
+    # Agrégats affichés par `postes.show_stats` : passe unique sur les postes puis cumuls sur les cellules
+    cube = CapacityCube.build(frame, postes.CAPACITY_DIMENSIONS, postes.POWER_COLUMN)
+    return [cube.rollup(), cube.rollup(["NOMDEPART"]), cube.rollup(["NOM COMMUNE"]),
+            postes.postes_counts(cube, "NOMDEPART"), postes.postes_counts(cube, "NOM COMMUNE")]
+
+
+def bench_postes(recorder, size, frame):
+    name = "postes"
+    dataset = Dataset(frame, name)
+    positions = None
+    for scenario, filters in postes_scenarios().items():
+        conditions = [Condition(PATTERN, column, value) for column, value in filters.items()]
+        result = recorder.time(name, size, f"filtre:{scenario}", lambda: evaluate(dataset, conditions, {}), len(frame))
+        if scenario == EXPORT_SCENARIO[name]:
+            positions = result
+        if duckdb_enabled():
+            recorder.time(name, size, f"filtre_sql:{scenario}",
+                          lambda: postes.select_postes(dataset, filters).positions(), len(frame))
+    bench_typing(recorder, name, size, dataset, {})
+    recorder.time(name, size, "statistiques", lambda: postes_statistics(frame), len(frame))
+    return dataset, positions
+
+
+def bench_export(recorder, name, size, frame, positions, formats, excel_max_rows):
+    # Écriture sur disque, comme les exports préparés par l'application
+    selected = frame.iloc[positions] if positions is not None else frame
+    with tempfile.TemporaryDirectory() as folder:
+        for fmt in formats:
+            rows = selected.iloc[:excel_max_rows] if fmt == "Excel" else selected
+            path = Path(folder) / export_filename("export", fmt)
+            recorder.time(name, size, f"export:{fmt}", lambda: export_file(rows, fmt, path), len(rows), repeat=1)
+
+
+# Modules importés à la demande par app.py : premier import mesuré dans un interpréteur neuf
+STARTUP_MODULES = ["sections.contrat_kelaa", "sections.autre_contrat", "sections.postes", "plotly.express", "altair"]
+
+
+def bench_startup(recorder):
+    # Démarrage à froid : durée du premier import de chaque section, Streamlit déjà chargé comme dans le serveur
+    root = Path(__file__).resolve().parent.parent
+    for module in STARTUP_MODULES:
+        code = f"import time, streamlit; start = time.perf_counter(); import {module}; print(time.perf_counter() - start)"
+        durations = [float(subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                                          cwd=root).stdout) for _ in range(recorder.repeat)]
+        recorder.record("demarrage", 0, f"import:{module}", durations)
+
+
+def run(sizes, datasets, repeat, formats, excel_max_rows):
+    recorder = Recorder(repeat)
+    bench_startup(recorder)
+    with tempfile.TemporaryDirectory(prefix="electratrack-bench-") as workdir:
+        for size in sizes:
+            for name in datasets:
+                generate, rows = DATASETS[name]
+                raw = recorder.time(name, size, "generation", lambda: generate(rows(size)), rows(size), repeat=1)
+                frame = bench_load(recorder, name, size, raw, workdir, excel_max_rows)
+                del raw
+                if name == "kelaa":
+                    _, positions = bench_contracts(recorder, name, size, frame, contrat_kelaa, kelaa_scenarios(frame),
+                                                   kelaa_statistics)
+                elif name == "autre":
+                    _, positions = bench_contracts(recorder, name, size, frame, autre_contrat, autre_scenarios(frame),
+                                                   autre_statistics)
+                else:
+                    _, positions = bench_postes(recorder, size, frame)
+                bench_export(recorder, name, size, frame, positions, formats, excel_max_rows)
+    return recorder.results
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                cwd=Path(__file__).resolve().parent.parent).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "date": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "plateforme": platform.platform(),
+        "processeur": platform.processor() or platform.machine(),
+        "moteur_sql": duckdb_enabled(),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Banc d'essai ElectraTrack sur données synthétiques")
+    parser.add_argument("--sizes", nargs="+", default=["10000", "100000"],
+                        help=f"nombres de lignes, ou 'all' pour {', '.join(map(str, SIZES))}")
+    parser.add_argument("--datasets", nargs="+", default=list(DATASETS), choices=list(DATASETS))
+    parser.add_argument("--repeat", type=int, default=3, help="répétitions par étape (meilleure durée retenue)")
+    parser.add_argument("--formats", nargs="+", default=list(EXPORT_FORMATS), choices=list(EXPORT_FORMATS))
+    parser.add_argument("--excel-max-rows", type=int, default=EXCEL_MAX_ROWS,
+                        help="plafond de lignes pour le classeur source et l'export Excel")
+    parser.add_argument("--output", type=Path, help="fichier JSON de résultats (sortie standard sinon)")
+    args = parser.parse_args(argv)
+
+    sizes = SIZES if args.sizes == ["all"] else [int(size) for size in args.sizes]
+    # Les fonctions mises en cache par Streamlit signalent l'absence de serveur à chaque appel
+    for logger in ["streamlit", "streamlit.runtime.caching.cache_data_api"]:
+        logging.getLogger(logger).setLevel(logging.ERROR)
+    report = {"meta": metadata(), "resultats": run(sizes, args.datasets, args.repeat, args.formats,
+                                                     args.excel_max_rows)}
+    text = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
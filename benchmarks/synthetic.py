@@ -0,0 +1,103 @@
+import numpy as np
+import pandas as pd
+
+# Tailles de référence des jeux synthétiques
+SIZES = [10_000, 100_000, 1_000_000, 5_000_000]
+
+NOMS = np.array(["BENALI", "EL AMRANI", "AÏT OUAHMANE", "LAHCEN", "BEN HAMMOU", "ÉLOUFIR", "OUAZZANI", "EL IDRISSI",
+                 "BOUCHAIB", "ZAHIRI", "EL FASSI", "TAZI", "AMGHAR", "OUHADDOU", "CHERKAOUI", "BERRADA"])
+PRENOMS = np.array(["Mohamed", "Fatima", "Saïd", "Khadija", "Rachid", "Youssef", "Aïcha", "Hassan", "Naïma", "Abdellah",
+                    "Zineb", "Mustapha", "Hayat", "Brahim", "Meryem", "Lahcen"])
+COMMUNES = np.array(["El Kelâa des Sraghna", "Sidi Rahal", "Tamellalt", "Laattaouia", "Jbilet", "Zemrane", "Sidi Moussa",
+                     "Oulad Yaacoub", "Fraita", "Jouala", "Choara", "Dzouz", "Bouya Omar", "Ouled Msabbel"])
+CATEGORIES = np.array(["BT Domestique", "BT Patente", "BT Éclairage public", "BT Force motrice agricole",
+                       "BT Administration", "MT Industriel"])
+# Poids des catégories : le domestique domine comme dans les extractions réelles
+CATEGORY_WEIGHTS = np.array([0.72, 0.14, 0.03, 0.05, 0.04, 0.02])
+AGENCES = np.array(["BE-AS LAATAOUIA", "BE-AS SIDI RAHAL", "BE-AS TAMELLALT"])
+TYPES_POSTE = np.array(["CABINE", "H61", "H59", "PORTIQUE"])
+PUISSANCES = np.array([25, 50, 100, 160, 250, 400, 630, 1000])
+
+START = pd.Timestamp("1995-01-01")
+# Part des contrats résiliés et des contrats ayant une date de fin
+RESILIATION_RATE = 0.18
+END_DATE_RATE = 0.45
+
+
+def _numbers(rng, low, high, n, prefix=""):
+    return np.char.add(prefix, rng.integers(low, high, n).astype(str)).astype(object)
+
+
+def _dates(rng, n, days, start=START):
+    return start + pd.to_timedelta(rng.integers(0, days, n), unit="D")
+
+
+def _subscriptions(rng, n):
+    # Colonnes communes aux deux extractions de contrats : dates d'abonnement, de résiliation et de fin
+    debut = _dates(rng, n, (pd.Timestamp.today() - START).days)
+    resiliation = pd.Series(debut + pd.to_timedelta(rng.integers(30, 4000, n), unit="D"))
+    resiliation = resiliation.where((rng.random(n) < RESILIATION_RATE) & (resiliation < pd.Timestamp.today()))
+    fin = pd.Series(pd.Timestamp.today().normalize() + pd.to_timedelta(rng.integers(-365, 730, n), unit="D"))
+    return debut, resiliation, fin.where(rng.random(n) < END_DATE_RATE)
+
+
+def kelaa_contracts(n, seed=0):
+    """Extraction au format de l'agence El Kelaa Des Sraghna (colonnes de `contrat_kelaa`)."""
+    rng = np.random.default_rng(seed)
+    debut, resiliation, fin = _subscriptions(rng, n)
+    noms = np.char.add(np.char.add(NOMS[rng.integers(0, len(NOMS), n)], " "), PRENOMS[rng.integers(0, len(PRENOMS), n)])
+    return pd.DataFrame({
+        "N° de contrat": _numbers(rng, 10 ** 8, 10 ** 9, n),
+        "Numéro contrat": rng.integers(10 ** 9, 10 ** 10, n),
+        "cin": _numbers(rng, 10_000, 999_999, n, "EE"),
+        "ex contrat SA": pd.Series(rng.integers(10_000, 999_999, n)).where(rng.random(n) < 0.6),
+        "Nom de client titulaire": noms.astype(object),
+        "Commune": COMMUNES[rng.integers(0, len(COMMUNES), n)],
+        "Catégorie d'abonnement": CATEGORIES[rng.choice(len(CATEGORIES), n, p=CATEGORY_WEIGHTS)],
+        "Date de début": debut,
+        "Date de fin": fin,
+        "Date resiliation du contrat": resiliation,
+    })
+
+
+def regional_contracts(n, seed=1):
+    """Extraction au format des agences LAATAOUIA / SIDI RAHAL / TAMELLALT (colonnes de `autre_contrat`)."""
+    rng = np.random.default_rng(seed)
+    debut, resiliation, _ = _subscriptions(rng, n)
+    agences = rng.integers(0, len(AGENCES), n)
+    return pd.DataFrame({
+        "Code Agence (Abonnement)": np.char.add("AG", (agences + 101).astype(str)).astype(object),
+        "Nom Agence (Abonnement)": AGENCES[agences],
+        "Numéro de tournée": rng.integers(1, 400, n),
+        "Numéro contrat": _numbers(rng, 10 ** 8, 10 ** 9, n),
+        "Nom / raison sociale du client tit.": NOMS[rng.integers(0, len(NOMS), n)],
+        "Prenom du client titulaire": PRENOMS[rng.integers(0, len(PRENOMS), n)],
+        "Nom commune": COMMUNES[rng.integers(0, len(COMMUNES), n)],
+        "Libelle categorie facturation": CATEGORIES[rng.choice(len(CATEGORIES), n, p=CATEGORY_WEIGHTS)],
+        "Date creation abonnement": debut,
+        "Date resiliation du contrat": resiliation,
+    })
+
+
+def postes(n, seed=2):
+    """Inventaire des postes électriques (colonnes de `postes`) : environ 40 postes par départ."""
+    rng = np.random.default_rng(seed)
+    departs = np.char.add("DEPART ", np.arange(max(1, n // 40)).astype(str))
+    return pd.DataFrame({
+        "MATRICULE": np.char.add("P", np.char.zfill(np.arange(n).astype(str), 7)).astype(object),
+        "NOMDEPART": departs[rng.integers(0, len(departs), n)],
+        "NOM COMMUNE": COMMUNES[rng.integers(0, len(COMMUNES), n)],
+        "ADRESCIVIQ": np.char.add(np.char.add(rng.integers(1, 300, n).astype(str), " Rue "),
+                                  rng.integers(1, 80, n).astype(str)).astype(object),
+        "TYPEPOSTE": TYPES_POSTE[rng.integers(0, len(TYPES_POSTE), n)],
+        "PUISNOM": PUISSANCES[rng.integers(0, len(PUISSANCES), n)],
+    })
+
+
+# Jeu -> (générateur, nombre de lignes pour une taille de référence donnée)
+DATASETS = {
+    "kelaa": (kelaa_contracts, lambda size: size),
+    "autre": (regional_contracts, lambda size: size),
+    # Les inventaires de postes sont environ 20 fois plus petits que les fichiers de contrats
+    "postes": (postes, lambda size: max(1_000, size // 20)),
+}
@@ -0,0 +1,20 @@
+import streamlit as st
+
+from core.expiry import alert_report
+
+
+def alert_summary():
+    """Synthèse des alertes d'échéance et de résiliation de toutes les agences chargées dans la session.
+
+    Chaque compte est une recherche par dichotomie dans les index de dates : assez léger pour chaque page.
+    """
+    datasets = st.session_state.get("agency_data", {})
+    if not datasets:
+        return
+    report = alert_report(datasets)
+    if report.empty:
+        return
+    st.markdown("---")
+    st.subheader("🚨 Alertes contrats")
+    report["Agence"] = report["Agence"].str.removeprefix("Agence_")
+    st.dataframe(report, hide_index=True, use_container_width=True)
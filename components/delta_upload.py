@@ -0,0 +1,53 @@
+import streamlit as st
+
+from components.registry import shared_dataset
+from core.dataset import file_fingerprint
+from core.delta import combine_fingerprints
+from core.disk_cache import dataset_cache
+
+LOAD_FULL = "Remplacer le fichier"
+LOAD_DELTA = "Mise à jour incrémentale (delta)"
+
+
+def load_mode(has_data, key):
+    # Le mode delta n'a de sens que si un jeu de données est déjà chargé
+    if not has_data:
+        return LOAD_FULL
+    return st.radio("Type de chargement", [LOAD_FULL, LOAD_DELTA], horizontal=True, key=f"{key}_load_mode")
+
+
+def delta_upload(current, load, key_column, key):
+    """Applique un fichier delta au Dataset courant (lignes upsertées sur `key_column`) ; renvoie le Dataset à jour."""
+    delta_file = st.file_uploader(f"Uploader un fichier delta (Parquet ou Excel), lignes identifiées par « {key_column} »",
+                                  type=["parquet", "xlsx"], key=f"{key}_delta")
+    if delta_file is None:
+        st.info("Le fichier delta ne contient que les nouveaux abonnements, modifications et résiliations.")
+        return current
+
+    fingerprint = file_fingerprint(delta_file)
+    if fingerprint in current.deltas:
+        st.success(f"Delta déjà appliqué ✅ ({len(current)} lignes au total)")
+        return current
+
+    changes = {}
+
+    def build():
+        delta = load(delta_file)
+        updated, changes["delta"] = current.upsert(delta, key_column, fingerprint)
+        # Le jeu à jour se relit depuis le cache disque (base + delta) s'il doit être rechargé, voir Dataset.frame
+        dataset_cache.put_delta(updated.fingerprint, current.fingerprint, fingerprint, key_column)
+        return updated
+
+    try:
+        with st.spinner("Application du delta..."):
+            # Le même delta appliqué au même jeu par une autre session est déjà dans le registre
+            updated = shared_dataset(key, combine_fingerprints(current.fingerprint, fingerprint), build)
+    except KeyError as e:
+        st.error(f"Erreur lors de l'application du delta: {str(e)}")
+        return current
+    if "delta" in changes:
+        st.success(f"Delta appliqué ✅ : {len(changes['delta'].updated)} lignes mises à jour, "
+                   f"{len(changes['delta'].inserted)} ajoutées ({len(updated)} lignes au total)")
+    else:
+        st.success(f"Delta appliqué ✅ ({len(updated)} lignes au total)")
+    return updated
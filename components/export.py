@@ -0,0 +1,43 @@
+import streamlit as st
+
+from core.profiling import computed, instrumented
+from core.export import EXPORT_FORMATS, export_filename, export_files, export_mime
+from core.query import selected_positions
+
+
+@computed
+def _rows(frame, positions):
+    # Les lignes retenues ne sont extraites qu'au moment d'écrire le fichier
+    return frame if positions is None else frame.iloc[selected_positions(positions)]
+
+
+@instrumented("export.build_export", cached=True)
+def build_export(frame, state_key, fmt, positions=None):
+    """Chemin du fichier d'export sur disque pour l'état `state_key` (empreinte du jeu + état des filtres) :
+    écrit une fois, puis resservi tant qu'il n'est pas évincé (`core.export.ExportFiles`)."""
+    return export_files.get(state_key, fmt, lambda: _rows(frame, positions))
+
+
+def export_panel(frame, state_key, file_stem, key, label="📥 Télécharger les résultats filtrés", positions=None):
+    """Export à la demande : rien n'est généré tant que l'utilisateur ne le demande pas pour l'état de filtres courant."""
+    col1, col2 = st.columns([1, 3])
+    fmt = col1.selectbox("Format d'export", list(EXPORT_FORMATS), key=f"{key}_format")
+
+    prepared = st.session_state.setdefault("prepared_exports", {})
+    request = (state_key, fmt)
+    if prepared.get(key) != request:
+        with col2:
+            if st.button("📦 Préparer l'export", key=f"{key}_prepare"):
+                prepared[key] = request
+
+    if prepared.get(key) == request:
+        with col2:
+            with st.spinner("Préparation de l'export..."):
+                path = build_export(frame, state_key, fmt, positions)
+            # Fichier ouvert (accepté par toutes les versions de Streamlit prises en charge), refermé aussitôt
+            with open(path, "rb") as handle:
+                st.download_button(label,
+                                   data=handle,
+                                   file_name=export_filename(file_stem, fmt),
+                                   mime=export_mime(fmt),
+                                   key=f"{key}_download")
@@ -0,0 +1,110 @@
+import datetime
+
+import streamlit as st
+
+from core.history import MONTH, YEAR, history_store, year_over_year
+from core.query import EQUALS, Condition
+
+
+def _signature(extracts):
+    # Identifie l'état de l'historique dans les clés de cache : un extrait archivé ou remplacé l'invalide
+    return tuple((extract.year, extract.month, extract.fingerprint, extract.rows) for extract in extracts)
+
+
+@st.cache_data(show_spinner="Lecture de l'historique...", max_entries=32)
+def _counts(agency, column, months, conditions, signature):
+    return history_store.counts(agency, column, months=months, conditions=conditions)
+
+
+@st.cache_data(show_spinner="Recherche dans l'historique...", max_entries=32)
+def _search(agency, conditions, identifier_columns, columns, years, signature):
+    return history_store.search(agency, conditions, list(columns), dict(identifier_columns), years)
+
+
+def _label(extract):
+    return f"{extract.month:02d}/{extract.year} — {extract.rows:,} lignes".replace(",", " ")
+
+
+def archive_panel(agency, dataset, key):
+    # Archive le jeu chargé comme extrait mensuel de l'agence (un extrait par mois, remplacé s'il existe)
+    with st.expander("🗄 Archiver cet extrait dans l'historique"):
+        today = datetime.date.today()
+        col1, col2 = st.columns(2)
+        year = col1.number_input("Année de l'extrait", min_value=2000, max_value=2100, value=today.year,
+                                 key=f"{key}_archive_year")
+        month = col2.selectbox("Mois de l'extrait", list(range(1, 13)), index=today.month - 1,
+                               key=f"{key}_archive_month")
+        if history_store.extracts(agency, years=[year], months=[month]):
+            st.caption("Un extrait existe déjà pour ce mois : il sera remplacé.")
+        if st.button("Archiver", key=f"{key}_archive"):
+            extract = history_store.add(agency, year, month, dataset.frame, dataset.fingerprint)
+            st.success(f"Extrait archivé : {_label(extract)}")
+
+
+def pick_extract(agency, key):
+    """Extrait archivé choisi pour être chargé à la place d'un fichier (None tant que rien n'est demandé)."""
+    extracts = history_store.extracts(agency)
+    if not extracts:
+        return None
+    with st.expander("🗄 Charger un extrait de l'historique"):
+        extract = st.selectbox("Extrait archivé", extracts[::-1], format_func=_label, key=f"{key}_extract")
+        if st.button("Charger cet extrait", key=f"{key}_load_extract"):
+            return extract
+    return None
+
+
+def search_panel(agency, conditions, identifier_columns, columns, key):
+    """Filtres du tableau (`conditions`, core.query.Condition) appliqués aux extraits archivés sans les charger :
+    le prédicat est évalué par le lecteur Parquet, sur les seules années choisies et les seules colonnes utiles.
+    Rien n'est lu tant que l'utilisateur ne lance pas la recherche pour les filtres et années courants."""
+    extracts = history_store.extracts(agency)
+    if not extracts:
+        return
+    with st.expander(f"🗄 Rechercher ces filtres dans l'historique ({len(extracts)} extraits)"):
+        if not any(condition.value for condition in conditions):
+            st.caption("Saisissez au moins un filtre pour le rechercher dans les extraits archivés.")
+            return
+        available = sorted({extract.year for extract in extracts}, reverse=True)
+        years = st.multiselect("Années", available, default=available, key=f"{key}_history_years")
+        if not years:
+            return
+        selected = [extract for extract in extracts if extract.year in years]
+        request = (tuple(conditions), tuple(sorted(years)), _signature(selected))
+
+        # Recherche lancée explicitement : la saisie d'un filtre ne relit pas les extraits à chaque frappe
+        submitted = st.session_state.setdefault("history_searches", {})
+        if submitted.get(key) != request:
+            if not st.button("🔎 Rechercher dans l'historique", key=f"{key}_history_search"):
+                return
+            submitted[key] = request
+        conditions, years, signature = request
+        result = _search(agency, conditions, tuple(identifier_columns.items()), tuple(columns), years, signature)
+        st.caption(f"{len(result)} ligne(s) trouvée(s)")
+        st.dataframe(result.rename(columns={YEAR: "Année", MONTH: "Mois"}), hide_index=True,
+                     use_container_width=True)
+
+
+def comparison_panel(agency, dimensions, key, state_column=None, states=()):
+    """Comparaison d'une année sur l'autre pour un même mois, calculée sur l'historique archivé : seules
+    la colonne de la dimension choisie (et celle de l'état, si restreint) des extraits de ce mois sont lues."""
+    st.markdown("#### 📅 Comparaison annuelle (historique)")
+    extracts = history_store.extracts(agency)
+    if len({extract.year for extract in extracts}) < 2:
+        st.info("Archivez des extraits d'au moins deux années différentes pour les comparer.")
+        return
+    col1, col2, col3 = st.columns(3)
+    name = col1.selectbox("Dimension", list(dimensions), key=f"{key}_yoy_dimension")
+    months = sorted({extract.month for extract in extracts})
+    month = col2.selectbox("Mois comparé", months, index=months.index(extracts[-1].month), key=f"{key}_yoy_month")
+    state = "Tous"
+    if state_column:
+        # Restriction poussée au lecteur Parquet : seules les lignes de cet état sont comptées
+        state = col3.selectbox("État du contrat", ["Tous"] + list(states), key=f"{key}_yoy_state")
+    conditions = (Condition(EQUALS, state_column, state),) if state != "Tous" else ()
+    column = dimensions[name]
+    selected = [extract for extract in extracts if extract.month == month]
+    table = year_over_year(_counts(agency, column, (month,), conditions, _signature(selected)), column, month)
+    if table.empty:
+        st.info(f"La colonne '{column}' n'existe pas dans les extraits archivés.")
+        return
+    st.dataframe(table.rename_axis(name), use_container_width=True)
@@ -0,0 +1,44 @@
+import streamlit as st
+
+from core.load import COMMUNE, FEEDER, LOAD_INDEX, load_tables, postes_side
+from core.profiling import computed, instrumented
+
+
+@instrumented("load.load_tables", cached=True)
+@st.cache_data(show_spinner="Calcul de la charge des départs...", max_entries=8)
+@computed
+def _tables(_contracts, _postes, state_key):
+    # `state_key` (empreintes des jeux de contrats et des postes) tient lieu de clé de cache : seule la jointure,
+    # sur quelques milliers de cellules, est recalculée quand l'un des deux côtés change
+    return load_tables([load.cells for load in _contracts], postes_side(_postes.rollup([COMMUNE, FEEDER])))
+
+
+def load_panel(agency_data, postes_dataset, cube):
+    """Charge des départs et des communes : contrats des agences chargées rapportés à la puissance installée.
+
+    `cube` : agrégats de puissance du jeu des postes (`CapacityCube`), avec NOM COMMUNE et NOMDEPART.
+    """
+    st.subheader("⚡ Charge des départs et des communes")
+    if not agency_data:
+        st.info("Chargez les contrats d'au moins une agence pour les rapprocher des postes.")
+        return
+    if COMMUNE not in cube or FEEDER not in cube:
+        st.warning(f"Les colonnes '{COMMUNE}' ou '{FEEDER}' n'existent pas dans les données des postes.")
+        return
+    names = sorted(agency_data)
+    state_key = (tuple(agency_data[name].fingerprint for name in names), postes_dataset.fingerprint)
+    communes, feeders = _tables(tuple(agency_data[name].contract_load() for name in names), cube, state_key)
+    st.caption(f"Contrats de : {', '.join(name.removeprefix('Agence_') for name in names)}. "
+               f"{LOAD_INDEX} : contrats en service par unité de puissance installée, 1 correspondant à la moyenne "
+               "des communes présentes dans les deux fichiers.")
+
+    st.markdown("#### Par départ (NOMDEPART)")
+    st.caption("Les contrats ne portent pas de départ : ceux de chaque commune sont répartis entre ses départs "
+               "au prorata de leur puissance installée dans la commune.")
+    st.dataframe(feeders, use_container_width=True)
+
+    st.markdown("#### Par commune")
+    unmatched = communes[LOAD_INDEX].isna().sum()
+    if unmatched:
+        st.caption(f"{unmatched} commune(s) sans correspondance entre contrats et postes (sans indice de charge).")
+    st.dataframe(communes, use_container_width=True)
@@ -0,0 +1,35 @@
+import pandas as pd
+import streamlit as st
+
+from core.ingest import format_bytes
+from core.registry import dataset_registry
+
+
+def memory_panel():
+    """Mémoire occupée par chaque jeu de la session (barre latérale), après application du budget mémoire :
+    à appeler en fin de script, une fois le jeu consulté pendant cette exécution marqué comme récent."""
+    dataset_registry.enforce_budget()
+    datasets = dict(st.session_state.get("agency_data", {}))
+    if st.session_state.get("postes_data") is not None:
+        datasets["Postes"] = st.session_state.postes_data
+    if not datasets:
+        return
+    entries = {entry.fingerprint: entry for entry in dataset_registry.entries()}
+    rows = []
+    for name, dataset in datasets.items():
+        entry = entries.get(dataset.fingerprint)
+        rows.append({
+            "Jeu": name.removeprefix("Agence_"),
+            "Lignes": len(dataset),
+            "Mémoire": format_bytes(entry.nbytes) if entry is not None else "—",
+            "État": "En mémoire" if dataset.resident else "Sur disque",
+        })
+    st.markdown("---")
+    st.subheader("💾 Mémoire des données")
+    st.dataframe(pd.DataFrame(rows), hide_index=True, use_container_width=True)
+    used = format_bytes(dataset_registry.memory_usage())
+    if dataset_registry.budget:
+        st.caption(f"{used} en mémoire sur un budget de {format_bytes(dataset_registry.budget)} (toutes sessions) ; "
+                   "les jeux inactifs sont déportés sur disque et relus à la demande.")
+    else:
+        st.caption(f"{used} en mémoire (toutes sessions), sans budget.")
@@ -0,0 +1,53 @@
+import streamlit as st
+
+from core.pagination import SortedPager
+from core.profiling import computed, instrumented
+from core.query import QueryPager, QuerySelection
+
+NO_SORT = "(aucun)"
+PAGE_SIZES = [10, 25, 50, 100]
+
+
+@instrumented("pagination.get_pager", cached=True)
+@st.cache_resource(max_entries=32, show_spinner=False)
+@computed
+def get_pager(_frame, state_key, sort_column, ascending, _positions=None, _order=None):
+    # Une permutation de tri par (résultat filtré, colonne, sens) ; `state_key` identifie `_frame` et `_positions`.
+    # Le pager ne garde ni `_frame` ni le moteur SQL : le jeu reste déportable sur disque même après affichage
+    if isinstance(_positions, QuerySelection):
+        _positions = _positions.positions()
+    return SortedPager(_frame, sort_column, ascending, _positions, _order)
+
+
+def paginated_table(frame, state_key, key, default_sort=None, ascending=False, positions=None, dataset=None):
+    """Tableau paginé : tri et taille de page au choix, seules les lignes de la page courante sont extraites.
+
+    Avec `dataset`, une permutation de tri déjà préchauffée pour la colonne choisie est réutilisée."""
+    columns = [NO_SORT] + [str(column) for column in frame.columns]
+    default_index = columns.index(default_sort) if default_sort in columns else 0
+
+    col1, col2, col3, col4 = st.columns([2, 1, 1, 1])
+    sort_column = col1.selectbox("Trier par", columns, index=default_index, key=f"{key}_sort")
+    order = col2.selectbox("Ordre", ["Décroissant", "Croissant"], index=1 if ascending else 0, key=f"{key}_order")
+    page_size = col3.selectbox("Lignes par page", PAGE_SIZES, key=f"{key}_page_size")
+
+    sort_column = None if sort_column == NO_SORT else sort_column
+    ascending = order == "Croissant"
+    # Sans permutation prête, le pager trie lui-même les lignes retenues plutôt que d'attendre le préchauffage
+    ready = dataset is not None and dataset.has(("tri", sort_column, ascending))
+    if isinstance(positions, QuerySelection) and (sort_column is None or sort_column in positions.engine.sortable):
+        # Pages SQL (LIMIT/OFFSET) : rien à précalculer, le pager est recréé à chaque exécution au lieu d'être
+        # mis en cache avec le moteur (et sa copie Arrow du jeu) qu'il interroge
+        pager = QueryPager(positions, sort_column, ascending)
+    else:
+        pager = get_pager(frame, state_key, sort_column, ascending, positions,
+                          dataset.sort_order(sort_column, ascending) if ready else None)
+    total_pages = pager.page_count(page_size)
+    # Un nouveau filtrage peut réduire le nombre de pages : on ramène la page courante dans les bornes
+    page_key = f"{key}_page"
+    if st.session_state.get(page_key, 1) > total_pages:
+        st.session_state[page_key] = total_pages
+    page_number = col4.number_input("Page:", min_value=1, max_value=total_pages, value=1, key=page_key)
+
+    st.dataframe(pager.page(frame, page_number, page_size), use_container_width=True)
+    st.caption(f"Page {page_number} / {total_pages} — {len(pager)} lignes")
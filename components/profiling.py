@@ -0,0 +1,71 @@
+import time
+
+import pandas as pd
+import streamlit as st
+
+from core.ingest import format_bytes
+from core.profiling import finish_run, records_to_csv, records_to_json, start_run
+from core.startup import mark_first_paint, mark_started, startup_report
+
+# Nombre d'exécutions conservées par session pour l'export
+RUN_HISTORY = 200
+
+
+def begin_run(started):
+    # À appeler en début de script, avec l'heure (`time.perf_counter`) relevée en tête d'app.py : la case est lue
+    # dans l'état de session, avant d'être affichée par le panneau
+    mark_started(started)
+    st.session_state["run_started"] = started
+    finish_run()
+    if st.session_state.get("perf_enabled", False):
+        st.session_state["perf_run_count"] = st.session_state.get("perf_run_count", 0) + 1
+        start_run(st.session_state["perf_run_count"])
+
+
+def _display(records):
+    table = pd.DataFrame(records)
+    table["fonction"] = ["  " * depth + name for depth, name in zip(table["profondeur"], table["fonction"])]
+    table["memoire_delta"] = [None if pd.isna(delta) else ("-" if delta < 0 else "+") + format_bytes(abs(delta))
+                              for delta in table["memoire_delta"]]
+    return table.drop(columns=["execution", "profondeur"])
+
+
+def _startup_caption():
+    report = startup_report()
+    imports = ", ".join(f"{name.rsplit('.', 1)[-1]} {seconds:.2f} s" for name, seconds in report["imports_s"].items())
+    return (f"Démarrage : premier affichage du processus en {report['premier_affichage_s']:.2f} s, "
+            f"de cette session en {st.session_state['first_paint_s']:.2f} s"
+            + (f" ; premiers imports de sections : {imports}" if imports else ""))
+
+
+def performance_panel():
+    """Panneau de mesures optionnel (barre latérale), à appeler en fin de script.
+
+    La fin de la première exécution (du processus, de la session) est relevée comme premier affichage."""
+    mark_first_paint()
+    st.session_state.setdefault("first_paint_s", time.perf_counter() - st.session_state["run_started"])
+    st.checkbox("⏱ Mesures de performance", key="perf_enabled",
+                help="Durée, lignes, cache et mémoire de chaque étape, à chaque exécution de la page")
+    run = finish_run()
+    if run is None:
+        return
+
+    history = st.session_state.setdefault("perf_runs", [])
+    history.append(run.records())
+    del history[:-RUN_HISTORY]
+
+    st.markdown(f"**Exécution n°{run.number}** : {time.time() - run.started:.3f} s au total")
+    st.caption(_startup_caption())
+    if run.spans:
+        st.dataframe(_display(run.records()), hide_index=True, use_container_width=True)
+    else:
+        st.caption("Aucune étape instrumentée dans cette exécution.")
+    st.caption("Mémoire : variation de la mémoire résidente du processus (toutes sessions confondues).")
+
+    records = [record for run_records in history for record in run_records]
+    col1, col2 = st.columns(2)
+    col1.download_button("JSON", records_to_json(records), file_name="mesures_performance.json",
+                         mime="application/json", key="perf_json")
+    col2.download_button("CSV", records_to_csv(records), file_name="mesures_performance.csv", mime="text/csv",
+                         key="perf_csv")
+    st.caption(f"{len(history)} exécution(s) enregistrée(s) dans cette session")
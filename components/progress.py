@@ -0,0 +1,20 @@
+from contextlib import contextmanager
+
+import streamlit as st
+
+from core.excel_stream import describe_progress
+
+
+@contextmanager
+def ingest_progress(label):
+    """Barre de progression de la lecture par blocs : fournit le rappel à passer à `read_upload`."""
+    bar = st.progress(0.0, text=label)
+
+    def update(rows_read, expected, elapsed):
+        share, text = describe_progress(rows_read, expected, elapsed)
+        bar.progress(share if share is not None else 0.0, text=f"{label} : {text}")
+
+    try:
+        yield update
+    finally:
+        bar.empty()
@@ -0,0 +1,55 @@
+from contextlib import contextmanager
+
+import streamlit as st
+
+from core.disk_cache import DatasetUnavailable
+from core.ingest import format_bytes
+from core.registry import dataset_registry
+
+
+def shared_dataset(slot, fingerprint, build):
+    """Dataset partagé du registre pour l'emplacement `slot` de la session (agence, postes) ;
+    la référence vers l'ancien jeu de l'emplacement est libérée."""
+    leases = st.session_state.setdefault("dataset_leases", {})
+    lease = leases.get(slot)
+    if lease is None or lease.fingerprint != fingerprint:
+        new_lease = dataset_registry.acquire(fingerprint, build)
+        if lease is not None:
+            lease.release()
+        leases[slot] = lease = new_lease
+    return lease.dataset
+
+
+def forget_dataset(fingerprint):
+    """Retire de la session et du registre un jeu dont les données sont introuvables (`DatasetUnavailable`)."""
+    dataset_registry.discard(fingerprint)
+    leases = st.session_state.get("dataset_leases", {})
+    for slot, lease in list(leases.items()):
+        if lease.fingerprint == fingerprint:
+            del leases[slot]
+    agency_data = st.session_state.get("agency_data", {})
+    for agency, dataset in list(agency_data.items()):
+        if dataset.fingerprint == fingerprint:
+            del agency_data[agency]
+    postes_data = st.session_state.get("postes_data")
+    if postes_data is not None and postes_data.fingerprint == fingerprint:
+        st.session_state.postes_data = None
+
+
+@contextmanager
+def unavailable_datasets():
+    # Un jeu déporté dont les données ont disparu du disque est retiré ; l'utilisateur est invité à le recharger
+    try:
+        yield
+    except DatasetUnavailable as e:
+        forget_dataset(e.fingerprint)
+        st.error(str(e))
+
+
+def sharing_caption(fingerprint):
+    entries = {entry.fingerprint: entry for entry in dataset_registry.entries()}
+    entry = entries.get(fingerprint)
+    if entry is None:
+        return ""
+    return (f"Jeu partagé par {entry.references} session(s) : {format_bytes(entry.nbytes)} "
+            f"— {len(entries)} jeu(x) en mémoire, {format_bytes(dataset_registry.memory_usage())} au total")
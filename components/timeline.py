@@ -0,0 +1,75 @@
+import streamlit as st
+
+from core.chart_data import CHART_ROW_BUDGET, MAX_SLICES, distinct_label
+from core.cube import GRANULARITIES, MONTH, NET_GROWTH, PERIOD, SUBSCRIPTIONS, TERMINATIONS
+
+MEASURES = [SUBSCRIPTIONS, TERMINATIONS, NET_GROWTH]
+NO_DETAIL = "Aucun"
+
+
+def _fold_groups(table, by, measure):
+    # Valeurs de `by` au-delà des plus fortes (en volume sur la plage) regroupées dans "Autres"
+    order = table[measure].abs().groupby(table[by], observed=True).sum().sort_values(ascending=False, kind="stable")
+    kept = set(order.index if len(order) <= MAX_SLICES else order.index[:MAX_SLICES - 1])
+    labels = table[by].astype(object).where(table[by].isin(kept), distinct_label(kept)).astype(str)
+    return table.assign(**{by: labels}).groupby([PERIOD, by], observed=True)[MEASURES].sum().reset_index()
+
+
+def _recent(table, periods):
+    # Budget de lignes du graphique : seules les `periods` dernières périodes sont tracées
+    last = table[PERIOD].drop_duplicates().nlargest(periods)
+    return table[table[PERIOD].isin(last)]
+
+
+def timeline_panel(rollup, key, **filters):
+    """Abonnements, résiliations et croissance nette à la granularité et sur la plage choisies, calculés sur
+    le cumul chronologique du jeu (`TimeRollup`) ; `filters` restreint les dimensions (ex. Région)."""
+    # Bibliothèque de graphiques importée à la première page de statistiques, pas au démarrage
+    import plotly.express as px
+    span = rollup.span()
+    if span is None:
+        st.info("Aucune date d'abonnement ou de résiliation dans les données.")
+        return
+    col1, col2, col3 = st.columns(3)
+    granularity = col1.selectbox("Granularité", GRANULARITIES, index=GRANULARITIES.index(MONTH),
+                                 key=f"{key}_granularity")
+    dates = col2.date_input("Plage de dates", value=(span[0].date(), span[1].date()), min_value=span[0].date(),
+                            max_value=span[1].date(), key=f"{key}_range")
+    # Pendant la saisie de la plage, seule la date de début est connue
+    start, end = (dates[0], dates[1]) if len(dates) == 2 else (dates[0], span[1])
+    dimensions = [dimension for dimension in rollup.dimensions if filters.get(dimension) in (None, "Toutes")]
+    detail = col3.selectbox("Détailler par", [NO_DETAIL] + dimensions, key=f"{key}_detail")
+    by = None if detail == NO_DETAIL else detail
+
+    table = rollup.series(granularity, start, end, by=by, **filters)
+    if table.empty:
+        st.info("Aucun abonnement ni résiliation sur cette plage.")
+        return
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Abonnements", f"{table[SUBSCRIPTIONS].sum():,}".replace(",", " "))
+    col2.metric("Résiliations", f"{table[TERMINATIONS].sum():,}".replace(",", " "))
+    col3.metric("Croissance nette", f"{table[NET_GROWTH].sum():+,}".replace(",", " "))
+
+    if by is None:
+        periods = CHART_ROW_BUDGET
+        chart = _recent(table, periods)
+        fig = px.bar(chart, x=PERIOD, y=[SUBSCRIPTIONS, TERMINATIONS], barmode="group",
+                     labels={"value": "Nombre", "variable": "Mouvement"},
+                     title=f"Abonnements et résiliations par {granularity.lower()}")
+        st.plotly_chart(fig, use_container_width=True)
+        fig_net = px.line(chart, x=PERIOD, y=NET_GROWTH, markers=len(chart) <= 60,
+                          title=f"Croissance nette par {granularity.lower()}")
+        st.plotly_chart(fig_net, use_container_width=True)
+    else:
+        measure = st.radio("Mesure", MEASURES, horizontal=True, key=f"{key}_measure")
+        chart = _fold_groups(table, by, measure)
+        periods = max(1, CHART_ROW_BUDGET // chart[by].nunique())
+        chart = _recent(chart, periods)
+        fig = px.line(chart, x=PERIOD, y=measure, color=by, title=f"{measure} par {granularity.lower()} et {by}")
+        st.plotly_chart(fig, use_container_width=True)
+    if table[PERIOD].nunique() > periods:
+        st.caption(f"Seules les {periods} dernières périodes sont tracées : réduisez la plage ou choisissez "
+                   "une granularité plus large pour voir l'ensemble.")
+
+    with st.expander("Données de l'évolution"):
+        st.dataframe(table, hide_index=True, use_container_width=True)
@@ -0,0 +1,19 @@
+import streamlit as st
+
+from core.warming import current_warmup
+
+
+def warming_status(dataset):
+    """Avancement du préchauffage en tâche de fond ; rien n'est affiché une fois tout prêt."""
+    warmup = current_warmup(dataset)
+    if warmup is None:
+        return
+    pending = warmup.pending()
+    if pending:
+        done = len(warmup) - len(pending)
+        st.progress(done / len(warmup),
+                    text=f"Préparation en arrière-plan ({done}/{len(warmup)}) : {', '.join(pending)}")
+        st.caption("Les vues restent disponibles : une structure pas encore prête est calculée à la demande.")
+    errors = warmup.errors()
+    if errors:
+        st.caption(f"Préparation interrompue pour : {', '.join(errors)} — calcul à la demande.")
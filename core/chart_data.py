@@ -0,0 +1,53 @@
+import pandas as pd
+
+OTHER = "Autres"
+
+# Nombre maximal de parts (camemberts) et de barres affichées avant regroupement dans "Autres"
+MAX_SLICES = 10
+MAX_BARS = 30
+# Budget de lignes envoyées au navigateur par graphique
+CHART_ROW_BUDGET = 500
+
+
+def distinct_label(kept, label=OTHER):
+    """Libellé du regroupement distinct des libellés conservés `kept` : une vraie catégorie "Autres" parmi
+    les plus grandes reste une barre à part, et le regroupement devient "Autres (regroupés)"."""
+    kept = {str(value) for value in kept}
+    candidate, suffix = label, 1
+    while candidate in kept:
+        candidate = f"{label} (regroupés)" if suffix == 1 else f"{label} (regroupés {suffix})"
+        suffix += 1
+    return candidate
+
+
+def fold_tail(counts, top_n, other_label=OTHER):
+    """Garde les `top_n` plus grandes valeurs d'une série agrégée et regroupe le reste sous `other_label`
+    (rendu distinct des valeurs conservées, voir `distinct_label`)."""
+    counts = counts.sort_values(ascending=False, kind="stable")
+    counts.index = counts.index.astype(str)
+    if len(counts) <= top_n:
+        return counts
+    head = counts.iloc[:top_n - 1]
+    tail = pd.Series([counts.iloc[top_n - 1:].sum()], index=[distinct_label(head.index, other_label)])
+    return pd.concat([head, tail]).rename_axis(counts.index.name).rename(counts.name)
+
+
+def chart_frame(counts, label, value, top_n, other_label=OTHER):
+    # Série agrégée -> DataFrame (libellé, valeur) prêt à tracer, avec regroupement de la traîne
+    top_n = min(top_n, CHART_ROW_BUDGET)
+    folded = fold_tail(counts, top_n, other_label)
+    return pd.DataFrame({label: folded.index, value: folded.to_numpy()})
+
+
+def chart_frame_2d(frame, label, group, value, top_n, other_label=OTHER):
+    """Données agrégées à deux dimensions (barres empilées) : les libellés au-delà des `top_n` premiers
+    (par total) sont regroupés, et `top_n` est réduit pour tenir dans le budget de lignes."""
+    groups = max(1, frame[group].nunique())
+    top_n = max(1, min(top_n, CHART_ROW_BUDGET // groups))
+    totals = frame.groupby(label, observed=True)[value].sum().sort_values(ascending=False, kind="stable")
+    kept = set(totals.index[:top_n - 1]) if len(totals) > top_n else set(totals.index)
+    other_label = distinct_label(kept, other_label)
+    labels = frame[label].astype(object).where(frame[label].isin(kept), other_label).astype(str)
+    folded = (frame.assign(**{label: labels, group: frame[group].astype(str)})
+              .groupby([label, group], observed=True)[value].sum().reset_index())
+    return folded
@@ -0,0 +1,294 @@
+import numpy as np
+import pandas as pd
+
+COUNT = "Nombre"
+YEAR = "Année"
+MONTH = "Mois"
+
+
+class ContractCube:
+    """Cube d'agrégats des contrats : une ligne par combinaison observée des dimensions, avec son nombre de contrats.
+
+    Les statistiques (répartitions, tableaux croisés, métriques) se calculent sur ces quelques milliers
+    de cellules au lieu des lignes brutes.
+    """
+
+    def __init__(self, cells, dimensions, columns=None, date_column=None):
+        self.cells = cells
+        self.dimensions = dimensions
+        self.columns = columns or {}
+        self.date_column = date_column
+
+    @classmethod
+    def build(cls, frame, columns, date_column=None):
+        # `columns` associe un nom de dimension (Région, Commune, ...) à sa colonne dans `frame`
+        keys = {name: frame[column] for name, column in columns.items() if column in frame.columns}
+        if date_column in frame.columns:
+            dates = frame[date_column]
+            keys[YEAR] = dates.dt.year.astype("Int16")
+            keys[MONTH] = dates.dt.month.astype("Int8")
+        dimensions = list(keys)
+        if not dimensions:
+            cells = pd.DataFrame({COUNT: [len(frame)]})
+        else:
+            cells = (pd.DataFrame(keys)
+                     .groupby(dimensions, observed=True, dropna=False).size()
+                     .rename(COUNT).reset_index())
+        return cls(cells, dimensions, columns, date_column)
+
+    def apply_delta(self, removed, added):
+        # Mise à jour incrémentale : les comptes sont additifs, on retranche les anciennes lignes et on ajoute les nouvelles
+        before = ContractCube.build(removed, self.columns, self.date_column).cells
+        after = ContractCube.build(added, self.columns, self.date_column).cells
+        if not self.dimensions:
+            cells = pd.DataFrame({COUNT: [self.total() - before[COUNT].sum() + after[COUNT].sum()]})
+            return ContractCube(cells, self.dimensions, self.columns, self.date_column)
+        before[COUNT] = -before[COUNT]
+        cells = pd.concat([self.cells, before, after], ignore_index=True)
+        for dimension in self.dimensions:
+            if isinstance(self.cells[dimension].dtype, pd.CategoricalDtype):
+                cells[dimension] = cells[dimension].astype(object)
+        cells = (cells.groupby(self.dimensions, observed=True, dropna=False)[COUNT].sum()
+                 .reset_index())
+        cells = cells[cells[COUNT] != 0].reset_index(drop=True)
+        return ContractCube(cells, self.dimensions, self.columns, self.date_column)
+
+    def __contains__(self, dimension):
+        return dimension in self.dimensions
+
+    def slice(self, **filters):
+        # Sous-cube restreint aux valeurs données ; None ou "Toutes" laissent la dimension libre
+        cells = self.cells
+        for dimension, value in filters.items():
+            if value is not None and value != "Toutes" and dimension in self.dimensions:
+                cells = cells[cells[dimension] == value]
+        return ContractCube(cells, self.dimensions, self.columns, self.date_column)
+
+    def total(self):
+        return int(self.cells[COUNT].sum())
+
+    def count(self, dimension, value):
+        return int(self.cells.loc[self.cells[dimension] == value, COUNT].sum())
+
+    def counts(self, dimension, sort_by_count=True):
+        # Équivalent de `value_counts` sur la dimension (valeurs manquantes exclues)
+        series = self.cells.groupby(dimension, observed=True)[COUNT].sum()
+        series = series[series > 0]
+        return series.sort_values(ascending=False, kind="stable") if sort_by_count else series.sort_index()
+
+    def crosstab(self, rows, columns):
+        # Équivalent de `pd.crosstab` sur deux dimensions
+        table = self.cells.pivot_table(index=rows, columns=columns, values=COUNT, aggfunc="sum",
+                                       fill_value=0, observed=True)
+        table = table.loc[table.sum(axis=1) > 0, table.sum(axis=0) > 0].astype(int)
+        # Index simples (non catégoriels) pour l'affichage
+        table.index = table.index.astype(object)
+        table.columns = table.columns.astype(object)
+        return table
+
+
+POWER_TOTAL = "Puissance totale"
+POWER_MEAN = "Puissance moyenne"
+POWER_MAX = "Puissance max"
+# Nombre de puissances renseignées : dénominateur de la moyenne
+_POWER_COUNT = "Puissances renseignées"
+
+
+_CELL = "cellule"
+
+
+class CapacityCube:
+    """Agrégats des postes calculés en une seule passe : une cellule par combinaison observée des dimensions
+    (départ, commune, type...) avec son nombre de postes, la somme, le nombre et le maximum des puissances.
+
+    Tous les cumuls (puissance par départ, postes par commune et type, ...) se déduisent de ces cellules.
+    """
+
+    def __init__(self, cells, dimensions, power_column=None):
+        self.cells = cells
+        self.dimensions = dimensions
+        self.power_column = power_column
+        # Cumuls déjà calculés, par tuple de dimensions
+        self._rollups = {}
+
+    @classmethod
+    def build(cls, frame, dimensions, power_column):
+        dimensions = [column for column in dimensions if column in frame.columns]
+        if power_column in frame.columns:
+            power = pd.to_numeric(frame[power_column], errors="coerce")
+        else:
+            power = pd.Series(float("nan"), index=frame.index)
+        keys = pd.DataFrame({column: frame[column] for column in dimensions}).assign(**{POWER_TOTAL: power})
+        aggregations = {COUNT: (POWER_TOTAL, "size"), POWER_TOTAL: (POWER_TOTAL, "sum"),
+                        _POWER_COUNT: (POWER_TOTAL, "count"), POWER_MAX: (POWER_TOTAL, "max")}
+        # Sans dimension, une clé constante : une seule cellule pour tout le tableau
+        by = dimensions or [0] * len(keys)
+        cells = keys.groupby(by, observed=True, dropna=False).agg(**aggregations).reset_index(drop=not dimensions)
+        return cls(cells, dimensions, power_column)
+
+    def apply_delta(self, removed, added):
+        """Cellules mises à jour après un delta : nombres et sommes sont additifs ; le maximum d'une cellule ne
+        l'est pas quand une ligne retirée portait ce maximum sans qu'une ligne ajoutée l'égale. Dans ce cas
+        seulement, None : les agrégats sont reconstruits au prochain accès."""
+        # Sans dimension, une clé constante pour aligner la cellule unique
+        by = self.dimensions or [_CELL]
+        parts = [cube.cells if self.dimensions else cube.cells.assign(**{_CELL: 0})
+                 for cube in (self, CapacityCube.build(removed, self.dimensions, self.power_column),
+                              CapacityCube.build(added, self.dimensions, self.power_column))]
+        # Catégories propres à chaque partie : alignement sur les valeurs
+        cells, before, after = [part.astype({dimension: object for dimension in self.dimensions}) for part in parts]
+        current = cells.set_index(by)[POWER_MAX]
+        added_max = after.set_index(by)[POWER_MAX]
+        lost = before.set_index(by)[POWER_MAX].dropna()
+        if len(lost):
+            at_max = lost.to_numpy() >= current.reindex(lost.index).to_numpy()
+            restored = added_max.reindex(lost.index).to_numpy() >= lost.to_numpy()
+            if (at_max & ~restored).any():
+                return None
+        additive = [COUNT, POWER_TOTAL, _POWER_COUNT]
+        before[additive] = -before[additive]
+        merged = pd.concat([cells, before, after], ignore_index=True)
+        table = merged.groupby(by, observed=True, dropna=False).agg(
+            **{column: (column, "sum") for column in additive}, **{POWER_MAX: (POWER_MAX, "max")})
+        table = table[table[COUNT] > 0]
+        table.loc[table[_POWER_COUNT] == 0, POWER_MAX] = float("nan")
+        return CapacityCube(table.reset_index(drop=not self.dimensions), self.dimensions, self.power_column)
+
+    def __contains__(self, dimension):
+        return dimension in self.dimensions
+
+    def rollup(self, dimensions=()):
+        """Nombre de postes et puissance totale, moyenne et maximale par valeur des `dimensions`
+        (valeurs manquantes exclues) ; sans dimension, une seule ligne pour l'ensemble du parc."""
+        dimensions = tuple(dimensions)
+        if dimensions not in self._rollups:
+            self._rollups[dimensions] = self._rollup(dimensions)
+        return self._rollups[dimensions]
+
+    def _rollup(self, dimensions):
+        aggregations = {COUNT: (COUNT, "sum"), POWER_TOTAL: (POWER_TOTAL, "sum"),
+                        _POWER_COUNT: (_POWER_COUNT, "sum"), POWER_MAX: (POWER_MAX, "max")}
+        by = list(dimensions) or [0] * len(self.cells)
+        table = self.cells.groupby(by, observed=True).agg(**aggregations)
+        table[COUNT] = table[COUNT].astype(int)
+        table[POWER_MEAN] = table[POWER_TOTAL] / table[_POWER_COUNT].where(table[_POWER_COUNT] > 0)
+        return table[[COUNT, POWER_TOTAL, POWER_MEAN, POWER_MAX]]
+
+
+DAY = "Jour"
+WEEK = "Semaine"
+# Granularités des séries chronologiques (semaines commençant le lundi)
+GRANULARITIES = [DAY, WEEK, MONTH, YEAR]
+PERIOD = "Période"
+SUBSCRIPTIONS = "Abonnements"
+TERMINATIONS = "Résiliations"
+NET_GROWTH = "Croissance nette"
+
+
+def _floor(days, granularity):
+    # Jours (datetime64[D]) ramenés au premier jour de leur période
+    if granularity == WEEK:
+        # Le 1er janvier 1970 est un jeudi : décalage de 3 jours pour revenir au lundi
+        return days - ((days.astype("int64") + 3) % 7).astype("timedelta64[D]")
+    if granularity == MONTH:
+        return days.astype("datetime64[M]").astype("datetime64[D]")
+    if granularity == YEAR:
+        return days.astype("datetime64[Y]").astype("datetime64[D]")
+    return days
+
+
+class TimeRollup:
+    """Abonnements et résiliations par jour et par combinaison observée des dimensions (région, commune,
+    catégorie...) : une cellule par (jour, dimensions) avec ses deux comptes.
+
+    Toute granularité (jour, semaine, mois, année) et toute plage de dates se calculent sur ces cellules,
+    triées par jour : la plage se résout par dichotomie, sans relire les dates des lignes brutes.
+    """
+
+    def __init__(self, cells, dimensions, columns=None, start_column=None, end_column=None):
+        self.cells = cells.sort_values(DAY, kind="stable", ignore_index=True)
+        self.dimensions = dimensions
+        self.columns = columns or {}
+        self.start_column = start_column
+        self.end_column = end_column
+        self._days = self.cells[DAY].to_numpy(dtype="datetime64[D]")
+        # Début de période de chaque cellule, par granularité
+        self._periods = {}
+
+    @classmethod
+    def build(cls, frame, columns, start_column, end_column):
+        # `columns` associe un nom de dimension à sa colonne ; `start_column` et `end_column` : dates
+        # d'abonnement et de résiliation (une colonne absente donne des comptes nuls)
+        keys = {name: frame[column] for name, column in columns.items() if column in frame.columns}
+        dimensions = list(keys)
+        parts = []
+        for measure, column in ((SUBSCRIPTIONS, start_column), (TERMINATIONS, end_column)):
+            if column not in frame.columns:
+                continue
+            days = pd.to_datetime(frame[column], errors="coerce").dt.floor("D")
+            dated = days.notna()
+            counts = (pd.DataFrame({name: values[dated] for name, values in keys.items()})
+                      .assign(**{DAY: days[dated]})
+                      .groupby(dimensions + [DAY], observed=True, dropna=False).size())
+            parts.append(counts.rename(measure).reset_index())
+        return cls(cls._combine(parts, dimensions), dimensions, columns, start_column, end_column)
+
+    @staticmethod
+    def _combine(parts, dimensions):
+        # Somme des comptes par (dimensions, jour) ; une mesure absente d'une partie compte pour zéro
+        parts = [part for part in parts if len(part)]
+        if not parts:
+            return pd.DataFrame({**{dimension: pd.Series(dtype=object) for dimension in dimensions},
+                                 DAY: pd.Series(dtype="datetime64[ns]"), SUBSCRIPTIONS: pd.Series(dtype="int64"),
+                                 TERMINATIONS: pd.Series(dtype="int64")})
+        cells = pd.concat(parts, ignore_index=True).reindex(columns=dimensions + [DAY, SUBSCRIPTIONS, TERMINATIONS])
+        for dimension in dimensions:
+            if isinstance(cells[dimension].dtype, pd.CategoricalDtype):
+                cells[dimension] = cells[dimension].astype(object)
+        cells[[SUBSCRIPTIONS, TERMINATIONS]] = cells[[SUBSCRIPTIONS, TERMINATIONS]].fillna(0).astype("int64")
+        cells = (cells.groupby(dimensions + [DAY], observed=True, dropna=False)[[SUBSCRIPTIONS, TERMINATIONS]]
+                 .sum().reset_index())
+        return cells[(cells[SUBSCRIPTIONS] != 0) | (cells[TERMINATIONS] != 0)]
+
+    def apply_delta(self, removed, added):
+        # Comptes additifs, comme pour le cube des contrats : anciennes lignes retranchées, nouvelles ajoutées
+        before = TimeRollup.build(removed, self.columns, self.start_column, self.end_column).cells
+        after = TimeRollup.build(added, self.columns, self.start_column, self.end_column).cells
+        before[[SUBSCRIPTIONS, TERMINATIONS]] = -before[[SUBSCRIPTIONS, TERMINATIONS]]
+        cells = self._combine([self.cells, before, after], self.dimensions)
+        return TimeRollup(cells, self.dimensions, self.columns, self.start_column, self.end_column)
+
+    def __contains__(self, dimension):
+        return dimension in self.dimensions
+
+    def span(self):
+        # Premier et dernier jour datés (None si aucune date)
+        if not len(self._days):
+            return None
+        return pd.Timestamp(self._days[0]), pd.Timestamp(self._days[-1])
+
+    def _period(self, granularity):
+        if granularity not in self._periods:
+            self._periods[granularity] = _floor(self._days, granularity)
+        return self._periods[granularity]
+
+    def series(self, granularity=MONTH, start=None, end=None, by=None, **filters):
+        """Abonnements, résiliations et croissance nette par période de `granularity` (jour, semaine, mois,
+        année) entre `start` et `end` (bornes comprises), détaillés par valeur de la dimension `by` si donnée.
+
+        Comme `ContractCube.slice`, `filters` restreint les dimensions ; None ou "Toutes" les laissent libres.
+        """
+        low = 0 if start is None else np.searchsorted(self._days, np.datetime64(pd.Timestamp(start), "D"), "left")
+        high = len(self._days) if end is None else np.searchsorted(self._days, np.datetime64(pd.Timestamp(end), "D"),
+                                                                   "right")
+        cells = self.cells.iloc[low:high]
+        periods = pd.Series(self._period(granularity)[low:high].astype("datetime64[ns]"), index=cells.index,
+                            name=PERIOD)
+        for dimension, value in filters.items():
+            if value is not None and value != "Toutes" and dimension in self.dimensions:
+                kept = (cells[dimension] == value).to_numpy()
+                cells, periods = cells[kept], periods[kept]
+        keys = [periods] + ([cells[by]] if by is not None else [])
+        table = cells[[SUBSCRIPTIONS, TERMINATIONS]].groupby(keys, observed=True).sum().reset_index()
+        table[NET_GROWTH] = table[SUBSCRIPTIONS] - table[TERMINATIONS]
+        return table
@@ -0,0 +1,333 @@
+import hashlib
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from core.cube import CapacityCube, ContractCube, TimeRollup
+from core.delta import combine_fingerprints, upsert_frame
+from core.disk_cache import DatasetUnavailable, dataset_cache
+from core.expiry import DateIndex
+from core.filters import FilterCache
+from core.load import ContractLoad
+from core.profiling import instrumented
+from core.indexes import MODE_CONTAINS, MODE_EXACT, MODE_PREFIX, IdentifierIndex, patch_index
+from core.pagination import patch_permutation, sort_permutation
+from core.query import QueryEngine, duckdb_enabled
+from core.text_search import TextIndex
+
+# Nombre de propositions des recherches à la frappe
+SUGGESTIONS = 20
+
+# Structures dérivées conservées quand les données sont déportées sur disque : agrégats et index de dates,
+# légers et lus à chaque page (synthèse des alertes) ; les index de recherche sont reconstruits à la demande
+KEPT_ON_SPILL = ("cube", "chronologie", "puissance", "charge", "dates", "préchauffage")
+
+
+def _nbytes(structure, seen):
+    # Mémoire estimée d'une structure dérivée : tableaux numpy (chaînes comprises), objets pandas et Arrow,
+    # conteneurs et attributs d'objets parcourus récursivement ; un objet déjà vu (`seen`) n'est pas recompté
+    if id(structure) in seen:
+        return 0
+    seen.add(id(structure))
+    if isinstance(structure, np.ndarray):
+        size = structure.nbytes
+        if structure.dtype == object:
+            size += sum(sys.getsizeof(value) for value in structure.ravel())
+        return size
+    if isinstance(structure, pd.DataFrame):
+        return int(structure.memory_usage(deep=True).sum())
+    if isinstance(structure, (pd.Series, pd.Index)):
+        return int(structure.memory_usage(deep=True))
+    if isinstance(structure, (pa.Table, pa.Array, pa.ChunkedArray)):
+        return structure.nbytes
+    if isinstance(structure, dict):
+        return sum(_nbytes(value, seen) for value in structure.values())
+    if isinstance(structure, (list, tuple, set, frozenset)):
+        return sum(_nbytes(value, seen) for value in structure)
+    if hasattr(structure, "__dict__"):
+        return _nbytes(vars(structure), seen)
+    return 0
+
+
+def file_fingerprint(uploaded_file):
+    # Empreinte du contenu d'un fichier uploadé (indépendante du nom et de la session)
+    return hashlib.sha256(uploaded_file.getvalue()).hexdigest()
+
+
+class Dataset:
+    """Jeu de données chargé et structures dérivées (index, agrégats), construites une seule fois."""
+
+    def __init__(self, frame, fingerprint):
+        self._frame = frame
+        self.fingerprint = fingerprint
+        # Empreintes des fichiers delta appliqués depuis le chargement initial
+        self.deltas = ()
+        self._derived = {}
+        # Mémoire estimée de chaque structure dérivée, calculée une fois construite (voir `nbytes`)
+        self._sizes = {}
+        self._frame_nbytes = None
+        # Verrous des structures en cours de construction : deux structures différentes se construisent en parallèle
+        self._building = {}
+        self._lock = threading.Lock()
+        # Forme du jeu et dernier accès aux données, connus même quand elles sont déportées sur disque
+        self._length = len(frame)
+        self._columns = frame.columns
+        self._attrs = dict(frame.attrs)
+        self._store = None
+        self.last_access = time.monotonic()
+
+    def __len__(self):
+        return self._length
+
+    @property
+    def columns(self):
+        return self._columns
+
+    @property
+    def empty(self):
+        return self._length == 0 or len(self._columns) == 0
+
+    @property
+    def frame(self):
+        # Données du jeu, relues (mémoire-mappées) depuis le disque si elles y ont été déportées
+        self.last_access = time.monotonic()
+        frame = self._frame
+        if frame is None:
+            with self._lock:
+                if self._frame is None:
+                    frame = self._store.get(self.fingerprint)
+                    if frame is None:
+                        # Fichier de déport absent : relu depuis le cache des fichiers chargés
+                        # (entrée du fichier, ou base + delta pour un jeu mis à jour)
+                        frame = dataset_cache.get(self.fingerprint)
+                    if frame is None:
+                        raise DatasetUnavailable(self.fingerprint)
+                    frame.attrs.update(self._attrs)
+                    self._frame = frame
+                frame = self._frame
+        return frame
+
+    @property
+    def resident(self):
+        return self._frame is not None
+
+    def spill(self, store):
+        """Déporte les données dans `store` (core.disk_cache.DatasetCache) et les libère de la mémoire,
+        avec les index de recherche ; elles sont relues au prochain accès à `frame`."""
+        with self._lock:
+            frame = self._frame
+        if frame is None:
+            return False
+        if not store.path(self.fingerprint).exists():
+            store.put(self.fingerprint, frame)
+        with self._lock:
+            self._store = store
+            self._frame = None
+            self._derived = {key: value for key, value in self._derived.items() if key[0] in KEPT_ON_SPILL}
+            self._sizes = {key: size for key, size in self._sizes.items() if key in self._derived}
+        return True
+
+    def nbytes(self):
+        """Mémoire estimée du jeu : données (si elles sont en mémoire) et structures dérivées construites
+        (index, agrégats, copie Arrow du moteur SQL...). Chaque structure est estimée une fois, à la première
+        mesure qui la trouve construite ; le cache des filtres, qui grandit à l'usage, est relu à chaque appel."""
+        with self._lock:
+            frame = self._frame
+            derived = dict(self._derived)
+        total = 0
+        if frame is not None:
+            if self._frame_nbytes is None:
+                self._frame_nbytes = int(frame.memory_usage(deep=True).sum())
+            total += self._frame_nbytes
+        for key, structure in derived.items():
+            if isinstance(structure, FilterCache):
+                total += structure.nbytes
+                continue
+            size = self._sizes.get(key)
+            if size is None:
+                # Données du jeu référencées par une structure : déjà comptées
+                size = self._sizes[key] = _nbytes(structure, {id(frame)})
+            total += size
+        return total
+
+    def derived(self, key, builder):
+        # Structure dérivée mémorisée : construite au premier accès puis réutilisée ; un accès pendant
+        # la construction (préchauffage en tâche de fond) attend ce calcul au lieu de le refaire
+        with self._lock:
+            if key in self._derived:
+                return self._derived[key]
+            building = self._building.setdefault(key, threading.Lock())
+        with building:
+            with self._lock:
+                if key in self._derived:
+                    return self._derived[key]
+            try:
+                structure = builder()
+                with self._lock:
+                    self._derived[key] = structure
+                return structure
+            finally:
+                with self._lock:
+                    self._building.pop(key, None)
+
+    def has(self, key):
+        # Vrai si la structure dérivée est déjà construite
+        with self._lock:
+            return key in self._derived
+
+    def identifier_index(self, column, case_sensitive=True):
+        return self.derived(("identifiants", column, case_sensitive),
+                            lambda: IdentifierIndex(self.frame[column], case_sensitive=case_sensitive))
+
+    def build_identifier_indexes(self, columns):
+        # Construction anticipée des index au chargement ; `columns` associe chaque colonne à sa sensibilité à la casse
+        for column, case_sensitive in columns.items():
+            if column in self.columns:
+                self.identifier_index(column, case_sensitive)
+
+    def lookup_identifiers(self, queries, columns, mode):
+        # Intersection des positions de lignes pour les requêtes non vides ; None si aucune requête ne s'applique
+        positions = None
+        for column, query in queries.items():
+            if not query or column not in self.columns:
+                continue
+            rows = self.identifier_index(column, columns[column]).lookup(query, mode)
+            positions = rows if positions is None else np.intersect1d(positions, rows, assume_unique=True)
+        return positions
+
+    def suggest(self, columns, query, within=None, limit=SUGGESTIONS):
+        """Au plus `limit` positions de lignes dont un identifiant de `columns` (colonne -> sensibilité à la casse)
+        correspond à `query` : égalités exactes d'abord, puis préfixes, puis sous-chaînes.
+
+        Restreint aux positions triées `within` si fournies ; sans requête, les premières lignes candidates.
+        """
+        if not str(query).strip():
+            rows = np.arange(len(self)) if within is None else np.asarray(within)
+            return rows[:limit]
+        found = [np.empty(0, dtype=np.int64)]
+        for mode in (MODE_EXACT, MODE_PREFIX, MODE_CONTAINS):
+            for column, case_sensitive in columns.items():
+                if column not in self.columns:
+                    continue
+                rows = self.identifier_index(column, case_sensitive).lookup(query, mode)
+                if within is not None:
+                    rows = np.intersect1d(rows, within, assume_unique=True)
+                found.append(rows[:limit])
+            # Les positions déjà retenues gardent leur rang ; on s'arrête dès que la liste est pleine
+            rows = pd.unique(np.concatenate(found))
+            if len(rows) >= limit:
+                break
+        return rows[:limit]
+
+    def text_index(self, column):
+        return self.derived(("texte", column), lambda: TextIndex(self.frame[column]))
+
+    def build_text_indexes(self, columns):
+        for column in columns:
+            if column in self.columns:
+                self.text_index(column)
+
+    def lookup_text(self, queries, fuzzy=False, within=None):
+        # Positions et scores cumulés des recherches de noms, restreintes aux positions `within` si fournies
+        positions = within
+        scores = None if within is None else np.zeros(len(within))
+        for column, query in queries.items():
+            if not query or column not in self.columns:
+                continue
+            index = self.text_index(column)
+            if fuzzy:
+                rows, row_scores = index.rank(query)
+            else:
+                rows = index.lookup(query)
+                row_scores = np.ones(len(rows))
+            if positions is None:
+                positions, scores = rows, row_scores
+            else:
+                positions, left, right = np.intersect1d(positions, rows, assume_unique=True, return_indices=True)
+                scores = scores[left] + row_scores[right]
+        return positions, scores
+
+    @instrumented("dataset.select", cached=True)
+    def select(self, conditions, identifier_columns=None):
+        # Positions des lignes retenues par les conditions (core.query.Condition), servies par le cache de raffinement
+        return self.derived(("filtres",), FilterCache).select(self, conditions, identifier_columns or {})
+
+    def date_index(self, column):
+        return self.derived(("dates", column), lambda: DateIndex(self.frame[column]))
+
+    def build_date_indexes(self, columns):
+        for column in columns:
+            if column in self.columns:
+                self.date_index(column)
+
+    def sort_order(self, column, ascending=False):
+        # Permutation de tri de toutes les lignes, réutilisée par les vues filtrées (core.pagination.SortedPager)
+        return self.derived(("tri", column, ascending), lambda: sort_permutation(self.frame[column], ascending))
+
+    def build_sort_orders(self, columns, ascending=False):
+        for column in columns:
+            if column in self.columns:
+                self.sort_order(column, ascending)
+
+    def cube(self, columns, date_column=None):
+        return self.derived(("cube",), lambda: ContractCube.build(self.frame, columns, date_column))
+
+    def timeline(self, columns, start_column, end_column):
+        # Abonnements et résiliations par jour et par dimension, pour les séries chronologiques
+        return self.derived(("chronologie",), lambda: TimeRollup.build(self.frame, columns, start_column, end_column))
+
+    def capacity(self, dimensions, power_column):
+        # Agrégats de puissance, mis à jour après un delta sauf si le maximum d'une cellule en est retiré
+        return self.derived(("puissance",), lambda: CapacityCube.build(self.frame, dimensions, power_column))
+
+    def contract_load(self):
+        # Contrats par commune et catégorie, côté contrats de la jointure avec les postes (core.load)
+        return self.derived(("charge",), lambda: ContractLoad.build(self.frame))
+
+    def query_engine(self, identifier_columns=None, text_columns=(), pattern_columns=(), equality_columns=()):
+        # Moteur SQL embarqué, ou None si le backend DuckDB n'est pas activé
+        if not duckdb_enabled():
+            return None
+        return self.derived(("sql",), lambda: QueryEngine(self.frame, identifier_columns, text_columns,
+                                                          pattern_columns, equality_columns))
+
+    def upsert(self, delta, key_column, delta_fingerprint):
+        """Nouveau Dataset intégrant le delta (clé `key_column`) ; index, agrégats, index de dates et
+        permutations de tri sont mis à jour à partir des seules lignes touchées au lieu d'être reconstruits.
+        Le moteur SQL et le cache des filtres sont reconstruits au premier accès."""
+        merged, changes = upsert_frame(self.frame, delta, key_column)
+        dataset = Dataset(merged, combine_fingerprints(self.fingerprint, delta_fingerprint))
+        dataset.deltas = self.deltas + (delta_fingerprint,)
+        merged.attrs["fingerprint"] = dataset.fingerprint
+        touched = np.concatenate([changes.updated, changes.inserted])
+        with self._lock:
+            derived = dict(self._derived)
+        for key, structure in derived.items():
+            kind = key[0]
+            if kind in ("identifiants", "texte"):
+                column = key[1]
+                if kind == "identifiants":
+                    build = lambda series, case_sensitive=key[2]: IdentifierIndex(series, case_sensitive)
+                else:
+                    build = TextIndex
+                patched = patch_index(structure, changes.updated, touched, merged[column].iloc[touched], len(merged),
+                                      build)
+                # Trop de lignes servies par des index de mise à jour : reconstruction complète
+                dataset._derived[key] = patched if patched is not None else build(merged[column])
+            elif kind in ("cube", "chronologie", "charge", "puissance"):
+                patched = structure.apply_delta(changes.previous, merged.iloc[touched])
+                # Maximum d'une cellule de puissance retiré par le delta : reconstruit au premier accès
+                if patched is not None:
+                    dataset._derived[key] = patched
+            elif kind == "dates":
+                dataset._derived[key] = structure.apply_delta(touched, merged[key[1]])
+            elif kind == "tri":
+                patched = patch_permutation(structure, merged[key[1]], touched, key[2])
+                # Trop de lignes touchées, ou valeurs non comparables : nouveau tri au premier accès
+                if patched is not None:
+                    dataset._derived[key] = patched
+        return dataset, changes
@@ -0,0 +1,71 @@
+import hashlib
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from core.indexes import as_text
+
+# Résultat d'une mise à jour : positions modifiées, positions ajoutées et anciennes versions des lignes modifiées
+DeltaChanges = namedtuple("DeltaChanges", ["updated", "inserted", "previous"])
+
+
+def combine_fingerprints(base, delta):
+    return hashlib.sha256(f"{base}+{delta}".encode()).hexdigest()
+
+
+def _common_dtypes(base, delta):
+    # Aligne les types du delta sur ceux de la base (catégories réunies, entiers élargis si besoin)
+    base_columns, delta_columns = {}, {}
+    for name in base.columns:
+        left = base[name]
+        right = delta[name] if name in delta.columns else pd.Series(np.nan, index=delta.index)
+        if isinstance(left.dtype, pd.CategoricalDtype):
+            right = right.astype(object).where(right.notna()).map(str, na_action="ignore")
+            new_values = pd.Index(right.dropna().unique()).difference(left.cat.categories)
+            if len(new_values):
+                left = left.cat.add_categories(new_values)
+            right = right.astype(left.dtype)
+        elif pd.api.types.is_datetime64_any_dtype(left.dtype):
+            right = pd.to_datetime(right, errors="coerce").astype(left.dtype)
+        elif pd.api.types.is_numeric_dtype(left.dtype):
+            right = pd.to_numeric(right, errors="coerce")
+            common = np.result_type(left.dtype, right.dtype)
+            if pd.api.types.is_integer_dtype(common) and right.isna().any():
+                common = np.dtype(np.float64)
+            left, right = left.astype(common), right.astype(common)
+        elif pd.api.types.is_string_dtype(left.dtype) and not pd.api.types.is_object_dtype(left.dtype):
+            right = right.astype(object).where(right.notna()).map(str, na_action="ignore").astype(left.dtype)
+        else:
+            right = right.astype(left.dtype)
+        base_columns[name], delta_columns[name] = left, right
+    return pd.DataFrame(base_columns, index=base.index), pd.DataFrame(delta_columns, index=delta.index)
+
+
+def upsert_frame(base, delta, key_column):
+    """Applique un fichier delta à `base` : les lignes dont la clé existe sont remplacées sur place,
+    les autres sont ajoutées en fin de tableau. Renvoie (DataFrame fusionné, DeltaChanges)."""
+    if key_column not in base.columns or key_column not in delta.columns:
+        raise KeyError(f"Colonne clé absente du fichier : {key_column}")
+
+    base, delta = _common_dtypes(base.reset_index(drop=True), delta.reset_index(drop=True))
+    delta_keys = as_text(delta[key_column])
+    delta = delta[delta_keys.notna().to_numpy() & ~delta_keys.duplicated(keep="last").to_numpy()]
+    delta_keys = as_text(delta[key_column])
+
+    # Dernière occurrence de chaque clé dans la base
+    base_keys = as_text(base[key_column])
+    last = ~base_keys.duplicated(keep="last").to_numpy() & base_keys.notna().to_numpy()
+    key_positions = pd.Series(np.flatnonzero(last), index=base_keys[last].to_numpy())
+    matched = key_positions.reindex(delta_keys.to_numpy()).to_numpy()
+    found = ~np.isnan(matched)
+
+    updated = matched[found].astype(np.int64)
+    merged = pd.concat([base, delta[~found]], ignore_index=True)
+    previous = base.iloc[updated]
+    replacements = delta[found]
+    for position, name in enumerate(merged.columns):
+        merged.iloc[updated, position] = replacements[name].to_numpy()
+    inserted = np.arange(len(base), len(merged))
+    merged.attrs.update(base.attrs)
+    return merged, DeltaChanges(updated, inserted, previous)
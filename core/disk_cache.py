@@ -0,0 +1,148 @@
+import json
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from core.delta import upsert_frame
+
+# Emplacement et taille maximale du cache disque, configurables par variables d'environnement
+CACHE_DIR = Path(os.environ.get("ELECTRATRACK_CACHE_DIR", Path(__file__).resolve().parent.parent / ".cache" / "datasets"))
+CACHE_MAX_BYTES = int(os.environ.get("ELECTRATRACK_CACHE_MAX_MB", "2048")) * 1024 * 1024
+CACHE_FORMAT = os.environ.get("ELECTRATRACK_CACHE_FORMAT", "parquet")
+
+# Les chaînes relues restent adossées à Arrow (sans conversion en objets Python)
+_ARROW_TEXT = {pa.string(): pd.StringDtype("pyarrow"), pa.large_string(): pd.StringDtype("pyarrow")}
+
+# À incrémenter quand la normalisation à l'ingestion change, pour invalider les entrées existantes
+CACHE_VERSION = "1"
+
+
+class DatasetUnavailable(FileNotFoundError):
+    """Données d'un jeu déporté introuvables sur disque (fichier de déport et cache des fichiers supprimés)."""
+
+    def __init__(self, fingerprint):
+        super().__init__("Les données de ce fichier ne sont plus disponibles sur disque : veuillez le recharger.")
+        self.fingerprint = fingerprint
+
+
+class DatasetCache:
+    """Cache disque des jeux de données normalisés, adressé par l'empreinte du contenu du fichier source.
+
+    Les entrées sont stockées en Parquet (compact) ou en Feather (lecture mémoire-mappée) ; la date
+    de modification sert de date de dernier accès pour l'éviction LRU au-delà de `max_bytes`.
+    Un jeu mis à jour par un delta n'est pas réécrit : son manifeste pointe vers l'entrée de base et vers
+    celle du fichier delta, déjà en cache, et le jeu est recomposé à la lecture.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, fmt=CACHE_FORMAT):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.fmt = fmt
+        self._lock = threading.Lock()
+
+    def path(self, key):
+        return self.directory / f"{key}-v{CACHE_VERSION}.{self.fmt}"
+
+    def manifest_path(self, key):
+        return self.directory / f"{key}-v{CACHE_VERSION}.json"
+
+    def get(self, key):
+        manifest = self.manifest_path(key)
+        if manifest.exists():
+            return self._get_delta(manifest)
+        return self._read(self.path(key))
+
+    def _get_delta(self, manifest):
+        # Entrée incrémentale : base (éventuellement elle-même incrémentale) + entrée du fichier delta
+        with open(manifest, encoding="utf-8") as handle:
+            description = json.load(handle)
+        base = self.get(description["base"])
+        delta = self.get(description["delta"]) if "delta" in description else None
+        if base is None or delta is None:
+            # Une des entrées a été évincée : le manifeste ne sert plus
+            manifest.unlink(missing_ok=True)
+            return None
+        os.utime(manifest)
+        merged, _ = upsert_frame(base, delta, description["key_column"])
+        return merged
+
+    def _read(self, path):
+        try:
+            if self.fmt == "feather":
+                table = feather.read_table(path, memory_map=True)
+            else:
+                table = pq.read_table(path, memory_map=True)
+        except (FileNotFoundError, OSError):
+            return None
+        # Marque l'entrée comme récemment utilisée
+        os.utime(path)
+        return table.to_pandas(types_mapper=_ARROW_TEXT.get)
+
+    def put(self, key, df):
+        self.put_segment(self.path(key), df)
+        self.evict()
+
+    def put_delta(self, key, base_key, delta_key, key_column):
+        # Manifeste seul : le fichier delta est déjà en cache sous sa propre empreinte (lecture de l'upload)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with open(self.manifest_path(key), "w", encoding="utf-8") as handle:
+            json.dump({"base": base_key, "delta": delta_key, "key_column": key_column}, handle)
+
+    def put_segment(self, path, df):
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Nom temporaire propre à chaque écriture : des processus de travail qui écrivent la même entrée
+        # ne partagent jamais leur fichier en cours
+        with tempfile.NamedTemporaryFile(dir=self.directory, prefix=f"{path.name}.", suffix=".tmp",
+                                         delete=False) as handle:
+            temporary = Path(handle.name)
+        try:
+            frame = df.reset_index(drop=True)
+            if self.fmt == "feather":
+                frame.to_feather(temporary)
+            else:
+                frame.to_parquet(temporary, index=False)
+            # Écriture atomique : une lecture concurrente ne voit jamais un fichier incomplet
+            os.replace(temporary, path)
+        except BaseException:
+            temporary.unlink(missing_ok=True)
+            raise
+
+    def _stats(self):
+        # (date de dernière utilisation, taille, chemin) des entrées, de la plus ancienne à la plus récente ;
+        # une entrée supprimée entre-temps (éviction par un autre processus) est ignorée
+        if not self.directory.exists():
+            return []
+        stats = []
+        for path in self.directory.glob(f"*.{self.fmt}"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            stats.append((stat.st_mtime, stat.st_size, path))
+        return sorted(stats, key=lambda entry: entry[0])
+
+    def entries(self):
+        return [path for _, _, path in self._stats()]
+
+    def size(self):
+        return sum(size for _, size, _ in self._stats())
+
+    def evict(self):
+        # Supprime les entrées les moins récemment utilisées jusqu'à repasser sous la taille maximale
+        with self._lock:
+            entries = self._stats()
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in entries[:-1]:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+dataset_cache = DatasetCache()
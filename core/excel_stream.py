@@ -0,0 +1,200 @@
+import datetime
+import tempfile
+import time
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.feather as feather
+from openpyxl import load_workbook
+
+from core.disk_cache import _ARROW_TEXT
+
+# Lignes lues et converties à la fois : borne la mémoire occupée par les objets Python de openpyxl
+BLOCK_ROWS = 50_000
+
+# Type d'une colonne dans un bloc, du plus étroit au plus large ; "texte" absorbe les mélanges
+_EMPTY, _BOOL, _INT, _FLOAT, _DATE, _TEXT = "vide", "booléen", "entier", "décimal", "date", "texte"
+
+
+def _column_names(header):
+    # En-têtes comme `pd.read_excel` : colonnes sans nom "Unnamed: i", doublons suffixés ".1", ".2"...
+    names, seen = [], {}
+    for position, name in enumerate(header):
+        name = f"Unnamed: {position}" if name is None else name
+        if name in seen:
+            seen[name] += 1
+            name = f"{name}.{seen[name]}"
+        else:
+            seen[name] = 0
+        names.append(name)
+    return names
+
+
+def _kind(values):
+    kinds = {type(value) for value in values if value is not None}
+    if not kinds:
+        return _EMPTY
+    if kinds <= {bool}:
+        return _BOOL
+    if kinds <= {int}:
+        return _INT
+    if kinds <= {int, float}:
+        return _FLOAT
+    if kinds <= {datetime.datetime, datetime.date}:
+        return _DATE
+    return _TEXT
+
+
+def _widen(left, right):
+    # Type commun de deux blocs d'une même colonne
+    if left == right or right == _EMPTY:
+        return left
+    if left == _EMPTY:
+        return right
+    if {left, right} == {_INT, _FLOAT}:
+        return _FLOAT
+    return _TEXT
+
+
+def _as_text(values):
+    # Même représentation que `astype(str)` de pandas sur une colonne objet
+    return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def _block_array(values, kind):
+    if kind == _EMPTY:
+        return pa.nulls(len(values))
+    if kind == _BOOL:
+        return pa.array(values, type=pa.bool_())
+    if kind == _INT:
+        return pa.array(values, type=pa.int64())
+    if kind == _FLOAT:
+        return pa.array(values, type=pa.float64())
+    if kind == _DATE:
+        return pa.array(pd.to_datetime(pd.Series(values, dtype=object), errors="coerce"), type=pa.timestamp("ns"))
+    return _as_text(values)
+
+
+def _cast(array, kind, target):
+    # Conversion d'une colonne de bloc vers le type commun final
+    if kind == target or kind == _EMPTY:
+        return array.cast(_ARROW_TYPES[target])
+    if target == _FLOAT:
+        return array.cast(pa.float64())
+    # Vers du texte : les valeurs sont réécrites comme le ferait `str()` sur les objets lus
+    return _as_text(array.to_pylist())
+
+
+# Textes lus comme valeurs manquantes par `pd.read_excel` (valeurs par défaut de `na_values`)
+NA_STRINGS = pa.array(["", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND", "1.#QNAN",
+                       "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null"])
+
+
+def _infer_text(array):
+    # Comme le lecteur de pandas : marqueurs de valeur manquante en NULL, colonne entièrement numérique convertie
+    array = pc.if_else(pc.is_in(array, value_set=NA_STRINGS), pa.scalar(None, pa.string()), array)
+    for target in (pa.int64(), pa.float64()):
+        try:
+            return array.cast(target)
+        except (pa.ArrowInvalid, pa.ArrowNotImplementedError):
+            continue
+    return array
+
+
+_ARROW_TYPES = {_EMPTY: pa.null(), _BOOL: pa.bool_(), _INT: pa.int64(), _FLOAT: pa.float64(),
+                _DATE: pa.timestamp("ns"), _TEXT: pa.string()}
+
+
+def describe_progress(rows_read, expected, elapsed):
+    # (part lue entre 0 et 1 ou None, texte) : lignes lues et temps restant estimé au débit observé
+    if not expected:
+        return None, f"{rows_read:,} lignes lues".replace(",", " ")
+    share = min(1.0, rows_read / expected)
+    remaining = elapsed * (1 - share) / share if share else 0
+    text = f"{rows_read:,} / {expected:,} lignes lues".replace(",", " ")
+    return share, f"{text} — environ {remaining:.0f} s restantes"
+
+
+def count_rows(sheet):
+    # Nombre de lignes de données annoncé par la feuille (None si le fichier ne le renseigne pas)
+    return None if sheet.max_row is None else max(0, sheet.max_row - 1)
+
+
+def iter_blocks(sheet, block_rows=BLOCK_ROWS):
+    """Parcourt la feuille par blocs de `block_rows` lignes : (noms de colonnes, colonnes du bloc).
+
+    Comme `pd.read_excel`, la première ligne sert d'en-tête et les lignes vides en fin de feuille sont ignorées.
+    """
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if header is None:
+        return
+    names = _column_names(header)
+    block, pending_empty = [], 0
+    for row in rows:
+        if all(value is None for value in row):
+            pending_empty += 1
+            continue
+        block.extend([()] * pending_empty)
+        pending_empty = 0
+        block.append(row)
+        if len(block) >= block_rows:
+            yield names, _columns(block, len(names))
+            block = []
+    if block:
+        yield names, _columns(block, len(names))
+
+
+def _columns(block, width):
+    # Lignes -> colonnes, complétées par None quand une ligne est plus courte que l'en-tête
+    padded = [tuple(row[:width]) + (None,) * (width - len(row)) for row in block]
+    return [list(column) for column in zip(*padded)] if padded else [[] for _ in range(width)]
+
+
+def read_excel_streaming(source, block_rows=BLOCK_ROWS, progress=None):
+    """Lit la première feuille d'un classeur bloc par bloc (openpyxl en lecture seule) sans jamais
+    matérialiser tout le classeur en objets Python.
+
+    Chaque bloc est converti en colonnes Arrow typées puis écrit sur disque (Feather) ; le tableau final
+    est réassemblé depuis ces fichiers, chaque colonne dans son type commun à tous les blocs.
+    `progress(lignes lues, lignes attendues ou None, secondes écoulées)` est appelé après chaque bloc.
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        expected = count_rows(sheet)
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix="electratrack-") as spool:
+            names, blocks, kinds, rows_read = None, [], None, 0
+            for names, columns in iter_blocks(sheet, block_rows):
+                block_kinds = [_kind(values) for values in columns]
+                kinds = block_kinds if kinds is None else [_widen(a, b) for a, b in zip(kinds, block_kinds)]
+                table = pa.table({str(position): _block_array(values, kind)
+                                  for position, (values, kind) in enumerate(zip(columns, block_kinds))})
+                path = Path(spool) / f"bloc-{len(blocks)}.feather"
+                feather.write_feather(table, path, compression="uncompressed")
+                blocks.append((path, block_kinds))
+                rows_read += table.num_rows
+                del columns, table
+                if progress is not None:
+                    progress(rows_read, expected, time.perf_counter() - start)
+
+            if names is None:
+                header = next(sheet.iter_rows(values_only=True, max_row=1), ())
+                return pd.DataFrame(columns=_column_names(header))
+            tables = []
+            for path, block_kinds in blocks:
+                table = feather.read_table(path)
+                tables.append(pa.table({str(position): _cast(table.column(position).combine_chunks(), kind, target)
+                                        for position, (kind, target) in enumerate(zip(block_kinds, kinds))}))
+            table = pa.concat_tables(tables)
+            for position, kind in enumerate(kinds):
+                if kind == _TEXT:
+                    table = table.set_column(position, str(position), _infer_text(table.column(position).combine_chunks()))
+            df = table.to_pandas(types_mapper=_ARROW_TEXT.get, self_destruct=True)
+            df.columns = names
+            return df
+    finally:
+        workbook.close()
@@ -0,0 +1,76 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Horizons d'alerte proposés (en jours) et horizon par défaut
+HORIZONS = [7, 30, 90]
+DEFAULT_HORIZON = 30
+
+# Type d'alerte -> colonne de dates surveillée
+ALERT_COLUMNS = {"Échéance": "Date de fin", "Résiliation": "Date resiliation du contrat"}
+
+
+class DateIndex:
+    """Dates d'une colonne triées avec leurs positions de lignes : une plage de dates se résout par dichotomie."""
+
+    def __init__(self, series):
+        dates = pd.to_datetime(series, errors="coerce").to_numpy(dtype="datetime64[ns]")
+        rows = np.flatnonzero(~np.isnat(dates))
+        order = np.argsort(dates[rows], kind="stable")
+        self.dates = dates[rows][order]
+        self.rows = rows[order]
+
+    def __len__(self):
+        return len(self.rows)
+
+    def apply_delta(self, stale, series):
+        """Index mis à jour après un delta : les lignes `stale` (modifiées ou ajoutées) sont retirées puis
+        réinsérées avec leurs dates dans `series` (colonne du tableau fusionné), par dichotomie."""
+        stale = np.unique(stale)
+        kept = ~np.isin(self.rows, stale)
+        dates, rows = self.dates[kept], self.rows[kept]
+        new_dates = pd.to_datetime(series.iloc[stale], errors="coerce").to_numpy(dtype="datetime64[ns]")
+        dated = ~np.isnat(new_dates)
+        new_dates, new_rows = new_dates[dated], stale[dated]
+        order = np.argsort(new_dates, kind="stable")
+        new_dates, new_rows = new_dates[order], new_rows[order]
+        slots = np.searchsorted(dates, new_dates, side="right")
+        index = DateIndex.__new__(DateIndex)
+        index.dates = np.insert(dates, slots, new_dates)
+        index.rows = np.insert(rows, slots, new_rows)
+        return index
+
+    def _bounds(self, start, end):
+        start, end = np.datetime64(pd.Timestamp(start), "ns"), np.datetime64(pd.Timestamp(end), "ns")
+        return np.searchsorted(self.dates, start, side="left"), np.searchsorted(self.dates, end, side="right")
+
+    def between(self, start, end):
+        # Positions des lignes datées dans [start, end], dans l'ordre des positions
+        low, high = self._bounds(start, end)
+        return np.sort(self.rows[low:high])
+
+    def count_between(self, start, end):
+        low, high = self._bounds(start, end)
+        return int(high - low)
+
+
+def horizon_window(days, today=None):
+    # [aujourd'hui, aujourd'hui + `days` jours], bornes comprises
+    start = pd.Timestamp(today or datetime.date.today()).normalize()
+    return start, start + pd.Timedelta(days=days)
+
+
+def alert_report(datasets, horizons=HORIZONS, columns=ALERT_COLUMNS, today=None):
+    """Nombre de contrats par agence et type d'alerte dont la date tombe dans chaque horizon :
+    une ligne par (agence, alerte) dont la colonne existe, une colonne par horizon."""
+    labels = [f"{days} j" for days in horizons]
+    windows = [horizon_window(days, today) for days in horizons]
+    rows = []
+    for agency, dataset in datasets.items():
+        for alert, column in columns.items():
+            if column not in dataset.columns:
+                continue
+            index = dataset.date_index(column)
+            rows.append([agency, alert] + [index.count_between(start, end) for start, end in windows])
+    return pd.DataFrame(rows, columns=["Agence", "Alerte"] + labels)
@@ -0,0 +1,126 @@
+import hashlib
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+from openpyxl import Workbook
+
+EXCEL_MAX_ROWS = 1_048_576
+CHUNK_SIZE = 10_000
+# Emplacement et taille maximale des fichiers d'export préparés, configurables par variables d'environnement
+EXPORT_DIR = Path(os.environ.get("ELECTRATRACK_EXPORT_DIR", Path(tempfile.gettempdir()) / "electratrack-exports"))
+EXPORT_MAX_BYTES = int(os.environ.get("ELECTRATRACK_EXPORT_MAX_MB", "512")) * 1024 * 1024
+
+
+def _chunks(df, chunk_size=CHUNK_SIZE):
+    for start in range(0, len(df), chunk_size):
+        chunk = df.iloc[start:start + chunk_size].astype(object)
+        yield chunk.where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def write_excel(df, stream, chunk_size=CHUNK_SIZE):
+    """Écrit `df` en .xlsx ligne par ligne (mode write-only d'openpyxl) : mémoire constante quel que soit le volume.
+
+    Les résultats dépassant la limite d'Excel sont répartis sur plusieurs feuilles.
+    """
+    workbook = Workbook(write_only=True)
+    header = [str(column) for column in df.columns]
+    sheet, rows_in_sheet = None, EXCEL_MAX_ROWS
+    for rows in _chunks(df, chunk_size):
+        for row in rows:
+            if rows_in_sheet >= EXCEL_MAX_ROWS:
+                sheet = workbook.create_sheet(f"Données {len(workbook.worksheets) + 1}")
+                sheet.append(header)
+                rows_in_sheet = 1
+            sheet.append(row)
+            rows_in_sheet += 1
+    if sheet is None:
+        workbook.create_sheet("Données 1").append(header)
+    workbook.save(stream)
+
+
+def write_csv(df, stream, chunk_size=CHUNK_SIZE):
+    # utf-8-sig : accents correctement affichés à l'ouverture dans Excel
+    df.to_csv(stream, index=False, encoding="utf-8-sig", chunksize=chunk_size)
+
+
+def write_parquet(df, stream):
+    df.to_parquet(stream, index=False)
+
+
+# Format -> (extension, type MIME, fonction d'écriture)
+EXPORT_FORMATS = {
+    "Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", write_excel),
+    "CSV": ("csv", "text/csv", write_csv),
+    "Parquet": ("parquet", "application/octet-stream", write_parquet),
+}
+
+
+def export_file(df, fmt, path):
+    # Écrit le fichier directement sur disque, sans jamais le tenir en mémoire ; écriture atomique
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.NamedTemporaryFile(dir=path.parent, suffix=".tmp", delete=False) as stream:
+        EXPORT_FORMATS[fmt][2](df, stream)
+    os.replace(stream.name, path)
+    return path
+
+
+class ExportFiles:
+    """Fichiers d'export préparés, sur disque, adressés par l'état des filtres et le format.
+
+    Un export déjà préparé est resservi depuis son fichier ; la date de modification sert de date de dernier
+    accès pour supprimer les moins récents au-delà de `max_bytes`, comme pour le cache disque des jeux.
+    """
+
+    def __init__(self, directory=EXPORT_DIR, max_bytes=EXPORT_MAX_BYTES):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+
+    def path(self, state_key, fmt):
+        digest = hashlib.sha256(repr((state_key, fmt)).encode()).hexdigest()[:32]
+        return self.directory / f"{digest}.{EXPORT_FORMATS[fmt][0]}"
+
+    def get(self, state_key, fmt, build):
+        """Chemin du fichier d'export, écrit à partir de `build()` (DataFrame) s'il n'existe pas encore."""
+        path = self.path(state_key, fmt)
+        try:
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            pass
+        export_file(build(), fmt, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep=None):
+        # Supprime les fichiers les moins récemment servis jusqu'à repasser sous la taille maximale (hors `keep`)
+        with self._lock:
+            entries = []
+            for path in self.directory.glob("*.*"):
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+            total = sum(size for _, size, _ in entries)
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total <= self.max_bytes:
+                    break
+                if path == keep or path.suffix == ".tmp":
+                    continue
+                path.unlink(missing_ok=True)
+                total -= size
+
+
+def export_filename(stem, fmt):
+    return f"{stem}.{EXPORT_FORMATS[fmt][0]}"
+
+
+def export_mime(fmt):
+    return EXPORT_FORMATS[fmt][1]
+
+
+export_files = ExportFiles()
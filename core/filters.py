@@ -0,0 +1,164 @@
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from core.indexes import MODE_CONTAINS, MODE_EXACT, MODE_PREFIX
+from core.profiling import computed
+from core.query import EQUALS, IDENTIFIER, PATTERN, TEXT
+from core.text_search import fold
+
+# Résultats de filtres conservés par jeu de données, et budget mémoire de leurs positions
+MAX_ENTRIES = 32
+MAX_BYTES = 64 * 1024 ** 2
+
+# Ordre d'évaluation : les conditions servies par un index d'abord, les balayages sur les lignes restantes ensuite
+_ORDER = {IDENTIFIER: 0, TEXT: 1, PATTERN: 2, EQUALS: 3}
+
+
+# Caractères spéciaux des expressions régulières : un motif qui n'en contient aucun est une simple sous-chaîne
+_REGEX_SPECIAL = re.compile(r"[.^$*+?{}\[\]\\|()]")
+
+
+def _literal(value):
+    return not _REGEX_SPECIAL.search(value)
+
+
+def _narrows(new, old):
+    # Vrai si toute ligne retenue par la condition `new` l'est aussi par `old` (même colonne, même type)
+    if new.mode != old.mode:
+        return False
+    if new.kind == IDENTIFIER:
+        before, after = str(old.value).strip(), str(new.value).strip()
+        if new.mode == MODE_EXACT:
+            return before == after
+        if new.mode == MODE_PREFIX:
+            return after.startswith(before)
+        return before in after
+    if new.kind == TEXT:
+        # Une requête repliée vide ne retient rien : seule une requête repliée identique la restreint
+        before, after = fold(old.value), fold(new.value)
+        return before == after or bool(before) and before in after
+    if new.kind == PATTERN:
+        # Motifs littéraux seulement : une expression régulière prolongée ne restreint pas forcément les lignes
+        if old.value == new.value:
+            return True
+        return _literal(old.value) and _literal(new.value) and old.value.lower() in new.value.lower()
+    return old.value == new.value
+
+
+def _key(conditions):
+    # Conditions actives, indexées par (type, colonne) ; les conditions vides ne filtrent rien
+    return {(condition.kind, condition.column): condition for condition in conditions if condition.value}
+
+
+def refines(conditions, cached):
+    """Vrai si le filtre `conditions` est un raffinement du filtre `cached` : chaque condition de `cached`
+    est conservée ou restreinte (sous-chaîne prolongée, préfixe allongé...) et des conditions ont pu s'ajouter."""
+    conditions, cached = _key(conditions), _key(cached)
+    return all(key in conditions and _narrows(conditions[key], condition) for key, condition in cached.items())
+
+
+def _contains(labels, pattern):
+    # `str.contains(motif, case=False)` ; un motif littéral est cherché directement en minuscules, comme en SQL
+    if _literal(pattern):
+        needle = pattern.lower()
+        return np.fromiter((needle in label.lower() for label in labels), dtype=bool, count=len(labels))
+    return pd.Series(labels, dtype=object).str.contains(pattern, case=False, na=False).to_numpy(dtype=bool)
+
+
+def _pattern_matches(series, positions, pattern):
+    # `astype(str).str.contains(motif, case=False)` sur les lignes `positions` ; une colonne catégorielle
+    # n'évalue que les catégories présentes parmi ces lignes (valeur manquante comprise, lue "nan")
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()[positions]
+        # Code -1 (valeur manquante) décalé en 0, catégories en 1..n
+        values = np.append(np.array(["nan"], dtype=object), np.asarray(series.cat.categories, dtype=object))
+        present = np.flatnonzero(np.bincount(codes + 1, minlength=len(values)))
+        matches = np.zeros(len(values), dtype=bool)
+        matches[present] = _contains([str(value) for value in values[present]], pattern)
+        return matches[codes + 1]
+    return _contains(series.iloc[positions].astype(str).tolist(), pattern)
+
+
+@computed
+def evaluate(dataset, conditions, identifier_columns, within=None):
+    """Positions triées des lignes satisfaisant toutes les conditions, restreintes à `within` si fourni.
+
+    Identifiants et noms passent par les index du jeu : recherche globale sans candidats, sinon
+    évaluation sur les seules valeurs des lignes candidates ; motifs et égalités sont évalués ligne à ligne.
+    """
+    frame = dataset.frame
+    positions = within
+    for condition in sorted(_key(conditions).values(), key=lambda condition: _ORDER[condition.kind]):
+        kind, column, value, mode = condition
+        if column not in frame.columns:
+            continue
+        if kind in (IDENTIFIER, TEXT):
+            if kind == IDENTIFIER:
+                index = dataset.identifier_index(column, identifier_columns.get(column, True))
+            else:
+                index = dataset.text_index(column)
+            mode = mode if kind == IDENTIFIER else MODE_CONTAINS
+            positions = index.lookup(value, mode) if positions is None else index.filter_rows(positions, value, mode)
+            continue
+        if positions is None:
+            positions = np.arange(len(frame))
+        series = frame[column]
+        if kind == PATTERN:
+            matches = _pattern_matches(series, positions, value)
+        else:
+            matches = (series.iloc[positions] == value).to_numpy(dtype=bool)
+        positions = positions[matches]
+    return np.arange(len(frame)) if positions is None else positions
+
+
+class FilterCache:
+    """Derniers résultats de filtres d'un jeu de données (conditions -> positions), du plus ancien au plus récent.
+
+    Un filtre déjà calculé est servi tel quel ; un filtre qui en raffine un autre (frappe d'un caractère
+    de plus, filtre ajouté) part des positions du plus petit résultat compatible au lieu du jeu complet.
+    """
+
+    def __init__(self, max_entries=MAX_ENTRIES, max_bytes=MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def nbytes(self):
+        # Mémoire des positions en cache
+        return self._bytes
+
+    def _candidates(self, key):
+        # Positions du plus petit résultat en cache dont `key` est un raffinement (None si aucun)
+        best = None
+        for cached, positions in self._entries.items():
+            if refines(key, cached) and (best is None or len(positions) < len(best)):
+                best = positions
+        return best
+
+    def select(self, dataset, conditions, identifier_columns):
+        key = tuple(sorted(_key(conditions).values()))
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            within = self._candidates(key)
+        positions = evaluate(dataset, key, identifier_columns, within)
+        positions.flags.writeable = False
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = positions
+                self._bytes += positions.nbytes
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+        return positions
@@ -0,0 +1,219 @@
+import os
+import re
+import threading
+from collections import namedtuple
+from pathlib import Path
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from core.cube import COUNT
+from core.disk_cache import _ARROW_TEXT
+from core.indexes import MODE_CONTAINS, MODE_EXACT, MODE_PREFIX
+from core.query import EQUALS, IDENTIFIER, PATTERN, TEXT
+from core.text_search import fold
+
+# Racine de l'historique des extraits mensuels, configurable par variable d'environnement
+HISTORY_DIR = Path(os.environ.get("ELECTRATRACK_HISTORY_DIR",
+                                  Path(__file__).resolve().parent.parent / ".cache" / "history"))
+
+# Colonnes de partition ajoutées aux résultats lus dans plusieurs extraits
+YEAR = "annee"
+MONTH = "mois"
+
+_FILE = "extrait.parquet"
+# Métadonnées Parquet de chaque extrait : empreinte du fichier source et nom d'agence d'origine
+_FINGERPRINT = b"electratrack.fingerprint"
+_AGENCY = b"electratrack.agence"
+
+# Lignes lues à la fois lors des agrégats sur l'historique
+BATCH_ROWS = 65_536
+
+Extract = namedtuple("Extract", ["agency", "year", "month", "rows", "fingerprint", "path"])
+
+
+def _text(column):
+    return ds.field(column).cast(pa.string())
+
+
+def _folded(column):
+    # Repliement de `core.text_search.fold` évalué par le lecteur Arrow : sans accents, en minuscules,
+    # ponctuation réduite à un espace
+    text = pc.replace_substring_regex(pc.utf8_normalize(_text(column), "NFKD"), r"\p{Mn}", "")
+    return pc.utf8_trim_whitespace(pc.replace_substring_regex(pc.utf8_lower(text), r"[^\p{L}\p{N}]+", " "))
+
+
+def _condition(condition, identifier_columns):
+    # Expression Arrow d'une condition (core.query.Condition), même sémantique que le moteur SQL ; None si vide
+    kind, column, value, mode = condition
+    if not value:
+        return None
+    if kind == IDENTIFIER:
+        query = str(value).strip()
+        case_sensitive = identifier_columns.get(column, True)
+        text = _text(column) if case_sensitive else pc.utf8_lower(_text(column))
+        query = query if case_sensitive else query.lower()
+        if not query:
+            return ds.field(column).is_valid()
+        if mode == MODE_EXACT:
+            return text == query
+        if mode == MODE_PREFIX:
+            return pc.starts_with(text, query)
+        if mode != MODE_CONTAINS:
+            raise ValueError(f"Mode de recherche inconnu : {mode}")
+        return pc.match_substring(text, query)
+    if kind == TEXT:
+        query = fold(value)
+        return pc.match_substring(_folded(column), query) if query else ds.scalar(False)
+    if kind == PATTERN:
+        # `str.contains(motif, case=False)` : expression régulière insensible à la casse
+        if re.escape(value) == value:
+            return pc.match_substring(_text(column), value, ignore_case=True)
+        return pc.match_substring_regex(_text(column), value, ignore_case=True)
+    if kind == EQUALS:
+        return _text(column) == str(value)
+    return None
+
+
+def history_filter(conditions, identifier_columns, names):
+    """Prédicat Arrow des `conditions` des pages de contrats, évalué par le lecteur Parquet pendant la lecture
+    d'un extrait ; les conditions sur des colonnes absentes de l'extrait (`names`) sont ignorées, comme en mémoire.
+    None si aucune condition ne s'applique."""
+    expression = None
+    for condition in conditions:
+        if condition.column not in names:
+            continue
+        clause = _condition(condition, identifier_columns)
+        if clause is not None:
+            expression = clause if expression is None else expression & clause
+    return expression
+
+
+def _slug(agency):
+    # Valeur de partition sûre pour un nom de dossier : "Agence_El Kelaa Des Sraghna" -> "Agence_El_Kelaa_Des_Sraghna"
+    return re.sub(r"[^0-9A-Za-z]+", "_", str(agency)).strip("_")
+
+
+class HistoryStore:
+    """Historique local des extraits mensuels, partitionné par agence, année et mois (style Hive) :
+
+        agence=<agence>/annee=<AAAA>/mois=<MM>/extrait.parquet
+
+    Un extrait par agence et par mois. Les lectures sélectionnent les partitions d'après leur chemin
+    et ne lisent dans chaque fichier que les colonnes demandées ; les filtres de lignes sont poussés
+    au lecteur Parquet (statistiques des groupes de lignes), et les agrégats avancent par lots.
+    """
+
+    def __init__(self, directory=HISTORY_DIR):
+        self.directory = Path(directory)
+        self._lock = threading.Lock()
+
+    def partition(self, agency, year, month):
+        return self.directory / f"agence={_slug(agency)}" / f"{YEAR}={int(year)}" / f"{MONTH}={int(month):02d}"
+
+    def add(self, agency, year, month, frame, fingerprint):
+        # Archive (ou remplace) l'extrait du mois ; écriture atomique comme le cache disque
+        folder = self.partition(agency, year, month)
+        folder.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pandas(frame.reset_index(drop=True), preserve_index=False)
+        metadata = dict(table.schema.metadata or {})
+        metadata.update({_FINGERPRINT: str(fingerprint).encode(), _AGENCY: str(agency).encode()})
+        temporary = folder / f"{_FILE}.tmp"
+        with self._lock:
+            pq.write_table(table.replace_schema_metadata(metadata), temporary)
+            os.replace(temporary, folder / _FILE)
+        return self._extract(folder / _FILE)
+
+    def _extract(self, path):
+        metadata = pq.read_metadata(path)
+        extra = metadata.metadata or {}
+        year = int(path.parent.parent.name.split("=", 1)[1])
+        month = int(path.parent.name.split("=", 1)[1])
+        return Extract(extra.get(_AGENCY, b"").decode(), year, month, metadata.num_rows,
+                       extra.get(_FINGERPRINT, b"").decode(), path)
+
+    def extracts(self, agency=None, years=None, months=None):
+        """Extraits archivés, du plus ancien au plus récent, retenus d'après les seuls chemins de partition
+        (agence, années, mois) ; seuls les pieds de fichier Parquet sont lus pour le nombre de lignes."""
+        pattern = f"agence={_slug(agency)}" if agency is not None else "agence=*"
+        found = []
+        for path in self.directory.glob(f"{pattern}/{YEAR}=*/{MONTH}=*/{_FILE}"):
+            year = int(path.parent.parent.name.split("=", 1)[1])
+            month = int(path.parent.name.split("=", 1)[1])
+            if (years is None or year in years) and (months is None or month in months):
+                found.append(self._extract(path))
+        return sorted(found, key=lambda extract: (extract.year, extract.month, extract.agency))
+
+    def read(self, extract, columns=None, filter=None):
+        # Un extrait, restreint aux colonnes existantes demandées et aux lignes vérifiant `filter` (expression Arrow)
+        if columns is not None:
+            available = set(pq.read_schema(extract.path).names)
+            columns = [column for column in columns if column in available]
+        table = pq.read_table(extract.path, columns=columns, filters=filter)
+        return table.to_pandas(types_mapper=_ARROW_TEXT.get)
+
+    def load(self, extract):
+        # Extrait complet rechargé comme un jeu uploadé (même empreinte que le fichier d'origine)
+        frame = self.read(extract)
+        frame.attrs.clear()
+        frame.attrs.update({"fingerprint": extract.fingerprint, "cache": "historique",
+                            "periode": f"{extract.month:02d}/{extract.year}"})
+        return frame
+
+    def search(self, agency, conditions, columns, identifier_columns=None, years=None):
+        """Lignes des extraits de l'agence (années `years`, toutes sinon) retenues par les `conditions` des filtres
+        du tableau, avec les colonnes `columns` et la période de l'extrait. Seules les partitions retenues sont
+        ouvertes, et dans chaque fichier seules les colonnes des conditions et de l'affichage sont lues."""
+        filtered = [condition.column for condition in conditions if condition.value]
+        needed = list(dict.fromkeys(list(columns) + filtered))
+        frames = []
+        for extract in self.extracts(agency, years):
+            names = set(pq.read_schema(extract.path).names)
+            expression = history_filter(conditions, identifier_columns or {}, names)
+            if expression is None:
+                continue
+            found = self.read(extract, needed, expression)
+            if not found.empty:
+                frames.append(found.assign(**{YEAR: extract.year, MONTH: extract.month}))
+        if not frames:
+            return pd.DataFrame(columns=[YEAR, MONTH] + list(columns))
+        result = pd.concat([frame.astype(object) for frame in frames], ignore_index=True)
+        return result[[YEAR, MONTH] + [column for column in needed if column in result.columns]]
+
+    def counts(self, agency, column, years=None, months=None, conditions=(), identifier_columns=None):
+        """Nombre de lignes par extrait (année, mois) et valeur de `column`, restreint aux lignes vérifiant
+        `conditions` : seules les partitions retenues sont ouvertes, et seules `column` et les colonnes des
+        conditions sont lues, lot par lot, sans jamais charger un extrait complet en mémoire."""
+        parts = []
+        for extract in self.extracts(agency, years, months):
+            source = ds.dataset(extract.path, format="parquet")
+            if column not in source.schema.names:
+                continue
+            expression = history_filter(conditions, identifier_columns or {}, set(source.schema.names))
+            for batch in source.to_batches(columns=[column], filter=expression, batch_size=BATCH_ROWS):
+                values = batch.column(0).to_pandas().astype(object)
+                counts = values.value_counts(dropna=True)
+                parts.append(pd.DataFrame({YEAR: extract.year, MONTH: extract.month, column: counts.index,
+                                           COUNT: counts.to_numpy()}))
+        if not parts:
+            return pd.DataFrame(columns=[YEAR, MONTH, column, COUNT])
+        return pd.concat(parts, ignore_index=True).groupby([YEAR, MONTH, column], as_index=False)[COUNT].sum()
+
+def year_over_year(counts, column, month):
+    """Tableau comparatif pour un mois donné : une ligne par valeur de `column`, une colonne par année,
+    plus la variation (en %) entre les deux dernières années disponibles."""
+    selected = counts[counts[MONTH] == month]
+    table = selected.pivot_table(index=column, columns=YEAR, values=COUNT, aggfunc="sum", fill_value=0)
+    table = table.sort_index(axis=1)
+    table.columns = [str(year) for year in table.columns]
+    if table.shape[1] >= 2:
+        previous, last = table.iloc[:, -2], table.iloc[:, -1]
+        table["Variation (%)"] = ((last - previous) / previous.where(previous > 0) * 100).round(1)
+    table.index = table.index.astype(str)
+    return table
+
+
+history_store = HistoryStore()
@@ -0,0 +1,268 @@
+import numpy as np
+import pandas as pd
+
+# Modes de recherche supportés par les index d'identifiants
+MODE_CONTAINS = "contains"
+MODE_PREFIX = "prefix"
+MODE_EXACT = "exact"
+
+NGRAM_SIZE = 3
+# Au-delà de ce nombre de valeurs distinctes, on passe par un masque vectorisé plutôt que par des tranches
+_GATHER_THRESHOLD = 1000
+
+
+def as_text(series):
+    # Représentation texte des identifiants : 12345.0 -> "12345", valeurs manquantes conservées en NaN
+    present = series.notna().to_numpy()
+    text = np.full(len(series), np.nan, dtype=object)
+    values = series[present]
+    converted = values.astype(str).to_numpy(dtype=object)
+    if pd.api.types.is_float_dtype(series.dtype):
+        numbers = values.to_numpy(dtype=float)
+        integral = np.isfinite(numbers) & (np.mod(numbers, 1) == 0)
+        converted[integral] = numbers[integral].astype(np.int64).astype(str)
+    text[present] = converted
+    return pd.Series(text, dtype=object)
+
+
+def _codepoints(values):
+    # Matrice (valeur, position) des points de code, complétée par des zéros
+    array = np.asarray(values, dtype=str) if len(values) else np.empty(0, dtype="<U1")
+    if array.dtype.itemsize == 0:
+        array = array.astype("<U1")
+    return array.view(np.uint32).reshape(len(array), -1).astype(np.int64)
+
+
+def _gram_keys(codepoints, start, n):
+    # Encode le n-gramme commençant à `start` en entier (21 bits par point de code)
+    key = np.zeros(len(codepoints), dtype=np.int64)
+    for offset in range(n):
+        key = (key << 21) | codepoints[:, start + offset]
+    return key
+
+
+class NgramIndex:
+    """Index n-grammes sur un tableau de chaînes distinctes : n-gramme -> positions des chaînes qui le contiennent."""
+
+    def __init__(self, values, n=NGRAM_SIZE, chunk_size=100_000):
+        self.n = n
+        keys, owners = [], []
+        for chunk_start in range(0, len(values), chunk_size):
+            codepoints = _codepoints(values[chunk_start:chunk_start + chunk_size])
+            lengths = (codepoints > 0).sum(axis=1)
+            for start in range(max(0, codepoints.shape[1] - n + 1)):
+                eligible = np.flatnonzero(lengths >= start + n)
+                keys.append(_gram_keys(codepoints[eligible], start, n))
+                owners.append(eligible + chunk_start)
+        keys = np.concatenate(keys) if keys else np.empty(0, dtype=np.int64)
+        owners = np.concatenate(owners) if owners else np.empty(0, dtype=np.int64)
+
+        # Une seule entrée par couple (n-gramme, chaîne), triée par n-gramme puis par chaîne
+        order = np.lexsort((owners, keys))
+        keys, owners = keys[order], owners[order]
+        distinct = np.ones(len(keys), dtype=bool)
+        distinct[1:] = (keys[1:] != keys[:-1]) | (owners[1:] != owners[:-1])
+        keys, self._owners = keys[distinct], owners[distinct]
+
+        self._grams = np.unique(keys)
+        self._offsets = np.searchsorted(keys, self._grams)
+        self._offsets = np.append(self._offsets, len(keys))
+        # Nombre de n-grammes distincts par chaîne (utile pour les scores de similarité)
+        self.gram_counts = np.bincount(self._owners, minlength=len(values))
+
+    def gram_ids(self, text):
+        # Identifiants des n-grammes de `text` dans l'index (-1 si absent)
+        if len(text) < self.n:
+            return np.empty(0, dtype=np.int64)
+        if len(self._grams) == 0:
+            return np.full(len(text) - self.n + 1, -1)
+        codepoints = _codepoints([text])
+        keys = np.unique([_gram_keys(codepoints, start, self.n)[0] for start in range(len(text) - self.n + 1)])
+        positions = np.searchsorted(self._grams, keys)
+        found = (positions < len(self._grams)) & (self._grams[np.minimum(positions, len(self._grams) - 1)] == keys)
+        return np.where(found, positions, -1)
+
+    def postings(self, gram_ids):
+        return [self._owners[self._offsets[g]:self._offsets[g + 1]] for g in gram_ids]
+
+    def candidates(self, text):
+        # Chaînes contenant tous les n-grammes de la requête (sur-ensemble des chaînes contenant la requête)
+        gram_ids = self.gram_ids(text)
+        if len(gram_ids) == 0 or (gram_ids < 0).any():
+            return np.empty(0, dtype=np.int64)
+        lists = sorted(self.postings(gram_ids), key=len)
+        result = lists[0]
+        for other in lists[1:]:
+            if len(result) == 0:
+                break
+            result = np.intersect1d(result, other, assume_unique=True)
+        return result
+
+
+class IdentifierIndex:
+    """Index d'une colonne d'identifiants : valeurs distinctes triées, lignes par valeur et n-grammes.
+
+    Les recherches exactes et par préfixe se font par dichotomie, les recherches par sous-chaîne
+    via l'index n-grammes ; toutes renvoient des positions de lignes triées.
+    """
+
+    def __init__(self, series, case_sensitive=True):
+        self.case_sensitive = case_sensitive
+        text = self._prepare(series)
+        codes, uniques = pd.factorize(text, sort=True)
+        self.values = np.asarray(uniques, dtype=object)
+        self._codes = codes
+
+        valid_rows = np.flatnonzero(codes >= 0)
+        order = np.argsort(codes[valid_rows], kind="stable")
+        self._rows = valid_rows[order]
+        self._offsets = np.searchsorted(codes[valid_rows][order], np.arange(len(self.values) + 1))
+        self._ngrams = NgramIndex(self.values)
+
+    def __len__(self):
+        return len(self._codes)
+
+    def _prepare(self, series):
+        text = as_text(series)
+        return text if self.case_sensitive else text.str.lower()
+
+    def _normalize_query(self, query):
+        query = str(query).strip()
+        return query if self.case_sensitive else query.lower()
+
+    def rows_for(self, value_ids):
+        # Positions (triées) des lignes portant l'une des valeurs distinctes données
+        value_ids = np.asarray(value_ids, dtype=np.int64)
+        if len(value_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        if len(value_ids) > _GATHER_THRESHOLD:
+            selected = np.zeros(len(self.values) + 1, dtype=bool)
+            selected[value_ids] = True
+            return np.flatnonzero(selected[self._codes])
+        chunks = [self._rows[self._offsets[v]:self._offsets[v + 1]] for v in value_ids]
+        return np.sort(np.concatenate(chunks))
+
+    def match_values(self, query, mode=MODE_CONTAINS):
+        # Identifiants des valeurs distinctes correspondant à la requête
+        query = self._normalize_query(query)
+        if not query:
+            return np.arange(len(self.values))
+        if mode == MODE_EXACT:
+            position = np.searchsorted(self.values, query)
+            if position < len(self.values) and self.values[position] == query:
+                return np.array([position])
+            return np.empty(0, dtype=np.int64)
+        if mode == MODE_PREFIX:
+            start = np.searchsorted(self.values, query, side="left")
+            end = np.searchsorted(self.values, query + "\U0010ffff", side="left")
+            return np.arange(start, end)
+        if mode != MODE_CONTAINS:
+            raise ValueError(f"Mode de recherche inconnu : {mode}")
+
+        if len(query) < self._ngrams.n:
+            candidates = np.arange(len(self.values))
+        else:
+            candidates = self._ngrams.candidates(query)
+        if len(candidates) == 0:
+            return candidates
+        matches = pd.Series(self.values[candidates], dtype=object).str.contains(query, regex=False).to_numpy()
+        return candidates[matches]
+
+    def lookup(self, query, mode=MODE_CONTAINS):
+        return self.rows_for(self.match_values(query, mode))
+
+    def filter_rows(self, rows, query, mode=MODE_CONTAINS):
+        """Sous-ensemble des positions `rows` correspondant à la requête (même résultat que d'intersecter
+        avec `lookup`), évalué sur les seules valeurs distinctes de ces lignes."""
+        rows = np.asarray(rows, dtype=np.int64)
+        codes = self._codes[rows]
+        present = codes >= 0
+        rows, codes = rows[present], codes[present]
+        query = self._normalize_query(query)
+        if not query or len(rows) == 0:
+            return rows
+        if len(rows) >= len(self.values):
+            # Plus de lignes que de valeurs distinctes : la recherche sur les valeurs de l'index est moins chère
+            selected = np.zeros(len(self.values), dtype=bool)
+            selected[self.match_values(query, mode)] = True
+            return rows[selected[codes]]
+        distinct, inverse = np.unique(codes, return_inverse=True)
+        values = pd.Series(self.values[distinct], dtype=object)
+        if mode == MODE_EXACT:
+            matches = (values == query).to_numpy()
+        elif mode == MODE_PREFIX:
+            matches = values.str.startswith(query).to_numpy(dtype=bool)
+        elif mode == MODE_CONTAINS:
+            matches = values.str.contains(query, regex=False).to_numpy(dtype=bool)
+        else:
+            raise ValueError(f"Mode de recherche inconnu : {mode}")
+        return rows[matches[inverse]]
+
+
+class PatchedIndex:
+    """Index de base complété par un petit index des lignes modifiées ou ajoutées depuis sa construction.
+
+    Les positions `stale` (lignes modifiées) sont écartées des résultats de la base ; l'index `overlay`,
+    construit sur les seules lignes touchées, renvoie des positions relatives traduites via `overlay_rows`.
+    """
+
+    def __init__(self, base, stale, overlay, overlay_rows, length):
+        self.base = base
+        self.stale = np.sort(np.asarray(stale, dtype=np.int64))
+        self.overlay = overlay
+        self.overlay_rows = np.asarray(overlay_rows, dtype=np.int64)
+        self.length = length
+
+    def __len__(self):
+        return self.length
+
+    @property
+    def patched_rows(self):
+        # Nombre total de lignes servies par des index de mise à jour (toutes générations confondues)
+        previous = self.base.patched_rows if isinstance(self.base, PatchedIndex) else 0
+        return previous + len(self.overlay_rows)
+
+    def _fresh(self, rows):
+        return rows[~np.isin(rows, self.stale)]
+
+    def lookup(self, query, mode=MODE_CONTAINS):
+        rows = self._fresh(self.base.lookup(query, mode))
+        extra = self.overlay_rows[self.overlay.lookup(query, mode)]
+        return np.union1d(rows, extra)
+
+    def filter_rows(self, rows, query, mode=MODE_CONTAINS):
+        # Lignes touchées évaluées par l'index de mise à jour, les autres par la base
+        rows = np.asarray(rows, dtype=np.int64)
+        sorter = np.argsort(self.overlay_rows, kind="stable")
+        slots = np.searchsorted(self.overlay_rows, rows, sorter=sorter).clip(max=max(0, len(sorter) - 1))
+        in_overlay = (self.overlay_rows[sorter[slots]] == rows) if len(sorter) else np.zeros(len(rows), dtype=bool)
+        kept = np.zeros(len(rows), dtype=bool)
+        base_rows = np.flatnonzero(~in_overlay)
+        kept[base_rows[np.isin(rows[base_rows], self.base.filter_rows(rows[base_rows], query, mode))]] = True
+        overlay_rows = np.flatnonzero(in_overlay)
+        relative = sorter[slots[overlay_rows]]
+        matched = self.overlay.filter_rows(relative, query, mode)
+        kept[overlay_rows[np.isin(relative, matched)]] = True
+        return rows[kept]
+
+    def rank(self, query, *args, **kwargs):
+        rows, scores = self.base.rank(query, *args, **kwargs)
+        keep = ~np.isin(rows, self.stale)
+        extra_rows, extra_scores = self.overlay.rank(query, *args, **kwargs)
+        rows = np.concatenate([rows[keep], self.overlay_rows[extra_rows]])
+        scores = np.concatenate([scores[keep], extra_scores])
+        order = np.argsort(rows, kind="stable")
+        return rows[order], scores[order]
+
+
+# Au-delà de cette proportion de lignes servies par des index de mise à jour, l'index est reconstruit en entier
+MAX_PATCHED_RATIO = 0.2
+
+
+def patch_index(index, stale, touched_rows, touched_values, length, build):
+    """Met à jour `index` après un delta : `touched_rows` sont les positions modifiées ou ajoutées et
+    `touched_values` leurs nouvelles valeurs ; `build(series)` construit un index du même type."""
+    patched = PatchedIndex(index, stale, build(touched_values.reset_index(drop=True)), touched_rows, length)
+    if patched.patched_rows > MAX_PATCHED_RATIO * length:
+        return None
+    return patched
@@ -0,0 +1,121 @@
+import numpy as np
+import pandas as pd
+
+from core.dataset import file_fingerprint
+from core.disk_cache import dataset_cache
+from core.excel_stream import read_excel_streaming
+
+ETAT_CONTRAT = "État Contrat"
+DATE_RESILIATION = "Date resiliation du contrat"
+
+# Une colonne texte devient catégorielle si elle a peu de valeurs distinctes par rapport au nombre de lignes
+CATEGORY_MAX_RATIO = 0.5
+CATEGORY_MAX_VALUES = 5000
+
+TEXT_DTYPE = "string[pyarrow]"
+
+
+def memory_usage(df):
+    return int(df.memory_usage(deep=True).sum())
+
+
+def is_date_column(name):
+    return "date" in str(name).lower()
+
+
+def _is_text(series):
+    dtype = series.dtype
+    return pd.api.types.is_object_dtype(dtype) or (
+        pd.api.types.is_string_dtype(dtype) and not isinstance(dtype, pd.CategoricalDtype))
+
+
+def _categorical(text):
+    # Catégories toujours en objets Python, que le texte source soit en objets ou en chaînes Arrow
+    series = text.astype("category")
+    categories = series.cat.categories
+    if categories.dtype != object:
+        dtype = pd.CategoricalDtype(categories.astype(object))
+        series = pd.Series(pd.Categorical.from_codes(series.cat.codes, dtype=dtype), index=text.index)
+    return series
+
+
+def contract_state(resiliation):
+    # "Résilié" si une date de résiliation est renseignée, "En service" sinon (calcul vectorisé)
+    states = np.where(resiliation.notna().to_numpy(), "Résilié", "En service")
+    return pd.Series(pd.Categorical(states, categories=["En service", "Résilié"]), index=resiliation.index)
+
+
+def normalize_frame(df):
+    """Convertit un DataFrame brut en types compacts ; renvoie (DataFrame, rapport de conversion).
+
+    Dates parsées une seule fois, texte peu varié en `category`, reste du texte en chaînes Arrow,
+    entiers réduits, et colonne "État Contrat" calculée lorsque la date de résiliation existe.
+    """
+    before = memory_usage(df)
+    columns = {}
+    conversions = {}
+    for name in df.columns:
+        series = df[name]
+        if is_date_column(name) and not pd.api.types.is_datetime64_any_dtype(series.dtype):
+            series = pd.to_datetime(series, errors="coerce")
+        elif _is_text(series):
+            distinct = series.nunique(dropna=True)
+            # Les chaînes Arrow (lecture par blocs) sont déjà du texte : pas de passage par des objets Python
+            text = series if series.dtype == TEXT_DTYPE else series.astype(str).where(series.notna())
+            if distinct <= CATEGORY_MAX_VALUES and distinct <= CATEGORY_MAX_RATIO * max(1, len(series)):
+                series = _categorical(text)
+            else:
+                series = text.astype(TEXT_DTYPE)
+        elif pd.api.types.is_integer_dtype(series.dtype):
+            series = pd.to_numeric(series, downcast="integer")
+        if series.dtype != df[name].dtype:
+            conversions[name] = f"{df[name].dtype} → {series.dtype}"
+        columns[name] = series
+
+    normalized = pd.DataFrame(columns, index=df.index)
+    if DATE_RESILIATION in normalized.columns:
+        normalized[ETAT_CONTRAT] = contract_state(normalized[DATE_RESILIATION])
+    normalized.attrs.update(df.attrs)
+
+    report = {"avant": before, "après": memory_usage(normalized), "conversions": conversions}
+    return normalized, report
+
+
+def format_bytes(size):
+    for unit in ["o", "Ko", "Mo"]:
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} Go"
+
+
+def read_upload(uploaded_file, cache=dataset_cache, progress=None):
+    # Lecture d'un fichier uploadé (Excel ou Parquet) normalisé, servie par le cache disque si le contenu est connu
+    # Les classeurs Excel sont lus par blocs ; `progress` suit l'avancement (voir `read_excel_streaming`)
+    fingerprint = file_fingerprint(uploaded_file)
+    df = cache.get(fingerprint)
+    if df is not None:
+        df.attrs.pop("ingest", None)
+        df.attrs.update({"fingerprint": fingerprint, "cache": "hit"})
+        return df
+
+    if uploaded_file.name.endswith('.xlsx'):
+        df = read_excel_streaming(uploaded_file, progress=progress)
+    else:
+        df = pd.read_parquet(uploaded_file)
+    df, report = normalize_frame(df)
+    df.attrs.update({"fingerprint": fingerprint, "cache": "miss", "ingest": report})
+    cache.put(fingerprint, df)
+    return df
+
+
+def describe_report(attrs):
+    # Résumé lisible du chargement : gain mémoire à l'ingestion ou lecture depuis le cache disque
+    if attrs.get("cache") == "historique":
+        return f"Extrait de {attrs['periode']} chargé depuis l'historique"
+    if "ingest" not in attrs:
+        return "Chargé depuis le cache disque" if attrs.get("cache") == "hit" else ""
+    report = attrs["ingest"]
+    before, after = report["avant"], report["après"]
+    ratio = before / after if after else 1
+    return f"Mémoire : {format_bytes(before)} → {format_bytes(after)} (÷{ratio:.1f})"
@@ -0,0 +1,161 @@
+import numpy as np
+import pandas as pd
+
+from core.cube import COUNT, POWER_TOTAL
+from core.text_search import fold_series
+
+# Colonnes des extractions de contrats, la première présente est retenue (El Kelaa, puis autres agences)
+COMMUNE_COLUMNS = ["Commune", "Nom commune"]
+CATEGORY_COLUMNS = ["Catégorie d'abonnement", "Libelle categorie facturation"]
+STATE_COLUMN = "État Contrat"
+ACTIVE = "En service"
+UNKNOWN = "Non renseigné"
+
+# Colonnes de l'inventaire des postes
+FEEDER = "NOMDEPART"
+COMMUNE = "NOM COMMUNE"
+
+# Colonnes des tableaux de charge
+POSTES = "Postes"
+COMMUNES = "Communes"
+POWER = "Puissance installée"
+CONTRACTS = "Contrats"
+ACTIVE_CONTRACTS = "Contrats actifs"
+POWER_PER_CONTRACT = "Puissance par contrat actif"
+LOAD_INDEX = "Indice de charge"
+CATEGORY = "Catégorie"
+_KEY = "clé commune"
+_FEEDER_KEY = "clé départ"
+
+
+def join_keys(series):
+    """Clés de jointure hachées (uint64) d'une colonne de communes ou de départs : "EL KELÂA" et "El Kelaa"
+    donnent la même clé. Le repliement n'est calculé qu'une fois par valeur distincte."""
+    folded = fold_series(series.astype(object)).fillna("")
+    return pd.util.hash_array(folded.to_numpy(dtype=object), categorize=True)
+
+
+def _first_column(frame, candidates):
+    return next((column for column in candidates if column in frame.columns), None)
+
+
+class ContractLoad:
+    """Contrats d'un jeu par (commune, catégorie) : nombre total et nombre en service, avec la clé de jointure
+    de la commune. Calculé en une passe groupée ; les comptes sont additifs et se mettent à jour après un delta."""
+
+    COLUMNS = [_KEY, COMMUNE, CATEGORY, CONTRACTS, ACTIVE_CONTRACTS]
+
+    def __init__(self, cells):
+        self.cells = cells
+
+    @classmethod
+    def empty(cls):
+        return cls(pd.DataFrame({_KEY: np.array([], dtype=np.uint64), COMMUNE: np.array([], dtype=object),
+                                 CATEGORY: np.array([], dtype=object), CONTRACTS: np.array([], dtype=np.int64),
+                                 ACTIVE_CONTRACTS: np.array([], dtype=np.int64)}))
+
+    @classmethod
+    def build(cls, frame):
+        commune = _first_column(frame, COMMUNE_COLUMNS)
+        if commune is None or frame.empty:
+            return cls.empty()
+        category = _first_column(frame, CATEGORY_COLUMNS)
+        codes, labels = pd.factorize(frame[commune])
+        rows = pd.DataFrame({
+            "code": codes,
+            CATEGORY: frame[category].astype(object).fillna(UNKNOWN).to_numpy() if category else UNKNOWN,
+            ACTIVE_CONTRACTS: (frame[STATE_COLUMN] == ACTIVE).to_numpy(dtype=bool) if STATE_COLUMN in frame.columns
+            else False,
+        })
+        # Contrats sans commune : hors jointure
+        rows = rows[rows["code"] >= 0]
+        cells = rows.groupby(["code", CATEGORY], sort=False).agg(**{CONTRACTS: (ACTIVE_CONTRACTS, "size"),
+                                                                    ACTIVE_CONTRACTS: (ACTIVE_CONTRACTS, "sum")})
+        cells = cells.reset_index()
+        # Clés hachées sur les communes distinctes seulement
+        codes = cells["code"].to_numpy()
+        cells[_KEY] = join_keys(pd.Series(labels))[codes]
+        cells[COMMUNE] = np.asarray(labels, dtype=object)[codes]
+        return cls(cells[cls.COLUMNS])
+
+    def apply_delta(self, removed, added):
+        # Comme pour le cube des contrats : on retranche les anciennes lignes et on ajoute les nouvelles
+        before = ContractLoad.build(removed).cells
+        after = ContractLoad.build(added).cells
+        before[[CONTRACTS, ACTIVE_CONTRACTS]] = -before[[CONTRACTS, ACTIVE_CONTRACTS]]
+        cells = pd.concat([self.cells, before, after], ignore_index=True)
+        cells = cells.groupby([_KEY, CATEGORY], sort=False).agg(**{COMMUNE: (COMMUNE, "first"),
+                                                                   CONTRACTS: (CONTRACTS, "sum"),
+                                                                   ACTIVE_CONTRACTS: (ACTIVE_CONTRACTS, "sum")})
+        cells = cells.reset_index()
+        return ContractLoad(cells.loc[cells[CONTRACTS] != 0, self.COLUMNS].reset_index(drop=True))
+
+
+def postes_side(rollup):
+    """Postes et puissance installée par (commune, départ) avec leurs clés de jointure, depuis le cumul
+    des agrégats de puissance par NOM COMMUNE et NOMDEPART (`CapacityCube.rollup`)."""
+    cells = rollup.reset_index()
+    communes = cells[COMMUNE].astype(object).fillna(UNKNOWN)
+    feeders = cells[FEEDER].astype(object).fillna(UNKNOWN)
+    return pd.DataFrame({
+        _KEY: join_keys(communes),
+        _FEEDER_KEY: join_keys(feeders),
+        COMMUNE: communes.to_numpy(),
+        FEEDER: feeders.to_numpy(),
+        POSTES: cells[COUNT].to_numpy(dtype=np.int64),
+        POWER: cells[POWER_TOTAL].fillna(0).to_numpy(dtype=float),
+    })
+
+
+def _ratios(table, reference):
+    # Puissance par contrat actif ; indice de charge : contrats actifs par unité de puissance, 1 = moyenne du parc.
+    # Sans contrat chargé (commune d'une agence non chargée) ou sans puissance, pas de ratio
+    active = table[ACTIVE_CONTRACTS].where(table[ACTIVE_CONTRACTS] > 0)
+    power = table[POWER].where((table[POWER] > 0) & (table[CONTRACTS] > 0))
+    table[POWER_PER_CONTRACT] = (table[POWER] / active).round(2)
+    table[LOAD_INDEX] = (table[ACTIVE_CONTRACTS] / power / reference).round(2) if reference else np.nan
+    return table
+
+
+def load_tables(contracts, postes):
+    """Charge des communes et des départs : contrats (total, en service, répartition par catégorie des contrats
+    en service) rapportés à la puissance installée.
+
+    `contracts` : cellules de `ContractLoad` (une table par agence chargée) ; `postes` : table de `postes_side`.
+    Les contrats ne portent pas de départ : ceux d'une commune sont répartis entre les départs qui la desservent
+    au prorata de leur puissance installée dans la commune. Renvoie (communes, départs), triés par indice de
+    charge ; les communes sans poste ou sans contrat restent dans le tableau des communes, sans ratio.
+    """
+    contracts = pd.concat(contracts, ignore_index=True) if contracts else ContractLoad.empty().cells
+    mix = contracts.pivot_table(index=_KEY, columns=CATEGORY, values=ACTIVE_CONTRACTS, aggfunc="sum", fill_value=0)
+    categories = [str(column) for column in mix.columns]
+    mix.columns = categories
+    demand = contracts.groupby(_KEY).agg(**{COMMUNE: (COMMUNE, "first"), CONTRACTS: (CONTRACTS, "sum"),
+                                            ACTIVE_CONTRACTS: (ACTIVE_CONTRACTS, "sum")}).join(mix)
+    counts = [CONTRACTS, ACTIVE_CONTRACTS] + categories
+
+    supply = postes.groupby(_KEY).agg(**{COMMUNE: (COMMUNE, "first"), POSTES: (POSTES, "sum"), POWER: (POWER, "sum")})
+    communes = supply.join(demand.drop(columns=COMMUNE), how="outer")
+    # Libellé de l'inventaire des postes, sinon celui des contrats
+    communes[COMMUNE] = communes[COMMUNE].fillna(demand[COMMUNE].reindex(communes.index))
+    communes[counts + [POSTES]] = communes[counts + [POSTES]].fillna(0).astype(np.int64)
+    communes[POWER] = communes[POWER].fillna(0.0)
+    # Référence de l'indice : communes présentes des deux côtés
+    matched = communes[(communes[POWER] > 0) & (communes[CONTRACTS] > 0)]
+    reference = matched[ACTIVE_CONTRACTS].sum() / matched[POWER].sum() if len(matched) else 0
+    communes = _ratios(communes, reference)
+
+    # Part de chaque (commune, départ) dans la puissance installée de la commune
+    share = postes[POWER] / postes.groupby(_KEY)[POWER].transform("sum").where(lambda power: power > 0)
+    allocated = pd.DataFrame(demand[counts].reindex(postes[_KEY]).fillna(0).to_numpy()
+                             * share.fillna(0).to_numpy()[:, None], columns=counts)
+    allocated[_FEEDER_KEY] = postes[_FEEDER_KEY].to_numpy()
+    feeders = postes.groupby(_FEEDER_KEY).agg(**{FEEDER: (FEEDER, "first"), COMMUNES: (_KEY, "nunique"),
+                                                 POSTES: (POSTES, "sum"), POWER: (POWER, "sum")})
+    feeders = _ratios(feeders.join(allocated.groupby(_FEEDER_KEY).sum().round(1)), reference)
+
+    columns = [POSTES, POWER, CONTRACTS, ACTIVE_CONTRACTS, POWER_PER_CONTRACT, LOAD_INDEX] + categories
+    communes = communes.set_index(COMMUNE)[columns].sort_values(LOAD_INDEX, ascending=False, na_position="last")
+    feeders = feeders.set_index(FEEDER)[[COMMUNES] + columns].sort_values(LOAD_INDEX, ascending=False,
+                                                                            na_position="last")
+    return communes, feeders
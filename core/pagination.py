@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from core.indexes import MAX_PATCHED_RATIO
+
+
+def sort_permutation(series, ascending=False):
+    # Positions des lignes dans l'ordre de tri (valeurs manquantes en fin, tri stable)
+    values = series.reset_index(drop=True)
+    return values.sort_values(ascending=ascending, na_position="last", kind="stable").index.to_numpy()
+
+
+def _sort_keys(series):
+    # Valeurs comparables et valeurs manquantes ; une colonne catégorielle se trie sur ses codes, comme chez pandas
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        return codes, codes < 0
+    return series.to_numpy(), series.isna().to_numpy()
+
+
+def patch_permutation(order, series, stale, ascending=False):
+    """Permutation de tri de `series` (tableau après un delta) déduite de l'ancienne `order` : les lignes `stale`
+    (modifiées ou ajoutées) en sont retirées puis réinsérées à leur place par dichotomie, sans nouveau tri complet.
+
+    Donne exactement `sort_permutation(series, ascending)` (égalités dans l'ordre des positions, valeurs
+    manquantes en fin) ; None si trop de lignes sont touchées ou si les valeurs ne se comparent pas.
+    """
+    stale = np.unique(stale)
+    if len(stale) > MAX_PATCHED_RATIO * len(series):
+        return None
+    keys, missing = _sort_keys(series)
+    removed = np.zeros(len(series), dtype=bool)
+    removed[stale] = True
+    kept = order[~removed[order]]
+    present, absent = kept[~missing[kept]], kept[missing[kept]]
+    new_present = stale[~missing[stale]]
+    # Lignes réinsérées dans leur ordre de tri relatif
+    new_present = new_present[sort_permutation(series.iloc[new_present], ascending)]
+    # Dichotomie sur les valeurs croissantes (ordre inverse pour un tri décroissant)
+    values = keys[present] if ascending else keys[present[::-1]]
+    try:
+        low = np.searchsorted(values, keys[new_present], side="left")
+        high = np.searchsorted(values, keys[new_present], side="right")
+    except TypeError:
+        return None
+    if not ascending:
+        low, high = len(present) - high, len(present) - low
+    # Parmi les valeurs égales (positions croissantes), place donnée par la position de la ligne
+    slots = low.copy()
+    for i in np.flatnonzero(high > low):
+        slots[i] += np.searchsorted(present[low[i]:high[i]], new_present[i])
+    present = np.insert(present, slots, new_present)
+    return np.concatenate([present, np.sort(np.concatenate([absent, stale[missing[stale]]]))])
+
+
+class SortedPager:
+    """Pagination d'un résultat filtré : la permutation de tri est calculée une fois, chaque page n'extrait que ses lignes.
+
+    Le résultat est donné par les `positions` des lignes retenues dans `frame` (toutes si None), sans copie du tableau.
+    Seule la permutation est conservée : le tableau est passé à chaque page, pour qu'un pager mis en cache ne retienne
+    pas en mémoire un jeu déporté sur disque ou libéré.
+    Si `order` (permutation de tri de tout `frame`, préchauffée) est fourni, les lignes retenues y sont relevées
+    dans l'ordre au lieu d'être triées à nouveau (positions croissantes : le tri stable donne le même ordre).
+    """
+
+    def __init__(self, frame, sort_column=None, ascending=False, positions=None, order=None):
+        self.sort_column = sort_column
+        self.ascending = ascending
+        rows = np.arange(len(frame)) if positions is None else np.asarray(positions)
+        if sort_column is None or sort_column not in frame.columns:
+            self.order = rows
+        elif order is not None and np.all(rows[1:] > rows[:-1]):
+            retained = np.zeros(len(frame), dtype=bool)
+            retained[rows] = True
+            self.order = order[retained[order]]
+        else:
+            self.order = rows[sort_permutation(frame[sort_column].iloc[rows], ascending)]
+
+    def __len__(self):
+        return len(self.order)
+
+    def page_count(self, page_size):
+        return max(1, (len(self.order) + page_size - 1) // page_size)
+
+    def page(self, frame, number, page_size):
+        start = (number - 1) * page_size
+        return frame.iloc[self.order[start:start + page_size]]
@@ -0,0 +1,161 @@
+import csv
+import functools
+import io
+import json
+import os
+import threading
+import time
+
+# Pile des mesures en cours du script Streamlit courant (un thread par session et par exécution)
+_state = threading.local()
+
+# Colonnes des exports CSV, dans l'ordre
+SPAN_FIELDS = ["execution", "debut", "fonction", "profondeur", "secondes", "lignes_entree", "lignes_sortie", "cache",
+               "memoire_delta"]
+
+try:
+    _PAGE_SIZE = os.sysconf("SC_PAGE_SIZE")
+except (AttributeError, ValueError, OSError):
+    _PAGE_SIZE = None
+
+
+def rss_bytes():
+    # Mémoire résidente actuelle du processus (Linux) ; None ailleurs
+    if _PAGE_SIZE is None:
+        return None
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * _PAGE_SIZE
+    except OSError:
+        return None
+
+
+def _length(value):
+    # Nombre de lignes d'un argument ou d'un résultat (DataFrame, Dataset, positions...), None sinon
+    if value is None or isinstance(value, (str, bytes, dict)):
+        return None
+    if isinstance(value, tuple):
+        return _length(value[0]) if value else None
+    try:
+        return len(value)
+    except TypeError:
+        return None
+
+
+def _cache_status(result, span):
+    # Fonction mise en cache : "miss" si le calcul a été exécuté ; lecture : statut du cache disque
+    if span["calcul"] is not None:
+        return "miss" if span["calcul"] else "hit"
+    attrs = getattr(result, "attrs", None)
+    if isinstance(attrs, dict) and "cache" in attrs:
+        return attrs["cache"]
+    return None
+
+
+class RunRecorder:
+    """Mesures d'une exécution du script (un rerun Streamlit) : une entrée par appel instrumenté."""
+
+    def __init__(self, number):
+        self.number = number
+        self.started = time.time()
+        self.spans = []
+        self._stack = []
+
+    def open(self, name, args):
+        span = {
+            "execution": self.number,
+            "debut": round(time.time() - self.started, 6),
+            "fonction": name,
+            "profondeur": len(self._stack),
+            "secondes": None,
+            "lignes_entree": next((n for n in map(_length, args) if n is not None), None),
+            "lignes_sortie": None,
+            "cache": None,
+            "memoire_delta": None,
+            "calcul": None,
+        }
+        self.spans.append(span)
+        self._stack.append(span)
+        return span
+
+    def close(self, span, result, elapsed, rss_before):
+        self._stack.pop()
+        rss_after = rss_bytes()
+        span["secondes"] = round(elapsed, 6)
+        span["lignes_sortie"] = _length(result)
+        span["cache"] = _cache_status(result, span)
+        if rss_before is not None and rss_after is not None:
+            span["memoire_delta"] = rss_after - rss_before
+
+    def mark_computed(self):
+        # Appelé depuis l'intérieur d'une fonction en cache : l'appel instrumenté englobant est un "miss"
+        if self._stack:
+            self._stack[-1]["calcul"] = True
+
+    def records(self):
+        return [{field: span[field] for field in SPAN_FIELDS} for span in self.spans]
+
+
+def start_run(number):
+    _state.run = RunRecorder(number)
+    return _state.run
+
+
+def finish_run():
+    run = getattr(_state, "run", None)
+    _state.run = None
+    return run
+
+
+def current_run():
+    return getattr(_state, "run", None)
+
+
+def instrumented(name, cached=False):
+    """Décorateur : mesure durée, lignes en entrée/sortie, statut de cache et variation mémoire de chaque appel
+    lorsque l'instrumentation est active pour l'exécution courante (sans effet sinon).
+
+    Avec `cached=True`, la fonction décorée est un `st.cache_data` dont la fonction d'origine est décorée
+    par `computed` : l'appel est un "hit" si elle n'a pas été exécutée.
+    """
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            run = current_run()
+            if run is None:
+                return function(*args, **kwargs)
+            span = run.open(name, args)
+            span["calcul"] = False if cached else None
+            rss_before = rss_bytes()
+            start = time.perf_counter()
+            result = None
+            try:
+                result = function(*args, **kwargs)
+                return result
+            finally:
+                run.close(span, result, time.perf_counter() - start, rss_before)
+        return wrapper
+    return decorator
+
+
+def computed(function):
+    """À placer sous `st.cache_data` : signale à l'appel instrumenté que le résultat a été recalculé."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        run = current_run()
+        if run is not None:
+            run.mark_computed()
+        return function(*args, **kwargs)
+    return wrapper
+
+
+def records_to_json(records):
+    return json.dumps(records, ensure_ascii=False, indent=2).encode("utf-8")
+
+
+def records_to_csv(records):
+    stream = io.StringIO()
+    writer = csv.DictWriter(stream, fieldnames=SPAN_FIELDS)
+    writer.writeheader()
+    writer.writerows(records)
+    return stream.getvalue().encode("utf-8-sig")
@@ -0,0 +1,207 @@
+import importlib.util
+import os
+import re
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from core.indexes import MODE_CONTAINS, MODE_EXACT, MODE_PREFIX, as_text
+from core.text_search import fold, fold_series
+
+# "duckdb" active le moteur SQL embarqué pour les filtres, comptages, pages et exports
+QUERY_BACKEND = os.environ.get("ELECTRATRACK_QUERY_BACKEND", "pandas")
+
+# Types de conditions d'un filtre
+IDENTIFIER = "identifiant"
+TEXT = "texte"
+PATTERN = "motif"
+EQUALS = "egal"
+
+# `mode` ne sert qu'aux identifiants (MODE_CONTAINS, MODE_PREFIX, MODE_EXACT)
+Condition = namedtuple("Condition", ["kind", "column", "value", "mode"], defaults=[MODE_CONTAINS])
+
+ROW = "__ligne"
+_TABLE = "donnees"
+
+
+def duckdb_enabled():
+    # Moteur optionnel : sans duckdb, les filtres passent par les index pandas. Le module n'est importé
+    # qu'à la construction d'un moteur, pour ne pas ralentir le démarrage quand il n'est pas activé
+    return QUERY_BACKEND == "duckdb" and importlib.util.find_spec("duckdb") is not None
+
+
+def _quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def _arrow_column(series):
+    # Colonne Arrow avec valeurs manquantes en NULL (NaN compris) : même place dans les tris que chez pandas
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        # Les catégories se trient dans leur ordre de déclaration, comme pandas
+        codes = series.cat.codes.to_numpy()
+        return pa.array(codes, mask=codes < 0)
+    try:
+        return pa.array(series, from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        return None
+
+
+class QueryEngine:
+    """Moteur DuckDB embarqué (en mémoire, sans service) sur un jeu chargé.
+
+    Les colonnes de recherche sont enregistrées déjà normalisées (identifiants en texte, noms repliés,
+    motifs en `str`) avec les mêmes fonctions que les index pandas, si bien qu'un filtre compilé en un seul
+    prédicat SQL renvoie exactement les mêmes lignes. Comptage, pages triées (LIMIT/OFFSET) et positions
+    pour l'export sont calculés par DuckDB en une passe vectorisée et multi-threadée.
+    """
+
+    def __init__(self, frame, identifier_columns=None, text_columns=(), pattern_columns=(), equality_columns=()):
+        self.identifier_columns = {column: case_sensitive for column, case_sensitive in (identifier_columns or {}).items()
+                                   if column in frame.columns}
+        self.text_columns = [column for column in text_columns if column in frame.columns]
+        self.pattern_columns = [column for column in pattern_columns if column in frame.columns]
+        self.equality_columns = [column for column in equality_columns if column in frame.columns]
+
+        columns = {ROW: pa.array(np.arange(len(frame), dtype=np.int64))}
+        for column, case_sensitive in self.identifier_columns.items():
+            text = as_text(frame[column])
+            columns[f"{IDENTIFIER}:{column}"] = pa.array(text if case_sensitive else text.str.lower(), type=pa.string(),
+                                                         from_pandas=True)
+        for column in self.text_columns:
+            series = frame[column]
+            columns[f"{TEXT}:{column}"] = pa.array(fold_series(series.astype(object).where(series.notna())),
+                                                   type=pa.string(), from_pandas=True)
+        for column in self.pattern_columns:
+            columns[f"{PATTERN}:{column}"] = pa.array(frame[column].astype(str).to_numpy(dtype=object), type=pa.string())
+        for column in self.equality_columns:
+            values = frame[column].astype(object).where(frame[column].notna(), None)
+            columns[f"{EQUALS}:{column}"] = pa.array(values.map(str, na_action="ignore"), type=pa.string(),
+                                                     from_pandas=True)
+        # Clés de tri : une par colonne du tableau qu'Arrow sait représenter
+        self.sortable = set()
+        for column in frame.columns:
+            array = _arrow_column(frame[column])
+            if array is not None:
+                columns[f"tri:{column}"] = array
+                self.sortable.add(column)
+
+        import duckdb
+
+        self._table = pa.table(columns)
+        self._connection = duckdb.connect()
+        self._connection.register(_TABLE, self._table)
+        self._lock = threading.Lock()
+
+    def _clause(self, condition):
+        # (fragment SQL, paramètres) d'une condition, ou None si elle ne filtre rien
+        kind, column, value, mode = condition
+        if not value:
+            return None
+        if kind == IDENTIFIER and column in self.identifier_columns:
+            name = _quote(f"{IDENTIFIER}:{column}")
+            query = str(value).strip()
+            query = query if self.identifier_columns[column] else query.lower()
+            if not query:
+                return f"{name} IS NOT NULL", []
+            if mode == MODE_EXACT:
+                return f"{name} = ?", [query]
+            if mode == MODE_PREFIX:
+                return f"starts_with({name}, ?)", [query]
+            if mode != MODE_CONTAINS:
+                raise ValueError(f"Mode de recherche inconnu : {mode}")
+            return f"contains({name}, ?)", [query]
+        if kind == TEXT and column in self.text_columns:
+            name = _quote(f"{TEXT}:{column}")
+            query = fold(value)
+            if not query:
+                return "FALSE", []
+            return f"contains({name}, ?)", [query]
+        if kind == PATTERN and column in self.pattern_columns:
+            # `str.contains(motif, case=False)` : expression régulière insensible à la casse
+            name = _quote(f"{PATTERN}:{column}")
+            if re.escape(value) == value:
+                return f"contains(lower({name}), ?)", [value.lower()]
+            return f"regexp_matches({name}, ?, 'i')", [value]
+        if kind == EQUALS and column in self.equality_columns:
+            return f"{_quote(f'{EQUALS}:{column}')} = ?", [str(value)]
+        return None
+
+    def where(self, conditions):
+        # Compile l'état des filtres en un prédicat SQL unique
+        clauses, params = [], []
+        for condition in conditions:
+            clause = self._clause(condition)
+            if clause is not None:
+                clauses.append(clause[0])
+                params.extend(clause[1])
+        return (" AND ".join(clauses) if clauses else "TRUE"), params
+
+    def _fetch(self, sql, params):
+        with self._lock:
+            return self._connection.execute(sql, params).fetchnumpy()
+
+    def count(self, conditions):
+        predicate, params = self.where(conditions)
+        result = self._fetch(f"SELECT count(*) AS n FROM {_TABLE} WHERE {predicate}", params)
+        return int(result["n"][0])
+
+    def positions(self, conditions, sort_column=None, ascending=False, limit=None, offset=0):
+        """Positions des lignes retenues, dans l'ordre du tableau ou triées (valeurs manquantes en fin, tri stable)."""
+        predicate, params = self.where(conditions)
+        order = ROW
+        if sort_column is not None and sort_column in self.sortable:
+            order = f"{_quote(f'tri:{sort_column}')} {'ASC' if ascending else 'DESC'} NULLS LAST, {ROW}"
+        sql = f"SELECT {ROW} FROM {_TABLE} WHERE {predicate} ORDER BY {order}"
+        if limit is not None:
+            sql += f" LIMIT {int(limit)} OFFSET {int(offset)}"
+        return np.asarray(self._fetch(sql, params)[ROW], dtype=np.int64)
+
+
+class QuerySelection:
+    """Résultat d'un filtre compilé en SQL : nombre de lignes et positions calculés à la demande puis conservés."""
+
+    def __init__(self, engine, conditions):
+        self.engine = engine
+        self.conditions = list(conditions)
+        self._count = None
+        self._positions = None
+
+    def __len__(self):
+        if self._count is None:
+            self._count = self.engine.count(self.conditions)
+        return self._count
+
+    def positions(self):
+        if self._positions is None:
+            self._positions = self.engine.positions(self.conditions)
+        return self._positions
+
+    def page(self, sort_column, ascending, limit, offset):
+        return self.engine.positions(self.conditions, sort_column, ascending, limit, offset)
+
+
+class QueryPager:
+    """Équivalent de `SortedPager` pour une `QuerySelection` : chaque page est une requête LIMIT/OFFSET."""
+
+    def __init__(self, selection, sort_column=None, ascending=False):
+        self.selection = selection
+        self.sort_column = sort_column if sort_column in selection.engine.sortable else None
+        self.ascending = ascending
+
+    def __len__(self):
+        return len(self.selection)
+
+    def page_count(self, page_size):
+        return max(1, (len(self.selection) + page_size - 1) // page_size)
+
+    def page(self, frame, number, page_size):
+        positions = self.selection.page(self.sort_column, self.ascending, page_size, (number - 1) * page_size)
+        return frame.iloc[positions]
+
+
+def selected_positions(selection):
+    # Positions d'une sélection, qu'elle vienne des index pandas (tableau) ou du moteur SQL
+    return selection.positions() if isinstance(selection, QuerySelection) else selection
@@ -0,0 +1,138 @@
+import os
+import threading
+import weakref
+from collections import namedtuple
+from pathlib import Path
+
+from core.disk_cache import DatasetCache
+
+# Budget mémoire des données et structures dérivées de tous les jeux chargés (0 : illimité), configurable par variable d'environnement
+MEMORY_BUDGET = int(os.environ.get("ELECTRATRACK_MEMORY_BUDGET_MB", "1024")) * 1024 * 1024
+
+# Jeux inactifs déportés hors du budget : relus mémoire-mappés (Feather par défaut, ou Parquet)
+SPILL_DIR = Path(os.environ.get("ELECTRATRACK_SPILL_DIR", Path(__file__).resolve().parent.parent / ".cache" / "spill"))
+SPILL_FORMAT = os.environ.get("ELECTRATRACK_SPILL_FORMAT", "feather")
+
+# État d'un jeu partagé : nombre de sessions qui le référencent, mémoire occupée par ses données et
+# ses structures dérivées (`Dataset.nbytes`) et présence en mémoire (False : données déportées sur disque)
+RegistryEntry = namedtuple("RegistryEntry", ["fingerprint", "references", "nbytes", "resident"])
+
+
+class Lease:
+    """Référence d'une session vers un jeu du registre ; libérée explicitement ou quand la session disparaît."""
+
+    def __init__(self, registry, fingerprint, dataset):
+        self.fingerprint = fingerprint
+        self.dataset = dataset
+        self._finalizer = weakref.finalize(self, registry.release, fingerprint, dataset)
+
+    def release(self):
+        self._finalizer()
+
+
+class DatasetRegistry:
+    """Registre des jeux de données chargés, partagé par toutes les sessions du processus.
+
+    Un même fichier (même empreinte) n'est chargé et indexé qu'une fois, quel que soit le nombre d'utilisateurs ;
+    les sessions n'en détiennent qu'une référence et ne doivent pas le modifier. Un jeu est libéré quand
+    plus aucune session ne le référence.
+
+    Au-delà de `budget` octets en mémoire (données, index et agrégats), les jeux les moins récemment consultés sont déportés
+    sur disque (`spill_store`) et relus de façon transparente au prochain accès.
+    """
+
+    def __init__(self, budget=MEMORY_BUDGET, spill_store=None):
+        self.budget = budget
+        # Pas d'éviction dans le magasin de déport : un fichier n'est supprimé qu'avec son jeu
+        self.spill_store = spill_store or DatasetCache(SPILL_DIR, max_bytes=float("inf"), fmt=SPILL_FORMAT)
+        self._entries = {}
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, fingerprint, build):
+        # `build` n'est appelé que si le jeu n'est pas déjà en mémoire, une seule fois même en cas d'appels concurrents
+        with self._lock:
+            build_lock = self._building.setdefault(fingerprint, threading.Lock())
+        with build_lock:
+            try:
+                with self._lock:
+                    entry = self._entries.get(fingerprint)
+                    if entry is not None:
+                        entry[1] += 1
+                        return Lease(self, fingerprint, entry[0])
+                dataset = build()
+                if dataset.empty:
+                    # Lecture en échec (ou fichier vide) : jeu ni partagé ni retenu, le fichier est relu au
+                    # prochain chargement au lieu de servir ce résultat aux autres sessions
+                    return Lease(self, fingerprint, dataset)
+                with self._lock:
+                    self._entries[fingerprint] = [dataset, 1]
+                lease = Lease(self, fingerprint, dataset)
+            finally:
+                with self._lock:
+                    self._building.pop(fingerprint, None)
+        self.enforce_budget()
+        return lease
+
+    def release(self, fingerprint, dataset=None):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+            # Jeu déjà retiré (voir `discard`), éventuellement reconstruit depuis : rien à libérer
+            if entry is None or (dataset is not None and entry[0] is not dataset):
+                return
+            entry[1] -= 1
+            if entry[1] <= 0:
+                del self._entries[fingerprint]
+            else:
+                return
+        self.spill_store.path(fingerprint).unlink(missing_ok=True)
+
+    def discard(self, fingerprint):
+        # Retire un jeu inutilisable (données introuvables) : le prochain chargement du fichier le reconstruit
+        with self._lock:
+            self._entries.pop(fingerprint, None)
+        self.spill_store.path(fingerprint).unlink(missing_ok=True)
+
+    def get(self, fingerprint):
+        with self._lock:
+            entry = self._entries.get(fingerprint)
+        return None if entry is None else entry[0]
+
+    def entries(self):
+        with self._lock:
+            entries = list(self._entries.items())
+        # Mesure hors du verrou du registre : la première estimation d'une structure parcourt ses tableaux
+        return [RegistryEntry(fingerprint, references, dataset.nbytes(), dataset.resident)
+                for fingerprint, (dataset, references) in entries]
+
+    def memory_usage(self):
+        # Jeux en mémoire et structures conservées des jeux déportés (agrégats, index de dates)
+        return sum(entry.nbytes for entry in self.entries())
+
+    def enforce_budget(self):
+        """Déporte sur disque les jeux les moins récemment consultés jusqu'à repasser sous le budget ;
+        le dernier jeu consulté reste toujours en mémoire. Renvoie les empreintes des jeux déportés."""
+        if not self.budget:
+            return []
+        with self._lock:
+            datasets = [(fingerprint, dataset) for fingerprint, (dataset, _) in self._entries.items()]
+        sizes = {fingerprint: dataset.nbytes() for fingerprint, dataset in datasets}
+        total = sum(sizes.values())
+        resident = sorted(((dataset.last_access, fingerprint, dataset) for fingerprint, dataset in datasets
+                           if dataset.resident), key=lambda item: item[0])
+        spilled = []
+        for _, fingerprint, dataset in resident[:-1]:
+            if total <= self.budget:
+                break
+            if dataset.spill(self.spill_store):
+                # Seules restent en mémoire les structures conservées au déport
+                total -= sizes[fingerprint] - dataset.nbytes()
+                spilled.append(fingerprint)
+        return spilled
+
+    def __contains__(self, fingerprint):
+        with self._lock:
+            return fingerprint in self._entries
+
+
+dataset_registry = DatasetRegistry()
@@ -0,0 +1,51 @@
+import importlib
+import logging
+import sys
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+# Début de la première exécution du script dans ce processus (voir `mark_started`)
+_started = None
+# Module -> durée (s) de son premier import dans le processus
+_imports = {}
+_first_paint = None
+
+
+def import_section(name):
+    """Module `name` importé au premier usage seulement ; la durée de ce premier import est conservée."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    with _lock:
+        _imports.setdefault(name, time.perf_counter() - start)
+    return module
+
+
+def mark_started(started):
+    # Heure de début d'une exécution, relevée en tête d'app.py avant ses imports ; seule la première est retenue
+    global _started
+    with _lock:
+        if _started is None:
+            _started = started
+
+
+def mark_first_paint():
+    # Fin de la première exécution complète dans le processus : démarrage à froid jusqu'au premier affichage
+    global _first_paint
+    with _lock:
+        if _first_paint is not None:
+            return
+        _first_paint = time.perf_counter() - _started
+    logger.info("Premier affichage en %.3f s (imports de sections : %s)", _first_paint,
+                ", ".join(f"{name} {seconds:.3f} s" for name, seconds in _imports.items()) or "aucun")
+
+
+def startup_report():
+    # Durées de démarrage du processus : premier affichage et premiers imports de sections (None : pas encore mesuré)
+    with _lock:
+        return {"premier_affichage_s": _first_paint, "imports_s": dict(_imports)}
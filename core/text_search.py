@@ -0,0 +1,82 @@
+import re
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+from core.indexes import IdentifierIndex, MODE_CONTAINS
+
+# Score minimal (part des trigrammes de la requête retrouvés) pour une correspondance approximative
+FUZZY_THRESHOLD = 0.6
+
+# Tout ce qui n'est ni lettre ni chiffre, quel que soit l'alphabet (latin, arabe, tifinagh...)
+_SEPARATORS = re.compile(r"[\W_]+")
+
+
+def fold(text):
+    # "Aït-Ouahmane  SAÏD" -> "ait ouahmane said" : sans accents, en minuscules, ponctuation réduite à un espace ;
+    # les lettres des autres alphabets sont conservées ("محمد بن علي" reste cherchable)
+    text = unicodedata.normalize("NFKD", str(text))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return _SEPARATORS.sub(" ", text.lower()).strip()
+
+
+def fold_series(series):
+    # Repliement calculé une seule fois par valeur distincte
+    codes, uniques = pd.factorize(series)
+    folded = np.array([fold(value) for value in uniques] + [np.nan], dtype=object)
+    return pd.Series(folded[codes], index=series.index, dtype=object)
+
+
+class TextIndex(IdentifierIndex):
+    """Index de recherche sur une colonne de noms : copie repliée (accents, casse) et trigrammes.
+
+    En plus des recherches de `IdentifierIndex`, propose une recherche approximative classée
+    par la part des trigrammes de la requête présents dans chaque valeur.
+    """
+
+    def __init__(self, series):
+        super().__init__(series, case_sensitive=True)
+
+    def _prepare(self, series):
+        return fold_series(series.astype(object).where(series.notna()))
+
+    def _normalize_query(self, query):
+        return fold(query)
+
+    def match_values(self, query, mode=MODE_CONTAINS):
+        # Une requête vide une fois repliée ("-", "  ") ne correspond à aucun nom, dans tous les moteurs
+        if not self._normalize_query(query):
+            return np.empty(0, dtype=np.int64)
+        return super().match_values(query, mode)
+
+    def filter_rows(self, rows, query, mode=MODE_CONTAINS):
+        if not self._normalize_query(query):
+            return np.empty(0, dtype=np.int64)
+        return super().filter_rows(rows, query, mode)
+
+    def rank_values(self, query, threshold=FUZZY_THRESHOLD):
+        # (identifiants des valeurs, scores) triés par score décroissant
+        query = self._normalize_query(query)
+        gram_ids = self._ngrams.gram_ids(query)
+        if len(gram_ids) == 0:
+            matches = self.match_values(query, MODE_CONTAINS)
+            return matches, np.ones(len(matches))
+        known = gram_ids[gram_ids >= 0]
+        if len(known) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        shared = np.bincount(np.concatenate(self._ngrams.postings(known)), minlength=len(self.values))
+        scores = shared / len(gram_ids)
+        matches = np.flatnonzero(scores >= threshold)
+        order = np.argsort(-scores[matches], kind="stable")
+        return matches[order], scores[matches][order]
+
+    def rank(self, query, threshold=FUZZY_THRESHOLD):
+        # (positions des lignes, scores) pour une recherche approximative
+        value_ids, scores = self.rank_values(query, threshold)
+        if len(value_ids) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        row_scores = np.zeros(len(self.values) + 1)
+        row_scores[value_ids] = scores
+        rows = self.rows_for(value_ids)
+        return rows, row_scores[self._codes[rows]]
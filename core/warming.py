@@ -0,0 +1,52 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads de préchauffage partagés par toutes les sessions du processus
+WARM_WORKERS = int(os.environ.get("ELECTRATRACK_WARM_WORKERS", 2))
+
+_executor = ThreadPoolExecutor(max_workers=WARM_WORKERS, thread_name_prefix="electratrack-warm")
+
+
+class Warmup:
+    """Construction en tâche de fond des structures dérivées d'un jeu (index, agrégats, ordres de tri).
+
+    Chaque tâche passe par les accesseurs du Dataset : une vue qui demande une structure en cours de
+    construction attend ce seul calcul, une structure pas encore commencée est construite à la demande,
+    et une tâche en échec est simplement recalculée (erreur comprise) au premier accès.
+    """
+
+    def __init__(self, tasks):
+        self.labels = list(tasks)
+        self._futures = {label: _executor.submit(task) for label, task in tasks.items()}
+
+    def __len__(self):
+        return len(self._futures)
+
+    def done(self):
+        return [label for label in self.labels if self._futures[label].done()]
+
+    def pending(self):
+        return [label for label in self.labels if not self._futures[label].done()]
+
+    @property
+    def ready(self):
+        return not self.pending()
+
+    def errors(self):
+        return {label: future.exception() for label, future in self._futures.items()
+                if future.done() and future.exception() is not None}
+
+    def wait(self, timeout=None):
+        for future in self._futures.values():
+            future.exception(timeout)
+
+
+def warm(dataset, tasks):
+    """Préchauffage du jeu (lancé une seule fois par jeu, même partagé) : `tasks` associe un libellé
+    affiché à une fonction sans argument."""
+    return dataset.derived(("préchauffage",), lambda: Warmup(tasks))
+
+
+def current_warmup(dataset):
+    # Préchauffage lancé pour ce jeu, ou None (jeu issu d'un delta, ou chargé sans préchauffage)
+    return dataset.derived(("préchauffage",), lambda: None) if dataset.has(("préchauffage",)) else None
@@ -0,0 +1,222 @@
+"""Rapports par lots sans interface Streamlit : exports filtrés, tableaux récapitulatifs et alertes d'échéance
+de chaque agence et des postes, calculés avec la logique de chargement, de filtrage et d'agrégation des vues.
+
+    python -m reports.batch --kelaa kelaa.xlsx --autre regional.parquet --postes postes.xlsx
+    python -m reports.batch --kelaa kelaa.parquet --format Excel --horizon 90 --output rapports/nuit
+
+Chaque fichier est traité dans un processus distinct (`--workers`, un par cœur par défaut). Le lot est écrit
+dans `<output>/<jeu>-<fichier>/`, avec la synthèse des alertes de toutes les agences et un manifeste
+`rapport.json` (lignes, fichiers écrits, durées, erreurs).
+"""
+import argparse
+import datetime
+import io
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+import pandas as pd
+
+from core.cube import MONTH, YEAR
+from core.dataset import Dataset
+from core.expiry import ALERT_COLUMNS, DEFAULT_HORIZON, HORIZONS, alert_report, horizon_window
+from core.export import EXPORT_FORMATS, export_file, export_filename
+from core.indexes import MODE_CONTAINS
+from core.ingest import read_upload
+from core.query import selected_positions
+from sections import autre_contrat, contrat_kelaa, postes
+
+# Jeu -> section dont les constantes, le chargement et les filtres sont repris
+SECTIONS = {"kelaa": contrat_kelaa, "autre": autre_contrat, "postes": postes}
+
+# États exportés séparément (suffixe du fichier -> valeur de "État Contrat")
+ETATS = {"en_service": "En service", "resilies": "Résilié"}
+
+# Type d'alerte -> nom des fichiers de la liste de contrats concernés
+ALERT_FILES = {"Échéance": "alertes_echeances", "Résiliation": "alertes_resiliations"}
+
+# Format par défaut : l'export Excel ligne à ligne est nettement plus lent sur les gros volumes
+DEFAULT_FORMAT = "CSV"
+
+
+class FileUpload(io.BytesIO):
+    """Fichier local présenté comme un fichier uploadé Streamlit (`name` et `getvalue()`)."""
+
+    def __init__(self, path):
+        super().__init__(Path(path).read_bytes())
+        self.name = Path(path).name
+
+
+def _quiet():
+    # Les fonctions mises en cache par Streamlit signalent l'absence de serveur à chaque appel
+    for logger in ["streamlit", "streamlit.runtime.caching.cache_data_api"]:
+        logging.getLogger(logger).setLevel(logging.ERROR)
+
+
+def _counts(series, label):
+    return series.rename_axis(label).rename("Nombre").reset_index()
+
+
+def kelaa_report(dataset):
+    def select(etat):
+        return contrat_kelaa.select_rows(dataset, "", "", "", "", "", "", "Tous", etat, MODE_CONTAINS, False)
+
+    exports = {"contrats": select("Tous")}
+    exports.update({f"contrats_{suffix}": select(etat) for suffix, etat in ETATS.items()})
+    # Agrégats de la page Statistiques
+    cube = dataset.cube(contrat_kelaa.CUBE_COLUMNS, contrat_kelaa.CUBE_DATE_COLUMN)
+    tables = {}
+    if "Catégorie" in cube:
+        tables["repartition_categorie"] = _counts(cube.counts("Catégorie"), "Catégorie d'abonnement")
+    if "État" in cube:
+        tables["repartition_etat"] = _counts(cube.counts("État"), "État Contrat")
+    if YEAR in cube:
+        tables["abonnements_par_annee"] = _counts(cube.counts(YEAR, sort_by_count=False), "Année")
+    tables["evolution_mensuelle"] = contrat_kelaa.timeline(dataset).series(MONTH)
+    if "Commune" in cube and "Catégorie" in cube:
+        tables["commune_x_categorie"] = cube.crosstab("Commune", "Catégorie").rename_axis(
+            index="Commune", columns=None).reset_index()
+    return exports, tables
+
+
+def autre_report(dataset):
+    params = {"search_code_agence": "", "search_nom_agence": "", "search_num_tournee": "", "search_num_contrat": "",
+              "search_nom_client": "", "search_prenom_client": "", "search_nom_commune": ""}
+
+    def select(etat):
+        return autre_contrat.select_rows(dataset, params, "Tous", etat, MODE_CONTAINS, False)
+
+    exports = {"contrats": select("Tous")}
+    exports.update({f"contrats_{suffix}": select(etat) for suffix, etat in ETATS.items()})
+    cube = dataset.cube(autre_contrat.CUBE_COLUMNS, autre_contrat.CUBE_DATE_COLUMN)
+    tables = {}
+    if "Région" in cube:
+        tables["repartition_agence"] = _counts(cube.counts("Région"), "Nom Agence")
+    if "Commune" in cube:
+        tables["repartition_commune"] = _counts(cube.counts("Commune"), "Commune")
+    if "Catégorie" in cube and "État" in cube:
+        tables["categorie_x_etat"] = cube.crosstab("Catégorie", "État").rename_axis(
+            index="Libelle categorie facturation", columns=None).reset_index()
+    if "Commune" in cube and "Catégorie" in cube:
+        tables["commune_x_categorie"] = cube.crosstab("Commune", "Catégorie").rename_axis(
+            index="Nom commune", columns=None).reset_index()
+    tables["evolution_mensuelle"] = autre_contrat.timeline(dataset).series(MONTH)
+    return exports, tables
+
+
+def postes_report(dataset):
+    exports = {"postes": postes.select_postes(dataset, {column: "" for column in postes.FILTER_COLUMNS})}
+    cube = postes.capacity(dataset)
+    tables = {}
+    if postes.POWER_COLUMN in dataset.columns and not dataset.empty:
+        tables["capacite_parc"] = cube.rollup().reset_index(drop=True)
+        for dimension in postes.CAPACITY_DIMENSIONS:
+            if dimension in cube:
+                tables[f"capacite_{dimension.lower().replace(' ', '_')}"] = cube.rollup([dimension]).reset_index()
+    if "TYPEPOSTE" in cube and "NOMDEPART" in cube and not dataset.empty:
+        tables["postes_type_x_depart"] = postes.postes_counts(cube, "NOMDEPART")
+    return exports, tables
+
+
+REPORTS = {"kelaa": kelaa_report, "autre": autre_report, "postes": postes_report}
+
+
+def _write(folder, stem, frame, fmt):
+    # Écrit directement dans le dossier du rapport, sans copie du fichier en mémoire
+    return export_file(frame, fmt, folder / export_filename(stem, fmt)).name
+
+
+def run_job(kind, path, output, fmt, horizon, today):
+    """Rapport d'un fichier (exécuté dans un processus de travail) ; renvoie son entrée du manifeste."""
+    _quiet()
+    start = time.perf_counter()
+    section = SECTIONS[kind]
+    frame = read_upload(FileUpload(path))
+    dataset = Dataset(frame, frame.attrs.get("fingerprint", ""))
+    folder = Path(output) / f"{kind}-{Path(path).stem}"
+    folder.mkdir(parents=True, exist_ok=True)
+
+    exports, tables = REPORTS[kind](dataset)
+    files = {}
+    for stem, selection in exports.items():
+        positions = selected_positions(selection)
+        files[stem] = {"fichier": _write(folder, stem, frame.iloc[positions], fmt), "lignes": len(positions)}
+    for stem, table in tables.items():
+        files[stem] = {"fichier": _write(folder, stem, table, fmt), "lignes": len(table)}
+
+    alerts = None
+    if kind != "postes":
+        # Contrats dont la date d'échéance ou de résiliation tombe dans l'horizon, comme dans les alertes de l'interface
+        start_date, end_date = horizon_window(horizon, today)
+        for alert, column in ALERT_COLUMNS.items():
+            if column in dataset.columns:
+                positions = dataset.date_index(column).between(start_date, end_date)
+                stem = f"{ALERT_FILES[alert]}_{horizon}j"
+                files[stem] = {"fichier": _write(folder, stem, frame.iloc[positions], fmt), "lignes": len(positions)}
+        alerts = alert_report({section.AGENCE: dataset}, today=today)
+        alerts.insert(1, "Fichier", Path(path).name)
+
+    entry = {"jeu": kind, "source": str(path), "dossier": folder.name, "lignes": len(frame), "fichiers": files,
+             "duree_s": round(time.perf_counter() - start, 2)}
+    return entry, alerts
+
+
+def run(jobs, output, fmt, horizon, today, workers):
+    """Traite les (jeu, fichier) de `jobs` en parallèle ; renvoie le manifeste et la synthèse des alertes."""
+    output.mkdir(parents=True, exist_ok=True)
+    entries, alerts = [], []
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(jobs)))) as pool:
+        futures = {pool.submit(run_job, kind, path, output, fmt, horizon, today): (kind, path) for kind, path in jobs}
+        for future in as_completed(futures):
+            kind, path = futures[future]
+            try:
+                entry, report = future.result()
+            except Exception as e:
+                entry, report = {"jeu": kind, "source": str(path), "erreur": f"{type(e).__name__}: {e}"}, None
+            entries.append(entry)
+            if report is not None:
+                alerts.append(report)
+            status = entry.get("erreur") or f"{entry['lignes']} lignes, {entry['duree_s']} s"
+            print(f"{kind:>7} {Path(path).name:<40} {status}", file=sys.stderr)
+    summary = pd.concat(alerts, ignore_index=True) if alerts else pd.DataFrame()
+    return sorted(entries, key=lambda entry: (entry["jeu"], entry["source"])), summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rapports ElectraTrack par lots, sans interface")
+    parser.add_argument("--kelaa", nargs="+", type=Path, default=[], help="fichiers de l'agence El Kelaa")
+    parser.add_argument("--autre", nargs="+", type=Path, default=[],
+                        help="fichiers de l'agence LAATAOUIA / SIDI RAHAL / TAMELLALT")
+    parser.add_argument("--postes", nargs="+", type=Path, default=[], help="fichiers des postes")
+    parser.add_argument("--output", type=Path, help="dossier du lot (rapports/<date> par défaut)")
+    parser.add_argument("--format", default=DEFAULT_FORMAT, choices=list(EXPORT_FORMATS))
+    parser.add_argument("--horizon", type=int, default=DEFAULT_HORIZON, choices=HORIZONS,
+                        help="horizon des listes d'alertes, en jours")
+    parser.add_argument("--date", type=datetime.date.fromisoformat, default=datetime.date.today(),
+                        help="date de référence des alertes (AAAA-MM-JJ, aujourd'hui par défaut)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processus de travail")
+    args = parser.parse_args(argv)
+
+    jobs = [(kind, path) for kind in SECTIONS for path in getattr(args, kind)]
+    if not jobs:
+        parser.error("aucun fichier à traiter (--kelaa, --autre ou --postes)")
+    output = args.output or Path("rapports") / args.date.isoformat()
+    _quiet()
+    start = time.perf_counter()
+    entries, alerts = run(jobs, output, args.format, args.horizon, args.date, args.workers)
+    if not alerts.empty:
+        _write(output, "alertes_synthese", alerts, args.format)
+    manifest = {"date": args.date.isoformat(), "format": args.format, "horizon": args.horizon,
+                "duree_s": round(time.perf_counter() - start, 2), "jeux": entries,
+                "alertes": alerts.to_dict(orient="records")}
+    (output / "rapport.json").write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+    print(output / "rapport.json")
+    return 1 if any("erreur" in entry for entry in entries) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,42 +1,149 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from io import BytesIO
+import numpy as np
 import datetime
 
+from components.delta_upload import LOAD_FULL, delta_upload, load_mode
+from components.export import export_panel
+from components.history import archive_panel, comparison_panel, pick_extract, search_panel
+from components.pagination import paginated_table
+from components.progress import ingest_progress
+from components.registry import sharing_caption, shared_dataset
+from components.timeline import timeline_panel
+from components.warming import warming_status
+from core.chart_data import MAX_BARS, MAX_SLICES, chart_frame
+from core.cube import COUNT
+from core.dataset import Dataset, file_fingerprint
+from core.expiry import ALERT_COLUMNS
+from core.history import Extract, history_store
+from core.ingest import DATE_RESILIATION, read_upload, describe_report
+from core.indexes import MODE_CONTAINS, MODE_PREFIX, MODE_EXACT
+from core.profiling import computed, instrumented
+from core.query import EQUALS, IDENTIFIER, PATTERN, TEXT, Condition, QuerySelection
+from core.warming import warm
 
+AGENCE = "Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT"
 
+# Colonnes d'identifiants indexées au chargement (colonne -> recherche sensible à la casse)
+IDENTIFIER_COLUMNS = {
+    "Code Agence (Abonnement)": False,
+    "Numéro de tournée": True,
+    "Numéro contrat": True,
+}
 
+# Colonnes de noms indexées sous forme repliée (accents, casse) pour la recherche par nom
+TEXT_COLUMNS = ["Nom / raison sociale du client tit.", "Prenom du client titulaire", "Nom commune"]
+
+# Dimensions du cube d'agrégats des statistiques (dimension -> colonne)
+CUBE_COLUMNS = {
+    "Région": "Nom Agence (Abonnement)",
+    "Commune": "Nom commune",
+    "Catégorie": "Libelle categorie facturation",
+    "État": "État Contrat",
+}
+CUBE_DATE_COLUMN = "Date creation abonnement"
+
+# Dimensions des séries d'abonnements et de résiliations (dimension -> colonne)
+TIMELINE_COLUMNS = {
+    "Région": "Nom Agence (Abonnement)",
+    "Commune": "Nom commune",
+    "Catégorie": "Libelle categorie facturation",
+}
+
+# Colonnes filtrées par motif et par égalité (listes déroulantes), pour le moteur SQL
+PATTERN_COLUMNS = ["Nom Agence (Abonnement)"]
+EQUALITY_COLUMNS = ["Libelle categorie facturation", "État Contrat"]
+
+# Tri par défaut du tableau des contrats (décroissant), préchauffé au chargement
+DEFAULT_SORT = "Date creation abonnement"
+
+# Clé d'identification des lignes pour les mises à jour incrémentales
+DELTA_KEY = "Numéro contrat"
+
+# Colonnes affichées pour les contrats retrouvés dans l'historique des extraits
+HISTORY_COLUMNS = [DELTA_KEY, "Nom / raison sociale du client tit.", "Nom commune", "État Contrat"]
+
+# États du contrat proposés aux filtres
+CONTRACT_STATES = ["En service", "Résilié"]
+
+SEARCH_MODES = {"Contient": MODE_CONTAINS, "Commence par": MODE_PREFIX, "Exact": MODE_EXACT}
+
+
+@instrumented("autre_contrat.show")
 def show():
     menu = st.sidebar.radio("Aller à :", ["📁 Upload de fichier", "📋 Tableau des Contrats", "📊 Statistiques"])
 
     if menu == "📁 Upload de fichier":
-        uploaded_file = st.file_uploader(
-            "Uploader un fichier (Parquet ou Excel) pour Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT",
-            type=["parquet", "xlsx"])
-        if uploaded_file is not None:
-            df = load_data(uploaded_file)
-            st.session_state.agency_data["Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT"] = df
-            st.success(f"Fichier chargé avec succès ✅ ({len(df)} contrats)")
+        current = st.session_state.agency_data.get(AGENCE)
+        if load_mode(current is not None, AGENCE) != LOAD_FULL:
+            st.session_state.agency_data[AGENCE] = delta_upload(current, load_data, DELTA_KEY, AGENCE)
         else:
-            st.info("Veuillez charger un fichier pour commencer.")
+            uploaded_file = st.file_uploader(
+                "Uploader un fichier (Parquet ou Excel) pour Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT",
+                type=["parquet", "xlsx"])
+            if uploaded_file is not None:
+                # Un fichier déjà chargé par une autre session est repris du registre partagé, sans copie
+                fingerprint = file_fingerprint(uploaded_file)
+                dataset = shared_dataset(AGENCE, fingerprint, lambda: build_dataset(uploaded_file, fingerprint))
+                st.session_state.agency_data[AGENCE] = dataset
+                st.success(f"Fichier chargé avec succès ✅ ({len(dataset)} contrats)")
+                st.caption(describe_report(dataset.frame.attrs))
+                st.caption(sharing_caption(dataset.fingerprint))
+                archive_panel(AGENCE, dataset, key="autre")
+            else:
+                st.info("Veuillez charger un fichier pour commencer.")
+                extract = pick_extract(AGENCE, key="autre")
+                if extract is not None:
+                    dataset = shared_dataset(AGENCE, extract.fingerprint,
+                                             lambda: build_dataset(extract, extract.fingerprint))
+                    st.session_state.agency_data[AGENCE] = dataset
+                    st.success(f"Extrait chargé avec succès ✅ ({len(dataset)} contrats)")
+                    st.caption(describe_report(dataset.frame.attrs))
 
-    if "Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT" in st.session_state.agency_data:
-        data = st.session_state.agency_data["Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT"]
+    if AGENCE in st.session_state.agency_data:
+        dataset = st.session_state.agency_data[AGENCE]
+        warming_status(dataset)
 
         if menu == "📋 Tableau des Contrats":
-            show_table(data)
+            show_table(dataset)
         elif menu == "📊 Statistiques":
-            show_stats(data)
+            show_stats(dataset)
+
+
+def build_dataset(uploaded_file, fingerprint):
+    # Le jeu est utilisable dès sa lecture : index, agrégats et tri par défaut se construisent en tâche de fond
+    dataset = Dataset(load_data(uploaded_file), fingerprint)
+    warm(dataset, {
+        "index des identifiants": lambda: dataset.build_identifier_indexes(IDENTIFIER_COLUMNS),
+        "index des noms": lambda: dataset.build_text_indexes(TEXT_COLUMNS),
+        "agrégats des statistiques": lambda: dataset.cube(CUBE_COLUMNS, CUBE_DATE_COLUMN),
+        "dates d'alerte": lambda: dataset.build_date_indexes(ALERT_COLUMNS.values()),
+        "moteur SQL": lambda: query_engine(dataset),
+        "tri du tableau": lambda: dataset.build_sort_orders([DEFAULT_SORT]),
+        "contrats par commune": dataset.contract_load,
+        "évolution des abonnements": lambda: timeline(dataset),
+    })
+    return dataset
+
+
+def timeline(dataset):
+    return dataset.timeline(TIMELINE_COLUMNS, CUBE_DATE_COLUMN, DATE_RESILIATION)
 
 
-@st.cache_data(show_spinner="Chargement des données...", ttl=3600)
+def query_engine(dataset):
+    return dataset.query_engine(IDENTIFIER_COLUMNS, TEXT_COLUMNS, PATTERN_COLUMNS, EQUALITY_COLUMNS)
+
+
+@instrumented("autre_contrat.load_data")
 def load_data(file_path):
+    # Lecture servie par le cache disque ; le jeu chargé est ensuite partagé par le registre
     try:
-        if file_path.name.endswith('.xlsx'):
-            return pd.read_excel(file_path)
-        else:
-            return pd.read_parquet(file_path)
+        if isinstance(file_path, Extract):
+            # Extrait archivé, relu depuis l'historique partitionné
+            with st.spinner("Chargement de l'extrait archivé..."):
+                return history_store.load(file_path)
+        with st.spinner("Chargement des données..."), ingest_progress("Lecture du fichier") as progress:
+            return read_upload(file_path, progress=progress)
     except Exception as e:
         st.error(f"Erreur lors du chargement du fichier: {str(e)}")
         return pd.DataFrame()
@@ -44,32 +151,73 @@ def load_data(file_path):
 
 # Reste du code...
 
+@instrumented("autre_contrat.filter_data", cached=True)
 @st.cache_data(show_spinner=True)
-def filter_data(df, search_params, categorie_filter, etat_contrat_filter):
-    filtered_df = df.copy()
-    if not filtered_df.empty:
-        filtered_df["État Contrat"] = filtered_df["Date resiliation du contrat"].apply(lambda x: "Résilié" if pd.notna(x) else "En service")
-        if search_params["search_code_agence"] and "Code Agence (Abonnement)" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Code Agence (Abonnement)"].astype(str).str.contains(search_params["search_code_agence"], case=False, na=False)]
-        if search_params["search_nom_agence"] and "Nom Agence (Abonnement)" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Nom Agence (Abonnement)"].str.contains(search_params["search_nom_agence"], case=False, na=False)]
-        if search_params["search_num_tournee"] and "Numéro de tournée" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Numéro de tournée"].astype(str).str.contains(search_params["search_num_tournee"], na=False)]
-        if search_params["search_num_contrat"] and "Numéro contrat" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Numéro contrat"].astype(str).str.contains(search_params["search_num_contrat"], na=False)]
-        if search_params["search_nom_client"] and "Nom / raison sociale du client tit." in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Nom / raison sociale du client tit."].str.contains(search_params["search_nom_client"], case=False, na=False)]
-        if search_params["search_prenom_client"] and "Prenom du client titulaire" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Prenom du client titulaire"].str.contains(search_params["search_prenom_client"], case=False, na=False)]
-        if search_params["search_nom_commune"] and "Nom commune" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Nom commune"].str.contains(search_params["search_nom_commune"], case=False, na=False)]
-        if categorie_filter != "Tous" and "Libelle categorie facturation" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Libelle categorie facturation"] == categorie_filter]
-        if etat_contrat_filter != "Tous" and "État Contrat" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["État Contrat"] == etat_contrat_filter]
-    return filtered_df
-
-def show_table(data):
+@computed
+def filter_data(_dataset, fingerprint, search_params, categorie_filter, etat_contrat_filter, search_mode=MODE_CONTAINS,
+                fuzzy=False):
+    # `fingerprint` identifie le jeu de données dans la clé de cache, à la place du hachage de tout le DataFrame
+    # Renvoie les positions des lignes retenues dans le jeu partagé, jamais une copie des données
+    data = _dataset.frame
+    positions = np.arange(len(data))
+    if not data.empty:
+        # Les identifiants sont résolus par les index : seules les lignes retenues sont extraites
+        found = _dataset.lookup_identifiers({
+            "Code Agence (Abonnement)": search_params["search_code_agence"],
+            "Numéro de tournée": search_params["search_num_tournee"],
+            "Numéro contrat": search_params["search_num_contrat"],
+        }, IDENTIFIER_COLUMNS, search_mode)
+        # Noms et communes : recherche repliée (accents, casse), éventuellement approximative et classée
+        found, scores = _dataset.lookup_text({
+            "Nom / raison sociale du client tit.": search_params["search_nom_client"],
+            "Prenom du client titulaire": search_params["search_prenom_client"],
+            "Nom commune": search_params["search_nom_commune"],
+        }, fuzzy, within=found)
+        if fuzzy and scores is not None:
+            found = found[np.argsort(-scores, kind="stable")]
+        if found is not None:
+            positions = found
+        if search_params["search_nom_agence"] and "Nom Agence (Abonnement)" in data.columns:
+            agences = data["Nom Agence (Abonnement)"].iloc[positions]
+            matches = agences.str.contains(search_params["search_nom_agence"], case=False, na=False)
+            positions = positions[matches.to_numpy(dtype=bool)]
+        if categorie_filter != "Tous" and "Libelle categorie facturation" in data.columns:
+            positions = positions[(data["Libelle categorie facturation"].iloc[positions] == categorie_filter).to_numpy()]
+        if etat_contrat_filter != "Tous" and "État Contrat" in data.columns:
+            positions = positions[(data["État Contrat"].iloc[positions] == etat_contrat_filter).to_numpy()]
+    return positions
+
+def search_conditions(search_params, categorie_filter, etat_contrat_filter, search_mode):
+    # État des filtres du tableau, évalué sur le jeu chargé comme sur les extraits archivés
+    return [
+        Condition(IDENTIFIER, "Code Agence (Abonnement)", search_params["search_code_agence"], search_mode),
+        Condition(IDENTIFIER, "Numéro de tournée", search_params["search_num_tournee"], search_mode),
+        Condition(IDENTIFIER, "Numéro contrat", search_params["search_num_contrat"], search_mode),
+        Condition(TEXT, "Nom / raison sociale du client tit.", search_params["search_nom_client"]),
+        Condition(TEXT, "Prenom du client titulaire", search_params["search_prenom_client"]),
+        Condition(TEXT, "Nom commune", search_params["search_nom_commune"]),
+        Condition(PATTERN, "Nom Agence (Abonnement)", search_params["search_nom_agence"]),
+        Condition(EQUALS, "Libelle categorie facturation", categorie_filter if categorie_filter != "Tous" else ""),
+        Condition(EQUALS, "État Contrat", etat_contrat_filter if etat_contrat_filter != "Tous" else ""),
+    ]
+
+
+def select_rows(dataset, search_params, categorie_filter, etat_contrat_filter, search_mode, fuzzy):
+    # La recherche approximative, classée par pertinence, reste sur les index ; sinon les filtres forment
+    # un seul prédicat SQL, ou passent par le cache de raffinement du jeu (frappe au fil de l'eau)
+    if fuzzy:
+        return filter_data(dataset, dataset.fingerprint, search_params, categorie_filter, etat_contrat_filter,
+                           search_mode, fuzzy)
+    conditions = search_conditions(search_params, categorie_filter, etat_contrat_filter, search_mode)
+    engine = query_engine(dataset)
+    if engine is None:
+        return dataset.select(conditions, IDENTIFIER_COLUMNS)
+    return QuerySelection(engine, conditions)
+
+
+@instrumented("autre_contrat.show_table")
+def show_table(dataset):
+    data = dataset.frame
     st.subheader("🔍 Recherche et Filtrage - Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT")
 
     with st.expander("🔍 Filtres de base"):
@@ -84,6 +232,8 @@ def show_table(data):
         search_nom_client = col2.text_input("Nom client")
         search_prenom_client = st.text_input("Prénom client")
         search_nom_commune = st.text_input("Nom commune")
+        search_mode = st.radio("Recherche des identifiants", list(SEARCH_MODES), horizontal=True)
+        fuzzy = st.checkbox("Recherche approximative des noms (orthographes proches, classées par pertinence)")
 
     search_params = {
         "search_code_agence": search_code_agence,
@@ -101,35 +251,22 @@ def show_table(data):
         categorie_filter = "Tous"
         st.warning("La colonne 'Libelle categorie facturation' n'existe pas.")
 
-    etat_contrat_filter = st.selectbox("État du contrat", options=["Tous", "En service", "Résilié"])
+    etat_contrat_filter = st.selectbox("État du contrat", options=["Tous"] + CONTRACT_STATES)
 
-    filtered_data = filter_data(data, search_params, categorie_filter, etat_contrat_filter)
+    positions = select_rows(dataset, search_params, categorie_filter, etat_contrat_filter, SEARCH_MODES[search_mode],
+                            fuzzy)
 
-    if not filtered_data.empty:
-        page_size = 10
-        total_pages = max(1, (len(filtered_data) + page_size - 1) // page_size)
-        
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            page_number = st.number_input("Page:", min_value=1, max_value=total_pages, value=1)
-        
-        start_idx = (page_number - 1) * page_size
-        end_idx = min(start_idx + page_size, len(filtered_data))
-        
-        sort_column = "Date creation abonnement" if "Date creation abonnement" in filtered_data.columns else None
-        if sort_column:
-            display_data = filtered_data.sort_values(by=sort_column, ascending=False).iloc[start_idx:end_idx]
-        else:
-            display_data = filtered_data.iloc[start_idx:end_idx]
-        
-        st.dataframe(display_data, use_container_width=True)
-        
-        output = BytesIO()
-        filtered_data.to_excel(output, index=False)
-        st.download_button("📥 Télécharger les résultats filtrés", 
-                          data=output.getvalue(), 
-                          file_name="contrats_filtres.xlsx", 
-                          mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    if len(positions):
+        filter_state = (dataset.fingerprint, tuple(search_params.items()), categorie_filter, etat_contrat_filter,
+                        search_mode, fuzzy)
+        # En recherche approximative, l'ordre de pertinence prime sur le tri par date
+        paginated_table(data, filter_state, key="autre_contrats", positions=positions,
+                        default_sort=None if fuzzy else DEFAULT_SORT, dataset=dataset)
+
+        export_panel(data, filter_state, "contrats_filtres", key="autre_contrats", positions=positions)
+
+    conditions = search_conditions(search_params, categorie_filter, etat_contrat_filter, SEARCH_MODES[search_mode])
+    search_panel(AGENCE, conditions, IDENTIFIER_COLUMNS, HISTORY_COLUMNS, key="autre")
         
         
 
@@ -137,18 +274,22 @@ def show_table(data):
 
 
 
-def show_stats(data):
+@instrumented("autre_contrat.show_stats")
+def show_stats(dataset):
+    # Bibliothèque de graphiques importée à la première page de statistiques, pas au démarrage
+    import plotly.express as px
     st.subheader("📊 Statistiques sur les Contrats - Agence_LAATAOUIA_SIDI RAHAL_TAMELLALT")
     
     regions = ["Toutes", "BE-AS LAATAOUIA", "BE-AS SIDI RAHAL", "BE-AS TAMELLALT"]
     selected_region = st.selectbox("Filtrer par région :", regions)
     
-    # Filtrer les données selon la région sélectionnée
-    filtered_data = data if selected_region == "Toutes" else data[data["Nom Agence (Abonnement)"] == selected_region]
+    # Restreindre le cube d'agrégats à la région sélectionnée (quelques milliers de cellules, pas les lignes brutes)
+    cube = dataset.cube(CUBE_COLUMNS, CUBE_DATE_COLUMN).slice(Région=selected_region)
+    total = cube.total()
     
     # Afficher le nombre total de contrats pour la région sélectionnée
     st.markdown(f"### Statistiques pour: {selected_region if selected_region != 'Toutes' else 'Toutes les régions'}")
-    st.markdown(f"**Nombre total de contrats:** {len(filtered_data)}")
+    st.markdown(f"**Nombre total de contrats:** {total}")
     
     # Créer des onglets pour chaque type de visualisation
     tab1, tab2, tab3, tab4 = st.tabs(["Répartition Catégorie/État", "Répartition géographique", "Évolution temporelle", "Tableaux récapitulatifs"])
@@ -158,17 +299,17 @@ def show_stats(data):
         col1, col2 = st.columns(2)
         
         with col1:
-            if "Libelle categorie facturation" in filtered_data.columns:
-                fig1 = px.pie(filtered_data, names="Libelle categorie facturation", 
+            if "Catégorie" in cube:
+                categories = chart_frame(cube.counts("Catégorie"), "Libelle categorie facturation", COUNT, MAX_SLICES)
+                fig1 = px.pie(categories, names="Libelle categorie facturation", values=COUNT,
                              title=f"Répartition par Catégorie ({selected_region})")
                 st.plotly_chart(fig1, use_container_width=True)
             else:
                 st.warning("La colonne 'Libelle categorie facturation' n'existe pas.")
         
         with col2:
-            filtered_data["État Contrat"] = filtered_data["Date resiliation du contrat"].apply(
-                lambda x: "Résilié" if pd.notna(x) else "En service")
-            fig2 = px.pie(filtered_data, names="État Contrat", 
+            etats = chart_frame(cube.counts("État"), "État Contrat", COUNT, MAX_SLICES)
+            fig2 = px.pie(etats, names="État Contrat", values=COUNT,
                          title=f"État des Contrats ({selected_region})", 
                          color="État Contrat", hole=0.3)
             st.plotly_chart(fig2, use_container_width=True)
@@ -176,80 +317,58 @@ def show_stats(data):
     with tab2:
         st.markdown("#### Répartition géographique")
         
-        if "Nom commune" in filtered_data.columns:
+        if "Commune" in cube:
             col1, col2 = st.columns(2)
             
             with col1:
                 # Répartition par agence (utile seulement si "Toutes" est sélectionnée)
-                if selected_region == "Toutes":
-                    nom_agence_counts = filtered_data["Nom Agence (Abonnement)"].value_counts().reset_index()
-                    nom_agence_counts.columns = ["Nom Agence", "Nombre"]
+                if selected_region == "Toutes" and "Région" in cube:
+                    nom_agence_counts = chart_frame(cube.counts("Région"), "Nom Agence", "Nombre", MAX_BARS)
                     fig_agence = px.bar(nom_agence_counts, x="Nom Agence", y="Nombre",
                                       title="Répartition par Agence")
                     st.plotly_chart(fig_agence, use_container_width=True)
                 
             with col2:
                 # Répartition par commune
-                commune_counts = filtered_data["Nom commune"].value_counts().reset_index()
-                commune_counts.columns = ["Commune", "Nombre"]
+                commune_counts = chart_frame(cube.counts("Commune"), "Commune", "Nombre", MAX_BARS)
                 fig_commune = px.bar(commune_counts, x="Commune", y="Nombre",
                                     title=f"Répartition par Commune ({selected_region})")
                 st.plotly_chart(fig_commune, use_container_width=True)
     
     with tab3:
         st.markdown("#### Évolution temporelle")
-        
-        if "Date creation abonnement" in filtered_data.columns:
-            # Évolution annuelle
-            filtered_data['Année'] = pd.to_datetime(filtered_data['Date creation abonnement']).dt.year
-            annual_data = filtered_data['Année'].value_counts().sort_index().reset_index()
-            annual_data.columns = ['Année', 'Nombre']
-            
-            fig_annual = px.line(annual_data, x='Année', y='Nombre',
-                                title=f"Évolution annuelle ({selected_region})")
-            st.plotly_chart(fig_annual, use_container_width=True)
-            
-            # Évolution mensuelle (pour la dernière année)
-            if not filtered_data.empty:
-                latest_year = filtered_data['Année'].max()
-                monthly_data = filtered_data[filtered_data['Année'] == latest_year].copy()
-                monthly_data['Mois'] = pd.to_datetime(monthly_data['Date creation abonnement']).dt.month_name()
-                monthly_counts = monthly_data['Mois'].value_counts().reset_index()
-                monthly_counts.columns = ['Mois', 'Nombre']
-                
-                fig_monthly = px.bar(monthly_counts, x='Mois', y='Nombre',
-                                    title=f"Répartition mensuelle ({latest_year}, {selected_region})")
-                st.plotly_chart(fig_monthly, use_container_width=True)
+        timeline_panel(timeline(dataset), key="autre", Région=selected_region)
     
     with tab4:
         st.markdown("#### Tableaux récapitulatifs")
         
-        if "Libelle categorie facturation" in filtered_data.columns:
+        if "Catégorie" in cube:
             # Tableau croisé Catégorie × État
-            pivot_etat = pd.crosstab(filtered_data["Libelle categorie facturation"], 
-                                    filtered_data["État Contrat"])
+            pivot_etat = cube.crosstab("Catégorie", "État").rename_axis(
+                index="Libelle categorie facturation", columns="État Contrat")
             st.markdown("##### Répartition Catégorie × État")
             st.dataframe(pivot_etat, use_container_width=True)
             
-        if "Nom commune" in filtered_data.columns and "Libelle categorie facturation" in filtered_data.columns:
+        if "Commune" in cube and "Catégorie" in cube:
             # Tableau croisé Commune × Catégorie
-            pivot_commune = pd.crosstab(filtered_data["Nom commune"], 
-                                      filtered_data["Libelle categorie facturation"])
+            pivot_commune = cube.crosstab("Commune", "Catégorie").rename_axis(
+                index="Nom commune", columns="Libelle categorie facturation")
             st.markdown("##### Répartition Commune × Catégorie")
             st.dataframe(pivot_commune, use_container_width=True)
     
+    comparison_panel(AGENCE, CUBE_COLUMNS, key="autre", state_column="État Contrat", states=CONTRACT_STATES)
+
     # Métriques clés
     st.markdown("### Métriques clés")
     col1, col2, col3 = st.columns(3)
     
     with col1:
-        total = len(filtered_data)
         st.metric("Total contrats", total)
     
     with col2:
-        en_service = len(filtered_data[filtered_data["État Contrat"] == "En service"])
+        en_service = cube.count("État", "En service")
         st.metric("Contrats en service", f"{en_service} ({en_service/total*100:.1f}%)" if total > 0 else "0")
     
     with col3:
-        resilies = len(filtered_data[filtered_data["État Contrat"] == "Résilié"])
-        st.metric("Contrats résiliés", f"{resilies} ({resilies/total*100:.1f}%)" if total > 0 else "0")
\ No newline at end of file
+        resilies = cube.count("État", "Résilié")
+        st.metric("Contrats résiliés", f"{resilies} ({resilies/total*100:.1f}%)" if total > 0 else "0")
@@ -1,37 +1,141 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-from io import BytesIO
-import datetime
-
+import numpy as np
+
+from components.delta_upload import LOAD_FULL, delta_upload, load_mode
+from components.export import export_panel
+from components.history import archive_panel, comparison_panel, pick_extract, search_panel
+from components.pagination import paginated_table
+from components.progress import ingest_progress
+from components.registry import sharing_caption, shared_dataset
+from components.timeline import timeline_panel
+from components.warming import warming_status
+from core.chart_data import MAX_SLICES, chart_frame
+from core.cube import COUNT
+from core.dataset import Dataset, file_fingerprint
+from core.expiry import ALERT_COLUMNS, DEFAULT_HORIZON, HORIZONS, horizon_window
+from core.history import Extract, history_store
+from core.ingest import DATE_RESILIATION, read_upload, describe_report
+from core.indexes import MODE_CONTAINS, MODE_PREFIX, MODE_EXACT
+from core.profiling import computed, instrumented
+from core.query import EQUALS, IDENTIFIER, TEXT, Condition, QuerySelection
+from core.warming import warm
+
+AGENCE = "Agence_El Kelaa Des Sraghna"
+
+# Colonnes d'identifiants indexées au chargement (colonne -> recherche sensible à la casse)
+IDENTIFIER_COLUMNS = {
+    "N° de contrat": True,
+    "cin": True,
+    "ex contrat SA": True,
+    "Numéro contrat": True,
+}
+
+# Colonnes de noms indexées sous forme repliée (accents, casse) pour la recherche par nom
+TEXT_COLUMNS = ["Nom de client titulaire", "Commune"]
+
+# Dimensions du cube d'agrégats des statistiques (dimension -> colonne)
+CUBE_COLUMNS = {
+    "Commune": "Commune",
+    "Catégorie": "Catégorie d'abonnement",
+    "État": "État Contrat",
+}
+CUBE_DATE_COLUMN = "Date de début"
+
+# Dimensions des séries d'abonnements et de résiliations (dimension -> colonne)
+TIMELINE_COLUMNS = {"Commune": "Commune", "Catégorie": "Catégorie d'abonnement"}
+
+# Colonnes filtrées par égalité (listes déroulantes), pour le moteur SQL
+EQUALITY_COLUMNS = ["Catégorie d'abonnement", "État Contrat"]
+
+# Tri par défaut du tableau des contrats (décroissant), préchauffé au chargement
+DEFAULT_SORT = "Date de début"
+
+# Clé d'identification des lignes pour les mises à jour incrémentales
+DELTA_KEY = "N° de contrat"
+
+# Colonnes affichées pour les contrats retrouvés dans l'historique des extraits
+HISTORY_COLUMNS = [DELTA_KEY, "Nom de client titulaire", "Commune", "État Contrat"]
+
+# États du contrat proposés aux filtres
+CONTRACT_STATES = ["En service", "Résilié"]
+
+SEARCH_MODES = {"Contient": MODE_CONTAINS, "Commence par": MODE_PREFIX, "Exact": MODE_EXACT}
+
+
+@instrumented("contrat_kelaa.show")
 def show():
     menu = st.sidebar.radio("Aller à :", ["📁 Upload de fichier", "📋 Tableau des Contrats", "📊 Statistiques"])
 
     if menu == "📁 Upload de fichier":
-        uploaded_file = st.file_uploader("Uploader un fichier (Parquet ou Excel) pour Agence_El Kelaa Des Sraghna",
-                                         type=["parquet", "xlsx"])
-        if uploaded_file is not None:
-            df = load_data(uploaded_file)
-            st.session_state.agency_data["Agence_El Kelaa Des Sraghna"] = df
-            st.success(f"Fichier chargé avec succès ✅ ({len(df)} contrats) pour Agence_El Kelaa Des Sraghna")
+        current = st.session_state.agency_data.get(AGENCE)
+        if load_mode(current is not None, AGENCE) != LOAD_FULL:
+            st.session_state.agency_data[AGENCE] = delta_upload(current, load_data, DELTA_KEY, AGENCE)
         else:
-            st.info("Veuillez charger un fichier pour commencer.")
-
-    if "Agence_El Kelaa Des Sraghna" in st.session_state.agency_data:
-        data = st.session_state.agency_data["Agence_El Kelaa Des Sraghna"]
+            uploaded_file = st.file_uploader("Uploader un fichier (Parquet ou Excel) pour Agence_El Kelaa Des Sraghna",
+                                             type=["parquet", "xlsx"])
+            if uploaded_file is not None:
+                # Un fichier déjà chargé par une autre session est repris du registre partagé, sans copie
+                fingerprint = file_fingerprint(uploaded_file)
+                dataset = shared_dataset(AGENCE, fingerprint, lambda: build_dataset(uploaded_file, fingerprint))
+                st.session_state.agency_data[AGENCE] = dataset
+                st.success(f"Fichier chargé avec succès ✅ ({len(dataset)} contrats) pour Agence_El Kelaa Des Sraghna")
+                st.caption(describe_report(dataset.frame.attrs))
+                st.caption(sharing_caption(dataset.fingerprint))
+                archive_panel(AGENCE, dataset, key="kelaa")
+            else:
+                st.info("Veuillez charger un fichier pour commencer.")
+                extract = pick_extract(AGENCE, key="kelaa")
+                if extract is not None:
+                    dataset = shared_dataset(AGENCE, extract.fingerprint,
+                                             lambda: build_dataset(extract, extract.fingerprint))
+                    st.session_state.agency_data[AGENCE] = dataset
+                    st.success(f"Extrait chargé avec succès ✅ ({len(dataset)} contrats)")
+                    st.caption(describe_report(dataset.frame.attrs))
+
+    if AGENCE in st.session_state.agency_data:
+        dataset = st.session_state.agency_data[AGENCE]
+        warming_status(dataset)
 
         if menu == "📋 Tableau des Contrats":
-            show_table(data)
+            show_table(dataset)
         elif menu == "📊 Statistiques":
-            show_stats(data)
+            show_stats(dataset)
+
+def build_dataset(uploaded_file, fingerprint):
+    # Le jeu est utilisable dès sa lecture : index, agrégats et tri par défaut se construisent en tâche de fond
+    dataset = Dataset(load_data(uploaded_file), fingerprint)
+    warm(dataset, {
+        "index des identifiants": lambda: dataset.build_identifier_indexes(IDENTIFIER_COLUMNS),
+        "index des noms": lambda: dataset.build_text_indexes(TEXT_COLUMNS),
+        "agrégats des statistiques": lambda: dataset.cube(CUBE_COLUMNS, CUBE_DATE_COLUMN),
+        "dates d'alerte": lambda: dataset.build_date_indexes(ALERT_COLUMNS.values()),
+        "moteur SQL": lambda: query_engine(dataset),
+        "tri du tableau": lambda: dataset.build_sort_orders([DEFAULT_SORT]),
+        "contrats par commune": dataset.contract_load,
+        "évolution des abonnements": lambda: timeline(dataset),
+    })
+    return dataset
+
+
+def timeline(dataset):
+    return dataset.timeline(TIMELINE_COLUMNS, CUBE_DATE_COLUMN, DATE_RESILIATION)
 
-@st.cache_data(show_spinner="Chargement des données...", ttl=3600)
+
+def query_engine(dataset):
+    return dataset.query_engine(IDENTIFIER_COLUMNS, TEXT_COLUMNS, equality_columns=EQUALITY_COLUMNS)
+
+
+@instrumented("contrat_kelaa.load_data")
 def load_data(file_path):
+    # Lecture servie par le cache disque ; le jeu chargé est ensuite partagé par le registre
     try:
-        if file_path.name.endswith('.xlsx'):
-            return pd.read_excel(file_path)
-        else:
-            return pd.read_parquet(file_path)
+        if isinstance(file_path, Extract):
+            # Extrait archivé, relu depuis l'historique partitionné
+            with st.spinner("Chargement de l'extrait archivé..."):
+                return history_store.load(file_path)
+        with st.spinner("Chargement des données..."), ingest_progress("Lecture du fichier") as progress:
+            return read_upload(file_path, progress=progress)
     except Exception as e:
         st.error(f"Erreur lors du chargement du fichier: {str(e)}")
         return pd.DataFrame()
@@ -39,36 +143,73 @@ def load_data(file_path):
 # Reste du code...
 
 
+@instrumented("contrat_kelaa.filter_data", cached=True)
 @st.cache_data(show_spinner=True)
-def filter_data(df, search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur, search_commune,
-                categorie_filter, etat_contrat_filter):
-    filtered_df = df.copy()
-    if not filtered_df.empty:
-        filtered_df["État Contrat"] = filtered_df["Date resiliation du contrat"].apply(
-            lambda x: "Résilié" if pd.notna(x) else "En service")
-        if search_nom and "Nom de client titulaire" in filtered_df.columns:
-            filtered_df = filtered_df[
-                filtered_df["Nom de client titulaire"].str.contains(search_nom, case=False, na=False)]
-        if search_contrat and "N° de contrat" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["N° de contrat"].astype(str).str.contains(search_contrat, na=False)]
-        if search_CIN and "cin" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["cin"].astype(str).str.contains(search_CIN, na=False)]
-        if search_ancienne_ref and "ex contrat SA" in filtered_df.columns:
-            filtered_df = filtered_df[
-                filtered_df["ex contrat SA"].astype(str).str.contains(search_ancienne_ref, na=False)]
-        if search_num_compteur and "Numéro contrat" in filtered_df.columns:
-            filtered_df = filtered_df[
-                filtered_df["Numéro contrat"].astype(str).str.contains(search_num_compteur, na=False)]
-        if search_commune and "Commune" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Commune"].str.contains(search_commune, case=False, na=False)]
-        if categorie_filter != "Tous" and "Catégorie d'abonnement" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["Catégorie d'abonnement"] == categorie_filter]
-        if etat_contrat_filter != "Tous" and "État Contrat" in filtered_df.columns:
-            filtered_df = filtered_df[filtered_df["État Contrat"] == etat_contrat_filter]
-    return filtered_df
-
-
-def show_table(data):
+@computed
+def filter_data(_dataset, fingerprint, search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur,
+                search_commune, categorie_filter, etat_contrat_filter, search_mode=MODE_CONTAINS, fuzzy=False):
+    # `fingerprint` identifie le jeu de données dans la clé de cache, à la place du hachage de tout le DataFrame
+    # Renvoie les positions des lignes retenues dans le jeu partagé, jamais une copie des données
+    data = _dataset.frame
+    positions = np.arange(len(data))
+    if not data.empty:
+        # Les identifiants sont résolus par les index : seules les lignes retenues sont extraites
+        found = _dataset.lookup_identifiers({
+            "N° de contrat": search_contrat,
+            "cin": search_CIN,
+            "ex contrat SA": search_ancienne_ref,
+            "Numéro contrat": search_num_compteur,
+        }, IDENTIFIER_COLUMNS, search_mode)
+        # Noms et communes : recherche repliée (accents, casse), éventuellement approximative et classée
+        found, scores = _dataset.lookup_text({
+            "Nom de client titulaire": search_nom,
+            "Commune": search_commune,
+        }, fuzzy, within=found)
+        if fuzzy and scores is not None:
+            found = found[np.argsort(-scores, kind="stable")]
+        if found is not None:
+            positions = found
+        if categorie_filter != "Tous" and "Catégorie d'abonnement" in data.columns:
+            positions = positions[(data["Catégorie d'abonnement"].iloc[positions] == categorie_filter).to_numpy()]
+        if etat_contrat_filter != "Tous" and "État Contrat" in data.columns:
+            positions = positions[(data["État Contrat"].iloc[positions] == etat_contrat_filter).to_numpy()]
+    return positions
+
+
+def search_conditions(search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur, search_commune,
+                      categorie_filter, etat_contrat_filter, search_mode):
+    # État des filtres du tableau, évalué sur le jeu chargé comme sur les extraits archivés
+    return [
+        Condition(IDENTIFIER, "N° de contrat", search_contrat, search_mode),
+        Condition(IDENTIFIER, "cin", search_CIN, search_mode),
+        Condition(IDENTIFIER, "ex contrat SA", search_ancienne_ref, search_mode),
+        Condition(IDENTIFIER, "Numéro contrat", search_num_compteur, search_mode),
+        Condition(TEXT, "Nom de client titulaire", search_nom),
+        Condition(TEXT, "Commune", search_commune),
+        Condition(EQUALS, "Catégorie d'abonnement", categorie_filter if categorie_filter != "Tous" else ""),
+        Condition(EQUALS, "État Contrat", etat_contrat_filter if etat_contrat_filter != "Tous" else ""),
+    ]
+
+
+def select_rows(dataset, search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur,
+                search_commune, categorie_filter, etat_contrat_filter, search_mode, fuzzy):
+    # La recherche approximative, classée par pertinence, reste sur les index ; sinon les filtres forment
+    # un seul prédicat SQL, ou passent par le cache de raffinement du jeu (frappe au fil de l'eau)
+    if fuzzy:
+        return filter_data(dataset, dataset.fingerprint, search_nom, search_contrat, search_CIN, search_ancienne_ref,
+                           search_num_compteur, search_commune, categorie_filter, etat_contrat_filter, search_mode,
+                           fuzzy)
+    conditions = search_conditions(search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur,
+                                   search_commune, categorie_filter, etat_contrat_filter, search_mode)
+    engine = query_engine(dataset)
+    if engine is None:
+        return dataset.select(conditions, IDENTIFIER_COLUMNS)
+    return QuerySelection(engine, conditions)
+
+
+@instrumented("contrat_kelaa.show_table")
+def show_table(dataset):
+    data = dataset.frame
     st.subheader("🔍 Recherche et Filtrage - Agence_El Kelaa Des Sraghna")
 
     with st.expander("🔍 Filtres de base"):
@@ -82,6 +223,8 @@ def show_table(data):
         search_CIN = col1.text_input("CIN")
         search_ancienne_ref = col2.text_input("Ancienne référence")
         search_num_compteur = st.text_input("Numéro de compteur")
+        search_mode = st.radio("Recherche des identifiants", list(SEARCH_MODES), horizontal=True)
+        fuzzy = st.checkbox("Recherche approximative des noms (orthographes proches, classées par pertinence)")
 
     if "Catégorie d'abonnement" in data.columns:
         categorie_filter = st.selectbox("Catégorie d'abonnement",
@@ -90,41 +233,33 @@ def show_table(data):
         categorie_filter = "Tous"
         st.warning("La colonne 'Catégorie d'abonnement' n'existe pas. Le filtre de catégorie est désactivé.")
 
-    etat_contrat_filter = st.selectbox("État du contrat", options=["Tous", "En service", "Résilié"])
-
-    filtered_data = filter_data(data, search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur,
-                                search_commune, categorie_filter, etat_contrat_filter)
+    etat_contrat_filter = st.selectbox("État du contrat", options=["Tous"] + CONTRACT_STATES)
 
-    if not filtered_data.empty:
-        page_size = 10
-        total_pages = max(1, (len(filtered_data) + page_size - 1) // page_size)
+    positions = select_rows(dataset, search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur,
+                            search_commune, categorie_filter, etat_contrat_filter, SEARCH_MODES[search_mode], fuzzy)
 
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            page_number = st.number_input("Page:", min_value=1, max_value=total_pages, value=1)
-
-        start_idx = (page_number - 1) * page_size
-        end_idx = min(start_idx + page_size, len(filtered_data))
-
-        sort_column = "Date de début" if "Date de début" in filtered_data.columns else None
-        if sort_column:
-            display_data = filtered_data.sort_values(by=sort_column, ascending=False).iloc[start_idx:end_idx]
-        else:
-            display_data = filtered_data.iloc[start_idx:end_idx]
-
-        st.dataframe(display_data, use_container_width=True)
-
-        output = BytesIO()
-        filtered_data.to_excel(output, index=False)
-        st.download_button("📥 Télécharger les résultats filtrés",
-                           data=output.getvalue(),
-                           file_name="contrats_filtres.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+    if len(positions):
+        filter_state = (dataset.fingerprint, search_nom, search_contrat, search_CIN, search_ancienne_ref,
+                        search_num_compteur, search_commune, categorie_filter, etat_contrat_filter, search_mode, fuzzy)
+        # En recherche approximative, l'ordre de pertinence prime sur le tri par date
+        paginated_table(data, filter_state, key="kelaa_contrats", positions=positions,
+                        default_sort=None if fuzzy else DEFAULT_SORT, dataset=dataset)
 
+        export_panel(data, filter_state, "contrats_filtres", key="kelaa_contrats", positions=positions)
+    else:
         st.warning("Aucune donnée à afficher avec les filtres actuels.")
 
+    conditions = search_conditions(search_nom, search_contrat, search_CIN, search_ancienne_ref, search_num_compteur,
+                                   search_commune, categorie_filter, etat_contrat_filter, SEARCH_MODES[search_mode])
+    search_panel(AGENCE, conditions, IDENTIFIER_COLUMNS, HISTORY_COLUMNS, key="kelaa")
+
 
-def show_stats(data):
+@instrumented("contrat_kelaa.show_stats")
+def show_stats(dataset):
+    # Bibliothèque de graphiques importée à la première page de statistiques, pas au démarrage
+    import plotly.express as px
+    data = dataset.frame
+    cube = dataset.cube(CUBE_COLUMNS, CUBE_DATE_COLUMN)
     st.subheader("📊 Statistiques sur les Contrats - Agence_El Kelaa Des Sraghna")
 
     tab1, tab2, tab3, tab4 = st.tabs(
@@ -132,61 +267,52 @@ def show_stats(data):
 
     with tab1:
         st.markdown("#### Répartition par Catégorie d'Abonnement")
-        if "Catégorie d'abonnement" in data.columns:
-            fig1 = px.pie(data, names="Catégorie d'abonnement", title="Répartition des Contrats")
+        if "Catégorie" in cube:
+            categories = chart_frame(cube.counts("Catégorie"), "Catégorie d'abonnement", COUNT, MAX_SLICES)
+            fig1 = px.pie(categories, names="Catégorie d'abonnement", values=COUNT, title="Répartition des Contrats")
             st.plotly_chart(fig1, use_container_width=True)
         else:
             st.warning("La colonne 'Catégorie d'abonnement' n'existe pas.")
 
     with tab2:
         st.markdown("#### Répartition par État")
-        data["État Contrat"] = data["Date resiliation du contrat"].apply(
-            lambda x: "Résilié" if pd.notna(x) else "En service")
-        fig2 = px.pie(data_frame=data, names="État Contrat", title="Contrats (Résiliés vs En Service)",
+        etats = chart_frame(cube.counts("État"), "État Contrat", COUNT, MAX_SLICES)
+        fig2 = px.pie(data_frame=etats, names="État Contrat", values=COUNT, title="Contrats (Résiliés vs En Service)",
                       color="État Contrat", hole=0.3)
         st.plotly_chart(fig2, use_container_width=True)
 
     with tab3:
-        st.markdown("#### Évolution des Abonnements par Années")
-        if "Date de début" in data.columns:
-            data['Date de début'] = pd.to_datetime(data['Date de début'], errors='coerce')
-            data['Année'] = data['Date de début'].dt.year
-            abonnement_par_annee = data['Année'].value_counts().sort_index()
-            fig_abonnement = px.line(abonnement_par_annee, x=abonnement_par_annee.index, y=abonnement_par_annee.values,
-                                     labels={'x': 'Année', 'y': "Nombre d'Abonnements"},
-                                     title="Évolution des Abonnements")
-            st.plotly_chart(fig_abonnement, use_container_width=True)
+        st.markdown("#### Évolution des Abonnements et des Résiliations")
+        timeline_panel(timeline(dataset), key="kelaa")
 
     with tab4:
         st.markdown("#### Tableaux récapitulatifs")
 
-        
-
-        if "Commune" in data.columns and "Catégorie d'abonnement" in data.columns:
+        if "Commune" in cube and "Catégorie" in cube:
             # Tableau croisé Commune × Catégorie
-            pivot_commune = pd.crosstab(data["Commune"],
-                                        data["Catégorie d'abonnement"])
+            pivot_commune = cube.crosstab("Commune", "Catégorie")
+            pivot_commune = pivot_commune.rename_axis(index="Commune", columns="Catégorie d'abonnement")
             st.markdown("##### Répartition Commune × Catégorie")
             st.dataframe(pivot_commune, use_container_width=True)
 
+    comparison_panel(AGENCE, CUBE_COLUMNS, key="kelaa", state_column="État Contrat", states=CONTRACT_STATES)
+
     st.markdown("---")
     st.subheader("🚨 Alertes : Contrats Proches de la Fin")
     if "Date de fin" in data.columns:
-        data['Date de fin'] = pd.to_datetime(data['Date de fin'], errors='coerce')
-        today = pd.Timestamp(datetime.date.today())
-        prochain_mois = today + pd.DateOffset(months=1)
-        alertes = data[
-            (data["Date de fin"].notnull()) & (data["Date de fin"] >= today) & (data["Date de fin"] <= prochain_mois)]
-        if not alertes.empty:
-            st.warning(f"⚠ {len(alertes)} contrats arrivent à échéance dans le mois à venir !")
+        horizon = st.radio("Horizon des alertes", HORIZONS, index=HORIZONS.index(DEFAULT_HORIZON), horizontal=True,
+                           format_func=lambda days: f"{days} jours", key="kelaa_horizon")
+        start, end = horizon_window(horizon)
+        # Plage de dates résolue par dichotomie dans l'index des dates de fin, sans parcourir le tableau
+        positions = dataset.date_index("Date de fin").between(start, end)
+        if len(positions):
+            st.warning(f"⚠ {len(positions)} contrats arrivent à échéance dans les {horizon} jours à venir !")
+            alertes = data.iloc[positions]
             st.dataframe(alertes[["Numéro contrat", "Nom de client titulaire", "Date de fin"]],
                          use_container_width=True)
-            alert_output = BytesIO()
-            alertes.to_excel(alert_output, index=False)
-            st.download_button("📥 Télécharger les alertes", data=alert_output.getvalue(),
-                               file_name="alertes_echeances.xlsx",
-                               mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+            export_panel(alertes, (dataset.fingerprint, start, horizon), "alertes_echeances", key="kelaa_alertes",
+                         label="📥 Télécharger les alertes")
         else:
-            st.success("✅ Aucun contrat n'arrive à échéance dans le mois à venir.")
+            st.success(f"✅ Aucun contrat n'arrive à échéance dans les {horizon} jours à venir.")
     else:
-        st.info("Pas de date de fin disponible pour cette agence.")
\ No newline at end of file
+        st.info("Pas de date de fin disponible pour cette agence.")
@@ -1,39 +1,93 @@
 import streamlit as st
 import pandas as pd
-import plotly.express as px
-import altair as alt
-from io import BytesIO
 
+from components.delta_upload import LOAD_FULL, delta_upload, load_mode
+from components.export import export_panel
+from components.load import load_panel
+from components.pagination import paginated_table
+from components.progress import ingest_progress
+from components.registry import sharing_caption, shared_dataset
+from components.warming import warming_status
+from core.chart_data import MAX_BARS, chart_frame, chart_frame_2d
+from core.cube import COUNT, POWER_MAX, POWER_MEAN, POWER_TOTAL
+from core.dataset import Dataset, file_fingerprint
+from core.ingest import read_upload, describe_report
+from core.profiling import instrumented
+from core.query import PATTERN, Condition, QuerySelection, selected_positions
+from core.warming import warm
+
+# Clé d'identification des postes pour les mises à jour incrémentales
+DELTA_KEY = "MATRICULE"
+
+# Colonnes des filtres de recherche (sous-chaîne insensible à la casse)
+FILTER_COLUMNS = ["NOMDEPART", "NOM COMMUNE", "ADRESCIVIQ", "MATRICULE", "TYPEPOSTE"]
+
+# Identifiants uniques indexés pour ouvrir une fiche poste (colonne -> sensible à la casse). L'inventaire
+# des postes n'en porte qu'un : départ, commune, adresse et type sont partagés par de nombreux postes et
+# restent des filtres du tableau (FILTER_COLUMNS), pas des clés de fiche
+KEY_COLUMNS = {"MATRICULE": False}
+
+# Dimensions et colonne de puissance des agrégats statistiques, calculés une fois au chargement
+CAPACITY_DIMENSIONS = ["NOMDEPART", "NOM COMMUNE", "TYPEPOSTE"]
+POWER_COLUMN = "PUISNOM"
+
+# Colonnes affichées dans les propositions du sélecteur de fiche
+LABEL_COLUMNS = ["MATRICULE", "NOMDEPART", "NOM COMMUNE"]
+
+@instrumented("postes.show")
 def show():
-    menu_postes = st.sidebar.radio("Aller à :", ["📁 Upload de fichier", "📋 Tableau des Postes", "📊 Statistiques"])
+    menu_postes = st.sidebar.radio("Aller à :", ["📁 Upload de fichier", "📋 Tableau des Postes", "📊 Statistiques",
+                                                 "⚡ Charge des départs"])
 
     if menu_postes == "📁 Upload de fichier":
-        uploaded_file = st.file_uploader("Uploader un fichier (Parquet ou Excel) pour les postes", type=["parquet", "xlsx"])
-        if uploaded_file is not None:
-            postes_data = load_postes(uploaded_file)
-            st.session_state.postes_data = postes_data
-            st.success(f"Fichier chargé avec succès ✅ ({len(postes_data)} postes)")
+        current = st.session_state.postes_data
+        if load_mode(current is not None, "postes") != LOAD_FULL:
+            st.session_state.postes_data = delta_upload(current, load_postes, DELTA_KEY, "postes")
+        else:
+            uploaded_file = st.file_uploader("Uploader un fichier (Parquet ou Excel) pour les postes", type=["parquet", "xlsx"])
+            if uploaded_file is not None:
+                # Un fichier déjà chargé par une autre session est repris du registre partagé, sans copie
+                fingerprint = file_fingerprint(uploaded_file)
+                postes_data = shared_dataset("postes", fingerprint, lambda: build_dataset(uploaded_file, fingerprint))
+                st.session_state.postes_data = postes_data
+                st.success(f"Fichier chargé avec succès ✅ ({len(postes_data)} postes)")
+                st.caption(describe_report(postes_data.frame.attrs))
+                st.caption(sharing_caption(postes_data.fingerprint))
 
     if st.session_state.postes_data is not None:
-        data = st.session_state.postes_data
+        dataset = st.session_state.postes_data
+        warming_status(dataset)
 
         if menu_postes == "📋 Tableau des Postes":
-            show_table(data)
+            show_table(dataset)
         elif menu_postes == "📊 Statistiques":
-            show_stats(data)
-
-@st.cache_data(show_spinner="Chargement des postes...", ttl=3600)
+            show_stats(dataset)
+        elif menu_postes == "⚡ Charge des départs":
+            # Contrats des agences chargées dans la session, rapprochés des postes par commune
+            load_panel(st.session_state.agency_data, dataset, capacity(dataset))
+
+def build_dataset(uploaded_file, fingerprint):
+    # Index des matricules et agrégats de puissance construits en tâche de fond, le jeu est utilisable aussitôt
+    dataset = Dataset(load_postes(uploaded_file), fingerprint)
+    warm(dataset, {
+        "index des matricules": lambda: dataset.build_identifier_indexes(KEY_COLUMNS),
+        "agrégats de puissance": lambda: capacity(dataset),
+    })
+    return dataset
+
+@instrumented("postes.load_postes")
 def load_postes(file_path):
+    # Lecture servie par le cache disque ; le jeu chargé est ensuite partagé par le registre
     try:
-        if file_path.name.endswith('.xlsx'):
-            return pd.read_excel(file_path)
-        else:
-            return pd.read_parquet(file_path)
+        with st.spinner("Chargement des postes..."), ingest_progress("Lecture du fichier postes") as progress:
+            return read_upload(file_path, progress=progress)
     except Exception as e:
         st.error(f"Erreur lors du chargement du fichier postes: {str(e)}")
         return pd.DataFrame()
 
-def show_table(data):
+@instrumented("postes.show_table")
+def show_table(dataset):
+    data = dataset.frame
     st.subheader("🔍 Recherche et Filtrage")
 
     with st.expander("🔍 Filtres de recherche"):
@@ -52,56 +106,78 @@ def show_table(data):
         "TYPEPOSTE": typeposte
     }
 
-    filtered_data = filter_postes(data, filters)
+    positions = select_postes(dataset, filters)
     st.markdown("### 📈 Statistiques sur la recherche")
     col1, col2 = st.columns(2)
-    col1.metric("📄 Postes affichés", len(filtered_data))
+    col1.metric("📄 Postes affichés", len(positions))
     col2.metric("🔍 Filtres actifs", sum(bool(v) for v in filters.values()))
 
-    if not filtered_data.empty:
-        page_size = 10
-        total_pages = max(1, (len(filtered_data) + page_size - 1) // page_size)
-
-        col1, col2 = st.columns([1, 3])
-        with col1:
-            page_number = st.number_input("Page:", min_value=1, max_value=total_pages, value=1)
-
-        start_idx = (page_number - 1) * page_size
-        end_idx = min(start_idx + page_size, len(filtered_data))
+    if len(positions):
+        filter_state = (dataset.fingerprint, tuple(filters.items()))
+        paginated_table(data, filter_state, key="postes", positions=positions)
 
-        st.dataframe(filtered_data.iloc[start_idx:end_idx], use_container_width=True)
+        export_panel(data, filter_state, "postes_filtres", key="postes", positions=positions)
 
-        output = BytesIO()
-        filtered_data.to_excel(output, index=False)
-        st.download_button("📥 Télécharger les résultats filtrés",
-                           data=output.getvalue(),
-                           file_name="postes_filtres.xlsx",
-                           mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-
-        selected_index = st.selectbox("Sélectionner un poste pour voir la fiche :", options=filtered_data.index)
-        poste_info = filtered_data.loc[selected_index]
-
-        st.markdown("---")
-        st.markdown("### 🧾 Fiche Poste")
-        st.json(poste_info.to_dict())
+        position = pick_poste(dataset, positions)
+        if position is not None:
+            st.markdown("---")
+            st.markdown("### 🧾 Fiche Poste")
+            st.json(data.iloc[position].to_dict())
     else:
         st.warning("Aucune donnée à afficher avec les filtres actuels.")
 
-@st.cache_data(show_spinner=True)
-def filter_postes(df, filters):
-    filtered_df = df.copy()
-    if not filtered_df.empty:
-        for key, value in filters.items():
-            if value and key in filtered_df.columns:
-                filtered_df = filtered_df[filtered_df[key].astype(str).str.contains(value, case=False, na=False)]
-    return filtered_df
-
-def show_stats(data):
+@instrumented("postes.pick_poste")
+def pick_poste(dataset, positions):
+    # Recherche à la frappe : seules les meilleures correspondances parmi les postes filtrés sont proposées
+    query = st.text_input("Rechercher un poste pour voir la fiche (MATRICULE) :", key="postes_fiche_query")
+    matches = dataset.suggest(KEY_COLUMNS, query, within=selected_positions(positions))
+    if not len(matches):
+        st.info("Aucun poste ne correspond à cette recherche.")
+        return None
+    labels = [column for column in LABEL_COLUMNS if column in dataset.columns]
+    return st.selectbox("Sélectionner un poste pour voir la fiche :", options=matches.tolist(),
+                        format_func=lambda position: " — ".join(str(dataset.frame[column].iat[position])
+                                                                 for column in labels))
+
+def capacity(dataset):
+    return dataset.capacity(CAPACITY_DIMENSIONS, POWER_COLUMN)
+
+def select_postes(dataset, filters):
+    # Un seul prédicat SQL avec le moteur DuckDB ; sinon le cache de raffinement du jeu ne reparcourt
+    # que les postes retenus par une recherche plus courte
+    conditions = [Condition(PATTERN, column, value) for column, value in filters.items()]
+    engine = dataset.query_engine(pattern_columns=FILTER_COLUMNS)
+    if engine is None:
+        return dataset.select(conditions)
+    return QuerySelection(engine, conditions)
+
+@instrumented("postes.show_stats")
+def show_stats(dataset):
+    # Bibliothèque de graphiques importée à la première page de statistiques, pas au démarrage
+    import altair as alt
+    import plotly.express as px
     st.subheader("📊 Statistiques sur les Postes Électriques")
+    # Tous les graphiques sont servis par les agrégats calculés au chargement, sans parcourir les postes
+    cube = capacity(dataset)
+    has_power = POWER_COLUMN in dataset.columns and not dataset.empty
+
+    if has_power:
+        st.markdown("#### Capacité du parc")
+        parc = cube.rollup().iloc[0]
+        col1, col2, col3, col4 = st.columns(4)
+        col1.metric("Puissance totale", f"{parc[POWER_TOTAL]:,.0f}".replace(",", " "))
+        col2.metric("Puissance moyenne", f"{parc[POWER_MEAN]:,.1f}".replace(",", " "))
+        col3.metric("Puissance max", f"{parc[POWER_MAX]:,.0f}".replace(",", " "))
+        col4.metric("Postes", f"{int(parc[COUNT]):,}".replace(",", " "))
+
+    if has_power and "NOMDEPART" in cube:
+        st.markdown("#### Capacité par départ (NOMDEPART)")
+        feeders = cube.rollup(["NOMDEPART"]).sort_values(POWER_TOTAL, ascending=False, kind="stable")
+        feeders.index = feeders.index.astype(str)
+        st.dataframe(feeders.rename(columns={COUNT: "Nombre de Postes"}), use_container_width=True)
 
-    if "PUISNOM" in data.columns and "NOMDEPART" in data.columns and not data.empty:
         st.markdown("#### Somme de Puissance par NOMDEPART")
-        chart_data = data.groupby("NOMDEPART")["PUISNOM"].sum().reset_index()
+        chart_data = chart_frame(cube.rollup(["NOMDEPART"])[POWER_TOTAL], "NOMDEPART", "PUISNOM", MAX_BARS)
         if not chart_data.empty:
             chart = alt.Chart(chart_data).mark_bar().encode(
                 x=alt.X("NOMDEPART", sort="-y"),
@@ -110,9 +186,9 @@ def show_stats(data):
             ).properties(width="container", height=400)
             st.altair_chart(chart, use_container_width=True)
 
-    if "PUISNOM" in data.columns and "NOM COMMUNE" in data.columns and not data.empty:
+    if has_power and "NOM COMMUNE" in cube:
         st.markdown("#### Somme de Puissance par NOM COMMUNE")
-        chart_data = data.groupby("NOM COMMUNE")["PUISNOM"].sum().reset_index()
+        chart_data = chart_frame(cube.rollup(["NOM COMMUNE"])[POWER_TOTAL], "NOM COMMUNE", "PUISNOM", MAX_BARS)
         if not chart_data.empty:
             chart = alt.Chart(chart_data).mark_bar(color='orange').encode(
                 x=alt.X("NOM COMMUNE", sort="-y"),
@@ -122,9 +198,10 @@ def show_stats(data):
             st.altair_chart(chart, use_container_width=True)
 
     # Nombre de postes par TYPEPOSTE et NOMDEPART
-    if "TYPEPOSTE" in data.columns and "NOMDEPART" in data.columns and not data.empty:
+    if "TYPEPOSTE" in cube and "NOMDEPART" in cube and not dataset.empty:
         st.markdown("#### Nombre de Postes par TYPEPOSTE et NOMDEPART")
-        chart_data = data.groupby(["NOMDEPART", "TYPEPOSTE"]).size().reset_index(name="Nombre de Postes")
+        chart_data = chart_frame_2d(postes_counts(cube, "NOMDEPART"), "NOMDEPART", "TYPEPOSTE", "Nombre de Postes",
+                                    MAX_BARS)
         if not chart_data.empty:
             chart = alt.Chart(chart_data).mark_bar().encode(
                 x="NOMDEPART",
@@ -136,12 +213,17 @@ def show_stats(data):
 
     # Nombre de postes par TYPEPOSTE et NOM COMMUNE
     st.markdown("#### Nombre de Postes par TYPEPOSTE et NOM COMMUNE")
-    if "TYPEPOSTE" in data.columns and "NOM COMMUNE" in data.columns:
-        typeposte_par_commune = data.groupby(["NOM COMMUNE", "TYPEPOSTE"]).size().reset_index(name="Nombre de Postes")
+    if "TYPEPOSTE" in cube and "NOM COMMUNE" in cube:
+        typeposte_par_commune = chart_frame_2d(postes_counts(cube, "NOM COMMUNE"), "NOM COMMUNE", "TYPEPOSTE",
+                                               "Nombre de Postes", MAX_BARS)
         fig_typeposte_commune = px.bar(typeposte_par_commune, x="NOM COMMUNE", y="Nombre de Postes", color="TYPEPOSTE",
                                        labels={"Nombre de Postes": "Nombre de Postes", "NOM COMMUNE": "Nom Commune",
                                                "TYPEPOSTE": "Type Poste"},
                                        title="Nombre de Postes par Type de Poste et Nom Commune")
         st.plotly_chart(fig_typeposte_commune, use_container_width=True)
     else:
-        st.warning("Les colonnes 'TYPEPOSTE' ou 'NOM COMMUNE' n'existent pas dans les données.")
\ No newline at end of file
+        st.warning("Les colonnes 'TYPEPOSTE' ou 'NOM COMMUNE' n'existent pas dans les données.")
+
+def postes_counts(cube, label):
+    # Nombre de postes par (label, TYPEPOSTE), au format attendu par `chart_frame_2d`
+    return cube.rollup([label, "TYPEPOSTE"])[COUNT].reset_index(name="Nombre de Postes")
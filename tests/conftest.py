@@ -0,0 +1,25 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+@pytest.fixture
+def contracts():
+    # Petit extrait de contrats : identifiants en casse mixte, noms accentués, valeurs manquantes
+    return pd.DataFrame({
+        "N° de contrat": ["AB1200", "ab1201", None, "XB12", "AB9", np.nan, "ZZ1200", "ab12"],
+        "cin": ["K100", "k1001", "K100", None, "J77", "K10", "k100", "J7"],
+        "Nom de client titulaire": ["Aït Ouahmane Saïd", "SAID Benali", None, "Éloufir Youssef", "ben ali",
+                                    "EL AMRANI Fatima", "Said", "Lahcen Khadija"],
+        "Commune": ["El Kelâa", "EL KELAA", "Sidi Rahal", None, "Tamellalt", "el kelaa", "Laattaouia", "Sidi Rahal"],
+        "Catégorie d'abonnement": ["BT", "MT", "BT", "BT", None, "MT", "BT", "BT"],
+    })
+
+
+@pytest.fixture
+def baseline():
+    """Positions retenues par le filtrage d'origine : `str.contains(query, case=..., na=False)` sur la colonne."""
+    def contains(series, query, case=False):
+        matches = series.str.contains(query, case=case, na=False, regex=False)
+        return np.flatnonzero(matches.to_numpy(dtype=bool))
+    return contains
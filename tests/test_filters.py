@@ -0,0 +1,104 @@
+import numpy as np
+import pytest
+
+import core.filters
+from core.dataset import Dataset
+from core.filters import FilterCache, evaluate, refines
+from core.indexes import MODE_CONTAINS, MODE_EXACT, MODE_PREFIX
+from core.query import EQUALS, IDENTIFIER, PATTERN, TEXT, Condition
+from core.text_search import fold_series
+
+IDENTIFIER_COLUMNS = {"N° de contrat": False, "cin": False}
+
+
+def name(value):
+    return Condition(TEXT, "Nom de client titulaire", value)
+
+
+@pytest.mark.parametrize("new, old, expected", [
+    ([name("said")], [name("sai")], True),
+    ([name("sai")], [name("said")], False),
+    ([name("sai"), Condition(EQUALS, "Catégorie d'abonnement", "BT")], [name("sai")], True),
+    ([name("sai")], [name("sai"), Condition(EQUALS, "Catégorie d'abonnement", "BT")], False),
+    ([name("sai")], [name("")], True),
+    ([Condition(IDENTIFIER, "cin", "K100", MODE_PREFIX)], [Condition(IDENTIFIER, "cin", "K1", MODE_PREFIX)], True),
+    ([Condition(IDENTIFIER, "cin", "K100", MODE_PREFIX)], [Condition(IDENTIFIER, "cin", "10", MODE_PREFIX)], False),
+    ([Condition(IDENTIFIER, "cin", "K100", MODE_EXACT)], [Condition(IDENTIFIER, "cin", "K1", MODE_EXACT)], False),
+    ([Condition(IDENTIFIER, "cin", "K100", MODE_CONTAINS)], [Condition(IDENTIFIER, "cin", "K1", MODE_PREFIX)], False),
+    ([Condition(PATTERN, "Commune", "sidi r")], [Condition(PATTERN, "Commune", "sidi")], True),
+    # Une expression régulière prolongée n'est pas forcément plus restrictive
+    ([Condition(PATTERN, "Commune", "sidi|el")], [Condition(PATTERN, "Commune", "sidi")], False),
+])
+def test_refines(new, old, expected):
+    assert refines(new, old) is expected
+
+
+@pytest.fixture
+def evaluations(monkeypatch):
+    # Candidats (`within`) passés à chaque évaluation effective du cache
+    calls = []
+    original = core.filters.evaluate
+
+    def spy(dataset, conditions, identifier_columns, within=None):
+        calls.append(None if within is None else within.copy())
+        return original(dataset, conditions, identifier_columns, within)
+    monkeypatch.setattr(core.filters, "evaluate", spy)
+    return calls
+
+
+def test_typing_narrows_cached_result(contracts, baseline, evaluations):
+    dataset = Dataset(contracts, "fp")
+    cache = FilterCache()
+    # Noms comparés repliés (accents) : "sai" retient aussi "Saïd"
+    names = fold_series(contracts["Nom de client titulaire"])
+    previous = None
+    for typed in ["s", "sa", "sai", "said"]:
+        positions = cache.select(dataset, [name(typed)], IDENTIFIER_COLUMNS)
+        np.testing.assert_array_equal(positions, baseline(names, typed))
+        if previous is not None:
+            # Chaque frappe repart des lignes de la précédente, pas du jeu complet
+            np.testing.assert_array_equal(evaluations[-1], previous)
+        previous = positions
+    assert evaluations[0] is None
+
+    # Filtre ajouté : raffinement du résultat "said"
+    category = Condition(EQUALS, "Catégorie d'abonnement", "BT")
+    positions = cache.select(dataset, [name("said"), category], IDENTIFIER_COLUMNS)
+    expected = np.intersect1d(previous, np.flatnonzero((contracts["Catégorie d'abonnement"] == "BT").to_numpy()))
+    np.testing.assert_array_equal(positions, expected)
+    np.testing.assert_array_equal(evaluations[-1], previous)
+
+    # Filtre déjà calculé : servi tel quel
+    count = len(evaluations)
+    np.testing.assert_array_equal(cache.select(dataset, [name("sai")], IDENTIFIER_COLUMNS),
+                                  baseline(names, "sai"))
+    assert len(evaluations) == count
+
+
+def test_broadened_filter_is_recomputed(contracts, baseline):
+    # Effacer un caractère élargit le filtre : le résultat plus restreint en cache ne sert pas de candidats
+    dataset = Dataset(contracts, "fp")
+    cache = FilterCache()
+    numbers = contracts["N° de contrat"]
+    for typed in ["ab12", "ab120", "ab12", "b1", ""]:
+        conditions = [Condition(IDENTIFIER, "N° de contrat", typed)]
+        expected = np.arange(len(contracts)) if not typed else baseline(numbers, typed)
+        np.testing.assert_array_equal(cache.select(dataset, conditions, IDENTIFIER_COLUMNS), expected)
+        np.testing.assert_array_equal(evaluate(dataset, conditions, IDENTIFIER_COLUMNS), expected)
+
+
+def test_eviction(contracts):
+    dataset = Dataset(contracts, "fp")
+    cache = FilterCache(max_entries=2)
+    for typed in ["k", "k1", "k10"]:
+        cache.select(dataset, [Condition(IDENTIFIER, "cin", typed)], IDENTIFIER_COLUMNS)
+    assert len(cache) == 2
+    cache = FilterCache(max_bytes=0)
+    cache.select(dataset, [Condition(IDENTIFIER, "cin", "k")], IDENTIFIER_COLUMNS)
+    assert len(cache) == 0
+
+
+def test_results_are_read_only(contracts):
+    positions = FilterCache().select(Dataset(contracts, "fp"), [name("ben")], IDENTIFIER_COLUMNS)
+    with pytest.raises(ValueError):
+        positions[0] = 0
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.indexes import MODE_CONTAINS, MODE_EXACT, MODE_PREFIX, IdentifierIndex, NgramIndex
+
+
+@pytest.mark.parametrize("case_sensitive", [True, False])
+@pytest.mark.parametrize("query", ["AB12", "ab12", "B1", "12", "1200", "Z", "absent", ""])
+def test_contains_matches_baseline(contracts, baseline, case_sensitive, query):
+    series = contracts["N° de contrat"]
+    index = IdentifierIndex(series, case_sensitive)
+    expected = baseline(series, query, case=case_sensitive)
+    np.testing.assert_array_equal(index.lookup(query, MODE_CONTAINS), expected)
+
+
+@pytest.mark.parametrize("case_sensitive", [True, False])
+@pytest.mark.parametrize("query", ["AB12", "ab", "A", "AB1200", "AB12000"])
+def test_prefix_and_exact(contracts, case_sensitive, query):
+    series = contracts["N° de contrat"]
+    index = IdentifierIndex(series, case_sensitive)
+    text = series if case_sensitive else series.str.lower()
+    query_text = query if case_sensitive else query.lower()
+    prefix = np.flatnonzero(text.str.startswith(query_text, na=False).to_numpy(dtype=bool))
+    exact = np.flatnonzero((text == query_text).to_numpy(dtype=bool))
+    np.testing.assert_array_equal(index.lookup(query, MODE_PREFIX), prefix)
+    np.testing.assert_array_equal(index.lookup(query, MODE_EXACT), exact)
+
+
+def test_missing_values_never_match(contracts):
+    series = contracts["N° de contrat"]
+    index = IdentifierIndex(series, False)
+    missing = np.flatnonzero(series.isna().to_numpy())
+    # Une valeur manquante n'est pas le texte "nan"
+    assert not np.isin(index.lookup("nan"), missing).any()
+    # Requête vide (ou blanche) : toutes les lignes renseignées, comme `str.contains("", na=False)`
+    np.testing.assert_array_equal(index.lookup(""), np.flatnonzero(series.notna().to_numpy()))
+    np.testing.assert_array_equal(index.lookup("   "), index.lookup(""))
+
+
+@pytest.mark.parametrize("mode", [MODE_CONTAINS, MODE_PREFIX, MODE_EXACT])
+@pytest.mark.parametrize("query", ["k10", "K100", "J7", ""])
+def test_filter_rows_equals_intersection(contracts, mode, query):
+    # Raffinement sur des lignes candidates : même résultat que l'intersection avec la recherche globale
+    index = IdentifierIndex(contracts["cin"], False)
+    for rows in (np.arange(len(contracts)), np.array([0, 2, 3, 6]), np.array([], dtype=np.int64)):
+        expected = np.intersect1d(rows, index.lookup(query, mode))
+        np.testing.assert_array_equal(index.filter_rows(rows, query, mode), expected)
+
+
+def test_float_identifiers_read_as_integers():
+    # Identifiants relus en flottants depuis Excel : 12345.0 se cherche comme "12345"
+    index = IdentifierIndex(pd.Series([12345.0, 123.0, np.nan, 4512.5]))
+    np.testing.assert_array_equal(index.lookup("12345", MODE_EXACT), [0])
+    np.testing.assert_array_equal(index.lookup("123"), [0, 1])
+    np.testing.assert_array_equal(index.lookup("4512.5", MODE_EXACT), [3])
+
+
+def test_ngram_candidates_cover_substring_matches():
+    values = np.array(["ab1200", "ab1201", "xb12", "ab9", "zz1200", "ab12"], dtype=object)
+    index = NgramIndex(values)
+    # Requêtes d'au moins n caractères (les plus courtes sont vérifiées sur toutes les valeurs)
+    for query in ["b12", "1200", "ab12", "zz1"]:
+        expected = [position for position, value in enumerate(values) if query in value]
+        assert set(expected) <= set(index.candidates(query))
+    assert len(index.candidates("qqq")) == 0
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from core.dataset import Dataset
+from core.indexes import MODE_EXACT, MODE_PREFIX
+from core.pagination import sort_permutation
+from core.query import EQUALS, IDENTIFIER, PATTERN, TEXT, Condition, QueryEngine
+from core.text_search import fold, fold_series
+
+# Moteur optionnel : tests ignorés sans duckdb
+pytest.importorskip("duckdb")
+
+IDENTIFIER_COLUMNS = {"N° de contrat": True, "cin": False}
+TEXT_COLUMNS = ["Nom de client titulaire", "Commune"]
+PATTERN_COLUMNS = ["Commune"]
+EQUALITY_COLUMNS = ["Catégorie d'abonnement"]
+
+FILTERS = [
+    [],
+    [Condition(IDENTIFIER, "N° de contrat", "")],
+    [Condition(IDENTIFIER, "N° de contrat", "12")],
+    [Condition(IDENTIFIER, "N° de contrat", "AB", MODE_PREFIX)],
+    [Condition(IDENTIFIER, "cin", "K100", MODE_EXACT)],
+    [Condition(IDENTIFIER, "cin", "k10"), Condition(EQUALS, "Catégorie d'abonnement", "BT")],
+    [Condition(TEXT, "Nom de client titulaire", "saïd")],
+    [Condition(TEXT, "Commune", "KELAA"), Condition(IDENTIFIER, "cin", "k")],
+    [Condition(TEXT, "Nom de client titulaire", "-")],
+    [Condition(PATTERN, "Commune", "sidi")],
+    [Condition(PATTERN, "Commune", "^el")],
+    [Condition(EQUALS, "Catégorie d'abonnement", "MT"), Condition(TEXT, "Nom de client titulaire", "absent")],
+]
+
+
+def reference(frame, conditions):
+    # Filtrage d'origine, une colonne après l'autre : `str.contains(..., na=False)` et égalités
+    keep = np.ones(len(frame), dtype=bool)
+    for kind, column, value, mode in conditions:
+        if not value:
+            continue
+        series = frame[column]
+        if kind == IDENTIFIER:
+            text = series if IDENTIFIER_COLUMNS[column] else series.str.lower()
+            query = value if IDENTIFIER_COLUMNS[column] else value.lower()
+            if mode == MODE_EXACT:
+                matches = text == query
+            elif mode == MODE_PREFIX:
+                matches = text.str.startswith(query, na=False)
+            else:
+                matches = text.str.contains(query, na=False, regex=False)
+        elif kind == TEXT:
+            # Requête vide une fois repliée : aucune ligne
+            query = fold(value)
+            matches = fold_series(series).str.contains(query, na=False, regex=False) & bool(query)
+        elif kind == PATTERN:
+            matches = series.astype(str).str.contains(value, case=False, na=False)
+        else:
+            matches = series == value
+        keep &= matches.to_numpy(dtype=bool)
+    return np.flatnonzero(keep)
+
+
+@pytest.fixture
+def engine(contracts):
+    return QueryEngine(contracts, IDENTIFIER_COLUMNS, TEXT_COLUMNS, PATTERN_COLUMNS, EQUALITY_COLUMNS)
+
+
+@pytest.mark.parametrize("conditions", FILTERS)
+def test_sql_matches_pandas_backend(contracts, engine, conditions):
+    expected = reference(contracts, conditions)
+    np.testing.assert_array_equal(engine.positions(conditions), expected)
+    assert engine.count(conditions) == len(expected)
+    np.testing.assert_array_equal(Dataset(contracts, "fp").select(conditions, IDENTIFIER_COLUMNS), expected)
+
+
+@pytest.mark.parametrize("ascending", [True, False])
+@pytest.mark.parametrize("conditions", FILTERS[:3] + FILTERS[5:6])
+def test_sorted_pages(contracts, engine, conditions, ascending):
+    # Pages triées (valeurs manquantes en fin, tri stable) : tranches de la permutation pandas
+    expected = reference(contracts, conditions)
+    order = sort_permutation(contracts["Commune"], ascending)
+    order = order[np.isin(order, expected)]
+    for offset in range(0, len(order) + 1, 3):
+        page = engine.positions(conditions, "Commune", ascending, limit=3, offset=offset)
+        np.testing.assert_array_equal(page, order[offset:offset + 3])
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from core.text_search import TextIndex, fold, fold_series
+
+
+def test_fold():
+    assert fold("Aït-Ouahmane  SAÏD") == "ait ouahmane said"
+    assert fold("  El Kelâa ") == "el kelaa"
+    assert fold("") == ""
+    assert fold("-") == ""
+    # Lettres hors alphabet latin conservées, diacritiques retirés
+    assert fold("مُحَمَّد بن-علي") == "محمد بن علي"
+    assert fold("Øster") == "øster"
+
+
+@pytest.mark.parametrize("query", ["ben", "LAHCEN", "fatima", "i", "absent"])
+def test_plain_names_match_baseline(baseline, query):
+    # Sans accent ni ponctuation, la recherche repliée retient exactement les lignes de `str.contains(case=False)`
+    series = pd.Series(["ben ali", "LAHCEN Khadija", None, "EL AMRANI Fatima", np.nan, "Benali Ahmed"])
+    np.testing.assert_array_equal(TextIndex(series).lookup(query), baseline(series, query))
+
+
+@pytest.mark.parametrize("column", ["Nom de client titulaire", "Commune"])
+@pytest.mark.parametrize("query", ["said", "Saïd", "kelaa", "EL KELÂA", "youssef", "sidi rahal"])
+def test_accented_names(contracts, baseline, column, query):
+    series = contracts[column]
+    found = TextIndex(series).lookup(query)
+    # Lignes de la recherche d'origine toujours retenues, plus les graphies accentuées ou en capitales
+    assert set(baseline(series, query)) <= set(found)
+    np.testing.assert_array_equal(found, baseline(fold_series(series), fold(query)))
+
+
+def test_missing_and_empty_queries(contracts):
+    series = contracts["Commune"]
+    index = TextIndex(series)
+    # Requête vide une fois repliée : aucune ligne, pas toutes
+    for query in ["", "-", " !"]:
+        assert len(index.lookup(query)) == 0
+    assert not np.isin(index.lookup("nan"), np.flatnonzero(series.isna().to_numpy())).any()
+
+
+def test_arabic_script_names():
+    series = pd.Series(["محمد بن علي", "مُحَمَّد العلوي", "فاطمة الزهراء", None, "Mohamed Ben Ali"])
+    index = TextIndex(series)
+    np.testing.assert_array_equal(index.lookup("محمد"), [0, 1])
+    np.testing.assert_array_equal(index.lookup("بن علي"), [0])
+    assert len(index.lookup("يوسف")) == 0
+
+
+def test_filter_rows_equals_intersection(contracts):
+    index = TextIndex(contracts["Nom de client titulaire"])
+    rows = np.array([0, 1, 2, 6, 7])
+    for query in ["said", "ben", ""]:
+        np.testing.assert_array_equal(index.filter_rows(rows, query), np.intersect1d(rows, index.lookup(query)))
+
+
+def test_fuzzy_rank_finds_close_spellings():
+    series = pd.Series(["Benali Ahmed", "Ben Ali Ahmed", "Lahcen Khadija", "Benaly Ahmed"])
+    rows, scores = TextIndex(series).rank("benali ahmed")
+    scores = dict(zip(rows.tolist(), scores))
+    assert {0, 1, 3} <= set(scores) and 2 not in scores
+    # Graphie exacte classée en tête
+    assert scores[0] == 1 and max(scores[1], scores[3]) < 1